@@ -2,19 +2,12 @@
 
 import streamlit as st
 import os
+import threading
 import requests
-from frontend.pages import (
-    intro_page,
-    basic_info_page,
-    deep_dive_page,
-    financial_page,
-    business_plan_page,
-    business_analysis_page
-)
+# Sidorna laddas först när de visas – se frontend/pages/__init__.py
+from frontend import pages
 from frontend.components.sidebar import create_sidebar
-import uuid
-import io
-from PIL import Image
+from frontend.utils.session_helpers import ensure_session_id, autosave_on_stage_change
 # Centraliserad konfiguration för API-nyckel och modell
 import config
 
@@ -194,8 +187,10 @@ if 'conversation_history' not in st.session_state:
     st.session_state.conversation_history = []
 if 'current_stage' not in st.session_state:
     st.session_state.current_stage = 'intro'
-if 'pdf_path' not in st.session_state:
-    st.session_state.pdf_path = None
+if 'pdf_bytes' not in st.session_state:
+    st.session_state.pdf_bytes = None
+if 'pdf_filename' not in st.session_state:
+    st.session_state.pdf_filename = None
 if 'swot_analysis' not in st.session_state:
     st.session_state.swot_analysis = None
 if 'swot_image' not in st.session_state:
@@ -206,6 +201,36 @@ if 'logo_url' not in st.session_state:
     st.session_state.logo_url = None
 if 'custom_logo_mode' not in st.session_state:
     st.session_state.custom_logo_mode = False
+# Eget id per session för sparningar i sessionslagret
+ensure_session_id()
+# Spara ändringarna i bakgrunden när användaren bytt steg
+autosave_on_stage_change()
+
+# Aktuell vy -> sidfunktion i frontend.pages
+PAGES = {
+    'intro': 'intro_page',
+    'basic_info': 'basic_info_page',
+    'deep_dive': 'deep_dive_page',
+    'financial': 'financial_page',
+    'business_plan': 'business_plan_page',
+    'business_analysis': 'business_analysis_page',
+}
+
+def _load_retrieval_index():
+    # Importeras här så att numpy inte laddas innan första sidan visats
+    from backend.retrieval import load_index
+    load_index()
+
+@st.cache_resource(show_spinner=False)
+def warm_retrieval_index():
+    """
+    Laddar sökindexet för vägledningstexterna i bakgrunden, en gång per process
+    (minnesmappas och byggs bara om när filerna i random/ har ändrats).
+    Startas sist i main(), så tråden inte konkurrerar med första sidans rendering.
+    """
+    thread = threading.Thread(target=_load_retrieval_index, name="retrieval-index", daemon=True)
+    thread.start()
+    return thread
 
 def main():
     # 1) Injicera hela CSS-paketet först
@@ -217,23 +242,17 @@ def main():
     # 3) Sido-meny
     create_sidebar()
 
-    # 4) Sidnavigering
-    if st.session_state.current_stage == 'intro':
-        intro_page()
-    elif st.session_state.current_stage == 'basic_info':
-        basic_info_page()
-    elif st.session_state.current_stage == 'deep_dive':
-        deep_dive_page()
-    elif st.session_state.current_stage == 'financial':
-        financial_page()
-    elif st.session_state.current_stage == 'business_plan':
-        business_plan_page()
-    elif st.session_state.current_stage == 'business_analysis':
-        business_analysis_page()
-
-    # 5) Stäng wrappern – MÅSTE ligga sist i main()
+    # 4) Sidnavigering – bara den aktuella sidans modul (och dess beroenden) importeras
+    page_name = PAGES.get(st.session_state.current_stage)
+    if page_name:
+        getattr(pages, page_name)()
+
+    # 5) Stäng wrappern – MÅSTE ligga sist av det som ritas
     st.markdown('</div>', unsafe_allow_html=True)
 
+    # 6) Sidan är ritad – nu kan sökindexet laddas i bakgrunden
+    warm_retrieval_index()
+
 if __name__ == "__main__":
     st.set_page_config(
         page_title="Interaktiv Affärsplan",
@@ -0,0 +1,202 @@
+# backend/asset_store.py
+# Lokal lagring av logotyper och andra bilder som hämtas via URL.
+# DALL-E-URL:er slutar fungera efter en stund, så bilden hämtas en gång och sparas
+# under en hash av URL:en: originalet plus en färdig 300px-version för PDF:er.
+# Ett index i SQLite håller reda på storlek och senaste användning för LRU-rensning,
+# och ett litet minneslager ger samma avkodade bytes till PDF, sidor och rapporter.
+
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import requests
+import config
+from backend.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+ASSET_DIR = os.path.join(config.CACHE_DIR, "assets")
+DB_PATH = os.path.join(config.CACHE_DIR, "assets.sqlite3")
+ASSET_STORE_MAX_BYTES = int(config.ASSET_STORE_MAX_MB * 1024 * 1024)
+PDF_IMAGE_SIZE = 300
+MEMORY_MAX_ENTRIES = 32
+# En misslyckad hämtning försöks inte igen förrän efter så här många sekunder
+FAILED_FETCH_TTL = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assets_accessed ON assets(accessed_at);
+"""
+
+# Varianter som sparas per bild
+ORIGINAL = "original"
+PDF = "pdf"
+
+_lock = threading.Lock()
+_memory = OrderedDict()
+_failures = {}   # nyckel -> tidpunkt för senaste misslyckade hämtning
+
+def _connection():
+    return get_connection(DB_PATH, _SCHEMA)
+
+def url_key(url):
+    """Returnerar lagringsnyckeln (sha256) för en URL"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def _path(key, variant):
+    suffix = "orig" if variant == ORIGINAL else "pdf.png"
+    return os.path.join(ASSET_DIR, f"{key}.{suffix}")
+
+def _remember(key, variant, data):
+    with _lock:
+        _memory[(key, variant)] = data
+        _memory.move_to_end((key, variant))
+        while len(_memory) > MEMORY_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+def _recently_failed(key):
+    with _lock:
+        failed_at = _failures.get(key)
+        return failed_at is not None and time.time() - failed_at < FAILED_FETCH_TTL
+
+def _remember_failure(key):
+    now = time.time()
+    with _lock:
+        for old_key in [k for k, t in _failures.items() if now - t >= FAILED_FETCH_TTL]:
+            del _failures[old_key]
+        _failures[key] = now
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _pdf_version(original):
+    """Skalar ner bilden till högst 300px och sparar som optimerad PNG"""
+    from PIL import Image
+    with Image.open(io.BytesIO(original)) as img:
+        img.load()
+        if img.width > PDF_IMAGE_SIZE or img.height > PDF_IMAGE_SIZE:
+            img.thumbnail((PDF_IMAGE_SIZE, PDF_IMAGE_SIZE))
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA")
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+def _touch(key):
+    try:
+        _connection().execute("UPDATE assets SET accessed_at = ? WHERE key = ?", (time.time(), key))
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte uppdatera bildlagret: {e}")
+
+def _evict(conn):
+    """Tar bort de minst nyligen använda bilderna tills lagret ryms"""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+    if total <= ASSET_STORE_MAX_BYTES:
+        return
+    for key, size in conn.execute("SELECT key, size FROM assets ORDER BY accessed_at").fetchall():
+        if total <= ASSET_STORE_MAX_BYTES:
+            break
+        conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+        with _lock:
+            for variant in (ORIGINAL, PDF):
+                _memory.pop((key, variant), None)
+        for variant in (ORIGINAL, PDF):
+            try:
+                os.remove(_path(key, variant))
+            except FileNotFoundError:
+                pass
+        total -= size
+
+def fetch(url):
+    """
+    Hämtar och lagrar bilden för URL:en om den inte redan finns.
+
+    Returns:
+        str: Lagringsnyckeln, eller None om bilden inte kunde hämtas (eller nyligen misslyckades)
+    """
+    if not url:
+        return None
+    key = url_key(url)
+    if os.path.exists(_path(key, ORIGINAL)) and os.path.exists(_path(key, PDF)):
+        return key
+    if _recently_failed(key):
+        return None
+
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        original = response.content
+        pdf_image = _pdf_version(original)
+    except Exception as e:
+        logger.warning(f"Kunde inte hämta bild: {e}")
+        _remember_failure(key)
+        return None
+
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    try:
+        _write_atomic(_path(key, ORIGINAL), original)
+        _write_atomic(_path(key, PDF), pdf_image)
+        now = time.time()
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO assets (key, url, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, url, len(original) + len(pdf_image), now, now),
+        )
+        _evict(conn)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Kunde inte spara bild i bildlagret: {e}")
+    _remember(key, ORIGINAL, original)
+    _remember(key, PDF, pdf_image)
+    return key
+
+def _get(url, variant, download=True):
+    if not url:
+        return None
+    key = url_key(url)
+    with _lock:
+        data = _memory.get((key, variant))
+        if data is not None:
+            _memory.move_to_end((key, variant))
+            return data
+
+    path = _path(key, variant)
+    if not os.path.exists(path) and (not download or fetch(url) is None):
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        # Filen kan ha rensats av en annan process – hämta om
+        if not download or fetch(url) is None:
+            return None
+        with _lock:
+            data = _memory.get((key, variant))
+        if data is None:
+            return None
+    _touch(key)
+    _remember(key, variant, data)
+    return data
+
+def get_original(url, download=True):
+    """
+    Returnerar originalbilden som bytes, eller None.
+    Med download=False returneras bara redan lagrade bilder – för sidor som ritas om ofta.
+    """
+    return _get(url, ORIGINAL, download)
+
+def get_pdf_image(url):
+    """Returnerar den PDF-färdiga 300px-versionen som PNG-bytes (hämtas vid behov), eller None"""
+    return _get(url, PDF)
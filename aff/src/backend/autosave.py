@@ -0,0 +1,111 @@
+# backend/autosave.py
+# Autosparning av sessionens läge vid varje stegbyte.
+# Bara det som ändrats sedan förra sparningen skrivs: en hash per nyckel i user_data och
+# för konversationshistoriken avgör vad som är nytt, och ändringarna läggs som en delta i
+# sessionslagrets ändringslogg. Skrivningen görs av en enda bakgrundstråd, så deltorna
+# hamnar i rätt ordning och sidan inte väntar på disken. En fullständig sparning väntar
+# först in sessionens köade deltas (wait), så att ingen äldre delta skrivs ovanpå den.
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from backend import session_store
+
+logger = logging.getLogger(__name__)
+
+# En arbetare: deltorna för en session måste skrivas i den ordning de skapades
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+_pending_lock = threading.Lock()
+_pending = {}   # session-id -> senast köade skrivning
+
+def _hash(value):
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def baseline(state):
+    """
+    Beskriver ett sparat läge med hashar, som jämförelsepunkt för nästa delta.
+
+    Args:
+        state (dict): user_data, conversation_history och current_stage
+
+    Returns:
+        dict: {"user_data": {nyckel: hash}, "history_len", "history_hash", "current_stage"}
+    """
+    history = state.get("conversation_history") or []
+    return {
+        "user_data": {key: _hash(value) for key, value in (state.get("user_data") or {}).items()},
+        "history_len": len(history),
+        "history_hash": _hash(history),
+        "current_stage": state.get("current_stage"),
+    }
+
+def diff(base, state):
+    """
+    Räknar ut vad som ändrats sedan base.
+
+    Returns:
+        tuple: (delta för session_store.apply_delta eller None om inget ändrats, ny baseline)
+    """
+    new_base = baseline(state)
+    delta = {}
+
+    user_data = state.get("user_data") or {}
+    changed = {
+        key: user_data[key]
+        for key, digest in new_base["user_data"].items()
+        if base["user_data"].get(key) != digest
+    }
+    removed = [key for key in base["user_data"] if key not in user_data]
+    if changed:
+        delta["user_data"] = changed
+    if removed:
+        delta["user_data_removed"] = removed
+
+    history = state.get("conversation_history") or []
+    if new_base["history_hash"] != base["history_hash"]:
+        start = base["history_len"]
+        # Oftast har bara nya meddelanden lagts till i slutet – annars skrivs hela historiken
+        if len(history) < start or _hash(history[:start]) != base["history_hash"]:
+            start = 0
+        delta["conversation_history"] = {"start": start, "messages": history[start:]}
+
+    if new_base["current_stage"] != base["current_stage"]:
+        delta["current_stage"] = new_base["current_stage"]
+    return (delta or None), new_base
+
+def _write(session_id, delta):
+    try:
+        return session_store.append_delta(session_id, delta)
+    except Exception as e:
+        logger.error(f"Autosparning misslyckades för {session_id}: {e}")
+        return False
+
+def _forget(session_id, future):
+    with _pending_lock:
+        if _pending.get(session_id) is future:
+            del _pending[session_id]
+
+def submit(session_id, delta):
+    """
+    Lägger deltan i kö för att skrivas av autosparningstråden. Deltan kopieras först,
+    så att sidan kan fortsätta ändra session_state medan den skrivs.
+
+    Returns:
+        Future: Blir True när deltan sparats, False om skrivningen misslyckades
+    """
+    future = _executor.submit(_write, session_id, copy.deepcopy(delta))
+    with _pending_lock:
+        _pending[session_id] = future
+    future.add_done_callback(lambda done: _forget(session_id, done))
+    return future
+
+def wait(session_id, timeout=None):
+    """Väntar tills sessionens köade deltas skrivits (en arbetare – den senaste är sist i kön)"""
+    with _pending_lock:
+        future = _pending.get(session_id)
+    if future is not None:
+        wait_futures([future], timeout=timeout)
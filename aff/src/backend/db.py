@@ -0,0 +1,35 @@
+# backend/db.py
+# Gemensam hantering av lokala SQLite-databaser (cacher, sessioner m.m.)
+
+import os
+import sqlite3
+import threading
+
+_local = threading.local()
+
+def get_connection(path, schema=None):
+    """
+    Returnerar en trådlokal SQLite-anslutning i WAL-läge för angiven databasfil.
+
+    Args:
+        path (str): Sökväg till databasfilen (katalogen skapas vid behov)
+        schema (str): SQL som körs när anslutningen öppnas, t.ex. CREATE TABLE IF NOT EXISTS
+
+    Returns:
+        sqlite3.Connection: Anslutning i autocommit-läge
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        # WAL låter flera processer läsa samtidigt som en skriver
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if schema:
+            conn.executescript(schema)
+        connections[path] = conn
+    return conn
@@ -0,0 +1,147 @@
+# backend/field_store.py
+# Stora textfält i user_data (t.ex. den genererade affärsplanen) lagras som referenser.
+# Texten sparas en gång under en hash av innehållet och session_state håller bara en liten
+# referens med längd och förhandsvisning. Hela texten läses först när en sida visar den eller
+# skickar den vidare (PDF, prompt). Referensen är vanlig JSON, så sparningar och autosparning
+# lagrar bara referensen – samma plan i flera sparningar delar en enda kopia.
+# Fält som ingen sparning längre refererar till tas bort av session_store (delete_unreferenced).
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import config
+from backend import session_codec
+from backend.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(config.DATA_DIR, "fields.sqlite3")
+REF_KEY = "$field"
+MEMORY_MAX_ENTRIES = 16
+ELLIPSIS = "…"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fields (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    length INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fields_created ON fields(created_at);
+"""
+
+_lock = threading.Lock()
+_memory = OrderedDict()
+
+def _connection():
+    return get_connection(DB_PATH, _SCHEMA)
+
+def _remember(key, text):
+    with _lock:
+        _memory[key] = text
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+def is_ref(value):
+    """True om värdet är en referens till ett lagrat fält"""
+    return isinstance(value, dict) and REF_KEY in value
+
+def offload(value):
+    """
+    Lagrar en lång text och returnerar en referens till den. Korta texter och andra
+    värden returneras oförändrade, liksom texten om den inte kunde lagras.
+    """
+    if not isinstance(value, str) or len(value) < config.FIELD_REF_MIN_CHARS:
+        return value
+    key = hashlib.sha256(value.encode("utf-8")).hexdigest()
+    try:
+        # created_at är senaste lagringen – ett fält som lagras igen räknas som nytt vid rensning
+        _connection().execute(
+            "INSERT INTO fields (key, data, length, created_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET created_at = excluded.created_at",
+            (key, session_codec.encode(value), len(value), time.time()),
+        )
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte lagra fält: {e}")
+        return value
+    _remember(key, value)
+    return {REF_KEY: key, "length": len(value), "preview": value[:config.FIELD_PREVIEW_CHARS]}
+
+def resolve(value):
+    """Returnerar hela texten för en referens; andra värden returneras oförändrade"""
+    if not is_ref(value):
+        return value
+    key = value[REF_KEY]
+    with _lock:
+        text = _memory.get(key)
+        if text is not None:
+            _memory.move_to_end(key)
+            return text
+    try:
+        row = _connection().execute("SELECT data FROM fields WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            text = session_codec.decode(row[0])
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"Kunde inte läsa fält {key}: {e}")
+    if text is None:
+        # Bättre att visa början av texten än ingenting
+        logger.warning(f"Fält {key} saknas i lagret, använder förhandsvisningen")
+        return value.get("preview", "")
+    _remember(key, text)
+    return text
+
+def preview(value, max_chars=None):
+    """Kort version av ett värde för översikter, utan att läsa in lagrade fält"""
+    max_chars = config.FIELD_PREVIEW_CHARS if max_chars is None else max_chars
+    if is_ref(value):
+        text = value.get("preview", "")
+        truncated = value.get("length", 0) > len(text)
+    else:
+        text = str(value)
+        truncated = False
+    if len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = True
+    return text.rstrip() + ELLIPSIS if truncated else text
+
+def offload_fields(data):
+    """Returnerar en kopia av user_data där långa fält i FIELD_REF_KEYS ersatts med referenser"""
+    return {
+        key: offload(value) if key in config.FIELD_REF_KEYS else value
+        for key, value in data.items()
+    }
+
+def resolve_fields(data):
+    """Returnerar en kopia av user_data med alla referenser ersatta av hela texten"""
+    return {key: resolve(value) for key, value in data.items()}
+
+def referenced_keys(data):
+    """Nycklarna för de lagrade fält som user_data refererar till"""
+    return {value[REF_KEY] for value in (data or {}).values() if is_ref(value)}
+
+def delete_unreferenced(referenced, older_than):
+    """
+    Tar bort lagrade fält som inte finns i referenced och lagrades före older_than (unix-tid).
+
+    Returns:
+        int: Antal borttagna fält
+    """
+    conn = _connection()
+    try:
+        candidates = [
+            key for (key,) in conn.execute("SELECT key FROM fields WHERE created_at < ?", (older_than,))
+            if key not in referenced
+        ]
+        conn.executemany("DELETE FROM fields WHERE key = ? AND created_at < ?", [(key, older_than) for key in candidates])
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte rensa fältlagret: {e}")
+        return 0
+    with _lock:
+        for key in candidates:
+            _memory.pop(key, None)
+    return len(candidates)
@@ -1,76 +1,281 @@
 # backend/google.py
 from dotenv import load_dotenv
 import os
+import json
+import hashlib
+from collections import OrderedDict
+import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import textwrap
-import webbrowser
-import folium
 import streamlit as st
-from folium.plugins import MarkerCluster
-import tempfile
+import config
+from backend import places_cache
 
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_PLACES_KEY")
 
+TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+# Google aktiverar next_page_token först efter ett par sekunder
+PAGE_TOKEN_DELAY = 2.0
+PAGE_TOKEN_RETRIES = 3
+# Övriga statusar (OVER_QUERY_LIMIT, REQUEST_DENIED, INVALID_REQUEST …) är fel och får inte cachas
+OK_STATUSES = ("OK", "ZERO_RESULTS")
+
+# En delad HTTP-session med anslutningspool så att TLS-anslutningen återanvänds mellan sökningar
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.GOOGLE_PLACES_MAX_CONCURRENCY)
+_session.mount("https://", _adapter)
+
+_executor = ThreadPoolExecutor(max_workers=config.GOOGLE_PLACES_MAX_CONCURRENCY, thread_name_prefix="places")
+_semaphores_lock = threading.Lock()
+_semaphores = {}
+
+def _key_semaphore(api_key):
+    """Begränsar antalet samtidiga anrop per API-nyckel"""
+    with _semaphores_lock:
+        semaphore = _semaphores.get(api_key)
+        if semaphore is None:
+            semaphore = _semaphores[api_key] = threading.BoundedSemaphore(config.GOOGLE_PLACES_MAX_CONCURRENCY)
+        return semaphore
+
+def _get_page(params, api_key):
+    """
+    Hämtar en resultatsida; pagetoken-anrop försöks igen tills token blivit giltig.
+    Kastar undantag om Places svarar med en felstatus, så att felet aldrig cachas som tomt resultat.
+    """
+    attempts = PAGE_TOKEN_RETRIES if "pagetoken" in params else 1
+    for attempt in range(attempts):
+        with _key_semaphore(api_key):
+            r = _session.get(TEXT_SEARCH_URL, params=params, timeout=config.GOOGLE_PLACES_TIMEOUT)
+        r.raise_for_status()
+        data = r.json()
+        if data.get("status") != "INVALID_REQUEST" or attempt == attempts - 1:
+            break
+        time.sleep(PAGE_TOKEN_DELAY)
+    status = data.get("status")
+    if status not in OK_STATUSES:
+        message = data.get("error_message")
+        raise RuntimeError(f"Google Places svarade {status}" + (f": {message}" if message else ""))
+    return data
+
+def _search_places(query: str, max_results: int = 5, api_key: str = None):
+    """
+    Söker efter platser via Google Places API utan Streamlit-anrop (säker att köra i trådar).
+    Kastar undantag vid nätverks- eller HTTP-fel och när Places svarar med en felstatus.
+    """
+    api_key = api_key or API_KEY
+    params = {"query": query, "key": api_key}
+    out, fetched = [], 0
+
+    while params and fetched < max_results:
+        data = _get_page(params, api_key)
+        for place in data.get("results", []):
+            fetched += 1
+            out.append(
+                {
+                    "name": place["name"],
+                    "address": place.get("formatted_address", ""),
+                    "rating": place.get("rating", "N/A"),
+                    "reviews": place.get("user_ratings_total", 0),
+                    "lat": place["geometry"]["location"]["lat"],
+                    "lng": place["geometry"]["location"]["lng"],
+                }
+            )
+            if fetched >= max_results:
+                break
+        token = data.get("next_page_token")
+        if token and fetched < max_results:
+            time.sleep(PAGE_TOKEN_DELAY)
+            params = {"pagetoken": token, "key": api_key}
+        else:
+            params = None
+    return out
+
 def text_search(query: str, max_results: int = 5):
     """Söker efter platser via Google Places API och returnerar resultat."""
     if not API_KEY:
         st.warning("Google Places API-nyckel saknas. Lägg till 'GOOGLE_PLACES_KEY' i .env-filen för att aktivera kartor.")
         return []
         
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    params = {"query": query, "key": API_KEY}
-    out, fetched = [], 0
-    
+    cached = places_cache.get(query, max_results)
+    if cached is not None:
+        return cached
+
     try:
-        while params and fetched < max_results:
-            r = requests.get(url, params=params, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            for place in data.get("results", []):
-                fetched += 1
-                out.append(
-                    {
-                        "name": place["name"],
-                        "address": place.get("formatted_address", ""),
-                        "rating": place.get("rating", "N/A"),
-                        "reviews": place.get("user_ratings_total", 0),
-                        "lat": place["geometry"]["location"]["lat"],
-                        "lng": place["geometry"]["location"]["lng"],
-                    }
-                )
-                if fetched >= max_results:
-                    break
-            params = (
-                {"pagetoken": data.get("next_page_token"), "key": API_KEY}
-                if data.get("next_page_token") and fetched < max_results
-                else None
-            )
-        return out
+        places = _search_places(query, max_results)
     except Exception as e:
         st.error(f"Fel vid sökning: {str(e)}")
         return []
+    places_cache.put(query, max_results, places)
+    return places
 
-def make_map(places: list[dict], city: str = "Stockholm", outfile: str = None):
-    """Skapar en karta med markörer för varje plats och sparar som HTML-fil."""
-    # Centrera på första träffen eller använd standard för staden
-    if places and places[0].get("lat") and places[0].get("lng"):
-        center = [places[0]["lat"], places[0]["lng"]]
+def _report(errors, message, level="error"):
+    """Visar ett meddelande i Streamlit, eller samlar det i errors när vi körs som bakgrundsjobb"""
+    if errors is not None:
+        errors.append(message)
+    elif level == "warning":
+        st.warning(message)
     else:
-        # Default-positioner för vanliga svenska städer
-        city_coords = {
-            "Stockholm": [59.3293, 18.0686],
-            "Göteborg": [57.7089, 11.9746],
-            "Malmö": [55.6050, 13.0038],
-            "Uppsala": [59.8586, 17.6389],
-            "Västerås": [59.6099, 16.5448],
-            "Örebro": [59.2753, 15.2134],
-            "Linköping": [58.4108, 15.6214]
-        }
-        center = city_coords.get(city, [59.3293, 18.0686])  # Default till Stockholm
+        st.error(message)
+
+def text_search_many(queries: list[str], max_results: int = 5, errors: list = None):
+    """
+    Kör flera sökningar samtidigt över den delade sessionen.
+    Frågor som finns i platscachen besvaras utan nätverksanrop.
+
+    Args:
+        errors: Om en lista anges samlas felmeddelanden där i stället för att visas
+            (krävs när funktionen körs utanför Streamlits skripttråd)
+
+    Returns:
+        list: En resultatlista per fråga, i samma ordning som queries
+    """
+    if not API_KEY:
+        _report(errors, "Google Places API-nyckel saknas. Lägg till 'GOOGLE_PLACES_KEY' i .env-filen för att aktivera kartor.", "warning")
+        return [[] for _ in queries]
+
+    cached = places_cache.get_many(queries, max_results)
+    futures = {
+        query: _executor.submit(_search_places, query, max_results, API_KEY)
+        for query in dict.fromkeys(queries) if query not in cached
+    }
+    fetched = {}
+    for query, future in futures.items():
+        try:
+            fetched[query] = future.result()
+        except Exception as e:
+            # Felmeddelanden visas från anropande tråd eftersom Streamlit inte kan anropas från arbetstrådar
+            _report(errors, f"Fel vid sökning efter '{query}': {str(e)}")
+    # Bara lyckade sökningar (även tomma) sparas – fel försöks igen nästa gång
+    places_cache.put_many(fetched, max_results)
+    return [
+        [dict(place) for place in cached.get(query, fetched.get(query, []))]
+        for query in queries
+    ]
+
+# Default-positioner för vanliga svenska städer
+CITY_COORDS = {
+    "Stockholm": [59.3293, 18.0686],
+    "Göteborg": [57.7089, 11.9746],
+    "Malmö": [55.6050, 13.0038],
+    "Uppsala": [59.8586, 17.6389],
+    "Västerås": [59.6099, 16.5448],
+    "Örebro": [59.2753, 15.2134],
+    "Linköping": [58.4108, 15.6214]
+}
+
+# Externa bibliotek för kompakta kartor; den egna renderaren serveras som statisk fil av Streamlit
+COMPACT_MAP_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8"/>
+<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css"/>
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.css"/>
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.Default.css"/>
+<link rel="stylesheet" href="{static_url}/competitor_map.css"/>
+<script src="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js"></script>
+<script src="https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/leaflet.markercluster.js"></script>
+<script src="{static_url}/competitor_map.js"></script>
+</head>
+<body>
+<div id="map"></div>
+<script>renderCompetitorMap("map", {config});</script>
+</body>
+</html>
+"""
+
+MAP_TILES = "CartoDB positron"
+MAP_CACHE_MAX_ENTRIES = 64
+
+# Renderade kartor per (platser, stad, kartlager) – samma uppsättning ger samma HTML
+_map_cache_lock = threading.Lock()
+_map_cache = OrderedDict()
+
+def _map_cache_key(places, city, tiles, compact):
+    """Stabil hash av de fält som påverkar kartans utseende"""
+    payload = json.dumps(
+        {
+            "places": [
+                [p.get(key) for key in ("name", "address", "rating", "reviews", "lat", "lng")]
+                for p in places
+            ],
+            "city": city,
+            "tiles": tiles,
+            "compact": compact,
+            "static_url": config.STATIC_URL if compact else None,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _cached_map(key):
+    with _map_cache_lock:
+        html = _map_cache.get(key)
+        if html is not None:
+            _map_cache.move_to_end(key)
+        return html
+
+def _remember_map(key, html):
+    with _map_cache_lock:
+        _map_cache[key] = html
+        _map_cache.move_to_end(key)
+        while len(_map_cache) > MAP_CACHE_MAX_ENTRIES:
+            _map_cache.popitem(last=False)
+
+def _map_center(places, city):
+    """Centrerar på första träffen eller använder standard för staden"""
+    if places and places[0].get("lat") and places[0].get("lng"):
+        return [places[0]["lat"], places[0]["lng"]]
+    return CITY_COORDS.get(city, CITY_COORDS["Stockholm"])  # Default till Stockholm
+
+def _compact_map_html(places, center):
+    """Bygger en liten HTML-sida med bara platsdatan; JS och CSS hämtas från delade filer"""
+    map_config = {
+        "center": center,
+        "zoom": 12,
+        "places": [
+            {key: p.get(key) for key in ("name", "address", "rating", "reviews", "lat", "lng")}
+            for p in places
+        ],
+    }
+    # Skydda mot att en platsdata-sträng avslutar script-taggen
+    config_json = json.dumps(map_config, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    return COMPACT_MAP_TEMPLATE.format(static_url=config.STATIC_URL, config=config_json)
+
+def make_map(places: list[dict], city: str = "Stockholm", outfile: str = None, compact: bool = False):
+    """
+    Skapar en karta med markörer för varje plats.
+
+    Utan outfile renderas kartan direkt i minnet och HTML-koden returneras som en sträng.
+    Med compact=True blir sidan en liten mall som refererar till static/competitor_map.js
+    i stället för att bädda in folium-koden per karta. Renderade kartor sparas i en
+    begränsad LRU-cache så att omkörningar inte bygger om folium-objekten.
+    """
+    center = _map_center(places, city)
+
+    cache_key = None
+    if not outfile:
+        cache_key = _map_cache_key(places, city, MAP_TILES, compact)
+        html = _cached_map(cache_key)
+        if html is not None:
+            return html
+
+    if compact and not outfile:
+        html = _compact_map_html(places, center)
+        _remember_map(cache_key, html)
+        return html
     
+    # folium behövs bara för fullständiga kartor och importeras därför först här
+    import folium
+    from folium.plugins import MarkerCluster
+
     # Skapa karta
-    m = folium.Map(location=center, zoom_start=12, tiles="CartoDB positron")
+    m = folium.Map(location=center, zoom_start=12, tiles=MAP_TILES)
     
     # Använd MarkerCluster för bättre hantering av många markörer
     marker_cluster = MarkerCluster().add_to(m)
@@ -91,15 +296,17 @@ def make_map(places: list[dict], city: str = "Stockholm", outfile: str = None):
             icon=folium.Icon(icon="building", prefix="fa", color="blue")
         ).add_to(marker_cluster)
     
-    # Spara till temporär fil om filnamn anges
+    # Spara till fil om filnamn anges
     if outfile:
         m.save(outfile)
         return outfile
     
-    # Returnera HTML-koden för kartan som en sträng
-    return m._repr_html_()
+    # Rendera hela HTML-dokumentet i minnet
+    html = m.get_root().render()
+    _remember_map(cache_key, html)
+    return html
 
-def generate_competitor_map(competitors, city, max_results=10):
+def generate_competitor_map(competitors, city, max_results=10, compact=True, errors=None):
     """
     Genererar en karta för konkurrenter baserat på namnen och staden.
     
@@ -107,41 +314,31 @@ def generate_competitor_map(competitors, city, max_results=10):
         competitors: Lista med dictionaries som innehåller 'name' och 'description'
         city: Staden där konkurrenterna finns
         max_results: Maximalt antal resultat att visa
+        compact: Om kartan ska referera till delade statiska filer i stället för att bädda in allt
+        errors: Lista att samla felmeddelanden i (för bakgrundsjobb), annars visas de direkt
     
     Returns:
         HTML för kartan som kan visas i Streamlit
     """
     all_places = []
     
-    # Sök efter varje konkurrent
-    for comp in competitors:
-        comp_name = comp.get("name", "")
-        if comp_name and comp_name != "Ditt företag" and comp_name != "Övriga":
-            query = f"{comp_name} in {city}"
-            places = text_search(query, max_results=2)  # Begränsa till 2 resultat per konkurrent
-            
-            # Lägg till marknadsandel till varje konkurrent
-            for place in places:
-                place["market_share"] = comp.get("share", "N/A")
-                place["description"] = comp.get("description", "")
-            
-            all_places.extend(places)
-    
-    # Skapa temporär fil för kartan
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as temp_file:
-        temp_path = temp_file.name
-    
-    # Skapa och spara karta
-    make_map(all_places, city=city, outfile=temp_path)
-    
-    # Läs in HTML från temporär fil
-    with open(temp_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    # Ta bort temporär fil
-    os.remove(temp_path)
+    # Sök efter alla konkurrenter samtidigt
+    searched = [
+        comp for comp in competitors
+        if comp.get("name", "") and comp.get("name") != "Ditt företag" and comp.get("name") != "Övriga"
+    ]
+    queries = [f"{comp['name']} in {city}" for comp in searched]
+    # Begränsa till 2 resultat per konkurrent
+    for comp, places in zip(searched, text_search_many(queries, max_results=2, errors=errors)):
+        # Lägg till marknadsandel till varje konkurrent
+        for place in places:
+            place["market_share"] = comp.get("share", "N/A")
+            place["description"] = comp.get("description", "")
+        
+        all_places.extend(places)
     
-    return html_content
+    # Rendera kartan direkt i minnet
+    return make_map(all_places, city=city, compact=compact)
 
 if __name__ == "__main__":
     query = "electronics stores in Stockholm"
@@ -161,5 +358,6 @@ if __name__ == "__main__":
         )
     
     # Skapa karta och öppna den direkt
+    import webbrowser
     html_file = make_map(results, outfile="results_map.html")
     webbrowser.open_new_tab(html_file)
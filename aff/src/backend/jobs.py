@@ -0,0 +1,145 @@
+# backend/jobs.py
+# Gemensam jobbkö för långa genereringar (affärsplan, dashboard, kartor, PDF).
+# Jobben körs i en delad trådpool utanför Streamlits skripttråd, så en omkörning av
+# sidan avbryter eller upprepar dem inte. Sidorna sparar bara jobb-id:t i session_state
+# och frågar efter status tills resultatet finns. Alla användare delar samma arbetarbudget.
+#
+# Jobbfunktionerna får inte anropa st.* eller läsa st.session_state – allt de behöver
+# ska skickas in som argument från skripttråden.
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+import config
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+UNKNOWN = "unknown"
+
+_executor = ThreadPoolExecutor(max_workers=config.JOB_WORKERS, thread_name_prefix="job")
+_lock = threading.Lock()
+_jobs = {}
+
+def _prune(now):
+    """Glömmer avslutade jobb vars resultat inte hämtats inom JOB_RESULT_TTL"""
+    expired = []
+    for job_id, job in _jobs.items():
+        # Jobb som avbröts innan de startade har ingen sluttid – räkna från när de skapades
+        finished_at = job["finished_at"]
+        if finished_at is None and job["future"].cancelled():
+            finished_at = job["created_at"]
+        if finished_at is not None and now - finished_at > config.JOB_RESULT_TTL:
+            expired.append(job_id)
+    for job_id in expired:
+        del _jobs[job_id]
+
+def _run(job_id, func, args, kwargs, stream):
+    with _lock:
+        job = _jobs[job_id]
+        job["started_at"] = time.time()
+    try:
+        if stream:
+            # Strömmande jobb: samla textbitarna så att sidan kan visa delresultat
+            chunks = []
+            for chunk in func(*args, **kwargs):
+                if job["cancel_requested"]:
+                    raise CancelledError()
+                chunks.append(chunk)
+                job["partial"] = "".join(chunks)
+            return "".join(chunks)
+        return func(*args, **kwargs)
+    finally:
+        job["finished_at"] = time.time()
+
+def _submit(func, args, kwargs, name, stream):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _lock:
+        _prune(now)
+        _jobs[job_id] = {
+            "name": name or getattr(func, "__name__", "jobb"),
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "partial": "",
+            "cancel_requested": False,
+            "future": None,
+        }
+        _jobs[job_id]["future"] = _executor.submit(_run, job_id, func, args, kwargs, stream)
+    return job_id
+
+def submit(func, *args, name=None, **kwargs):
+    """
+    Lägger ett jobb i kön.
+
+    Args:
+        func: Funktionen som ska köras (utan Streamlit-anrop)
+        name (str): Visningsnamn för jobbet
+
+    Returns:
+        str: Jobb-id
+    """
+    return _submit(func, args, kwargs, name, stream=False)
+
+def submit_stream(func, *args, name=None, **kwargs):
+    """Som submit, men func returnerar textbitar som samlas ihop och kan läsas med partial()"""
+    return _submit(func, args, kwargs, name, stream=True)
+
+def _get(job_id):
+    with _lock:
+        return _jobs.get(job_id)
+
+def status(job_id):
+    """Returnerar jobbets status: pending, running, done, failed, cancelled eller unknown"""
+    job = _get(job_id)
+    if job is None:
+        return UNKNOWN
+    future = job["future"]
+    if future.cancelled() or (job["cancel_requested"] and future.done()):
+        return CANCELLED
+    if not future.done():
+        return RUNNING if job["started_at"] is not None else PENDING
+    return FAILED if future.exception() is not None else DONE
+
+def result(job_id, default=None):
+    """Returnerar resultatet om jobbet är klart, annars default"""
+    job = _get(job_id)
+    if job is None or status(job_id) != DONE:
+        return default
+    return job["future"].result()
+
+def error(job_id):
+    """Returnerar felmeddelandet för ett misslyckat jobb, annars None"""
+    job = _get(job_id)
+    if job is None or status(job_id) != FAILED:
+        return None
+    return str(job["future"].exception())
+
+def partial(job_id):
+    """Returnerar den text som ett strömmande jobb hittills har producerat"""
+    job = _get(job_id)
+    return job["partial"] if job else ""
+
+def cancel(job_id):
+    """
+    Avbryter ett jobb. Köade jobb startas aldrig; strömmande jobb avbryts vid nästa textbit.
+    Ett vanligt jobb som redan körs får köra klart men dess resultat räknas som avbrutet.
+
+    Returns:
+        bool: True om jobbet fanns och inte redan var klart
+    """
+    job = _get(job_id)
+    if job is None or job["future"].done():
+        return False
+    job["cancel_requested"] = True
+    job["future"].cancel()
+    return True
+
+def forget(job_id):
+    """Tar bort ett jobb (och dess resultat) ur registret"""
+    with _lock:
+        _jobs.pop(job_id, None)
@@ -0,0 +1,123 @@
+# backend/openai_client.py
+# Delade OpenAI-klienter för hela processen.
+# En synkron och en asynkron klient återanvänds av alla Streamlit-sessioner så att
+# HTTP-anslutningar (och TLS-handskakningar) hålls vid liv mellan anropen.
+
+import asyncio
+import threading
+import httpx
+import openai
+# Centraliserad konfiguration (laddar .env)
+import config
+
+_client_lock = threading.Lock()
+_sync_client = None
+_async_client = None
+
+# Async-klienten körs alltid i samma händelseloop, i en egen bakgrundstråd,
+# eftersom httpx-anslutningar är bundna till loopen de skapades i.
+_loop = None
+_loop_thread = None
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "new_connections": 0, "tls_handshakes": 0}
+
+def _increment(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+def _trace(event_name, info):
+    """Tar emot httpcore-trace-händelser och räknar nya anslutningar"""
+    if event_name == "connection.connect_tcp.complete":
+        _increment("new_connections")
+    elif event_name == "connection.start_tls.complete":
+        _increment("tls_handshakes")
+
+async def _async_trace(event_name, info):
+    _trace(event_name, info)
+
+def _on_request(request):
+    _increment("requests")
+    request.extensions["trace"] = _trace
+
+async def _on_async_request(request):
+    _increment("requests")
+    request.extensions["trace"] = _async_trace
+
+def _limits():
+    return httpx.Limits(
+        max_connections=config.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=config.OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=config.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+def get_client():
+    """Returnerar processens delade, trådsäkra OpenAI-klient"""
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                http_client = openai.DefaultHttpxClient(
+                    limits=_limits(),
+                    timeout=config.OPENAI_TIMEOUT,
+                    event_hooks={"request": [_on_request]},
+                )
+                _sync_client = openai.OpenAI(
+                    api_key=config.OPENAI_API_KEY,
+                    timeout=config.OPENAI_TIMEOUT,
+                    # Omförsök sköts av schemaläggaren i openai_utils
+                    max_retries=0,
+                    http_client=http_client,
+                )
+    return _sync_client
+
+def get_async_client():
+    """Returnerar processens delade AsyncOpenAI-klient (används via run_coroutine)"""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                http_client = openai.DefaultAsyncHttpxClient(
+                    limits=_limits(),
+                    timeout=config.OPENAI_TIMEOUT,
+                    event_hooks={"request": [_on_async_request]},
+                )
+                _async_client = openai.AsyncOpenAI(
+                    api_key=config.OPENAI_API_KEY,
+                    timeout=config.OPENAI_TIMEOUT,
+                    # Omförsök sköts av schemaläggaren i openai_utils
+                    max_retries=0,
+                    http_client=http_client,
+                )
+    return _async_client
+
+def _get_loop():
+    """Startar (vid behov) den delade händelseloopen i en daemon-tråd"""
+    global _loop, _loop_thread
+    if _loop is None:
+        with _client_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="openai-event-loop", daemon=True)
+                thread.start()
+                _loop, _loop_thread = loop, thread
+    return _loop
+
+def run_coroutine(coro, timeout=None):
+    """Kör en coroutine i den delade händelseloopen och väntar på resultatet"""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    return future.result(timeout)
+
+def get_client_stats():
+    """
+    Returnerar statistik över återanvändning av anslutningar.
+
+    Returns:
+        dict: antal anrop, nya anslutningar, TLS-handskakningar och andel återanvända anrop
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    reused = max(stats["requests"] - stats["new_connections"], 0)
+    stats["reused_connections"] = reused
+    stats["reuse_ratio"] = reused / stats["requests"] if stats["requests"] else 0.0
+    return stats
@@ -4,13 +4,22 @@ import os
 import openai
 import streamlit as st
 import requests
-import io
-import matplotlib.pyplot as plt
-import numpy as np
-import asyncio
 import concurrent.futures
+import json
+import logging
+import random
+import threading
+import time
+import asyncio
+from collections import deque
 # Centraliserad konfiguration (laddar .env)
 import config
+from backend.openai_client import get_client, get_async_client, run_coroutine
+from backend import response_cache
+from backend.token_budget import count_message_tokens, fit_history, truncate_text
+from backend.swot_diagram import parse_swot_sections, render_swot_png, render_swot_svg
+
+logger = logging.getLogger(__name__)
 
 # Sätt API-nyckeln från central konfiguration
 openai.api_key = config.OPENAI_API_KEY
@@ -19,46 +28,394 @@ openai.api_key = config.OPENAI_API_KEY
 if not openai.api_key:
     st.error("OpenAI API-nyckel saknas! Lägg till den i .env eller st.secrets.")
 
-def generate_chat_response(messages, model=None, temperature=0.7, max_tokens=1000):
+# Begränsad trådpool som delas av alla sessioner för parallella, oberoende GPT-anrop
+_llm_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=config.OPENAI_MAX_PARALLEL,
+    thread_name_prefix="llm"
+)
+
+# --- Schemaläggning mot OpenAI:s gränser (anrop och tokens per minut) ---
+# Alla anrop i processen delar samma budget. Ett anrop som skulle överskrida den väntar
+# i kö tills äldre anrop fallit ur 60-sekundersfönstret. Vid 429 pausas alla anrop enligt
+# Retry-After, och tillfälliga fel (429, timeout, anslutning, 5xx) försöks om med jitter.
+
+_RATE_WINDOW = 60.0
+_rate_cond = threading.Condition()
+_request_log = deque()   # tidpunkter för anrop inom fönstret
+_token_log = deque()     # [tidpunkt, tokens] inom fönstret
+_blocked_until = 0.0
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+def _estimate_tokens(messages, max_tokens):
+    """Tokens som ett anrop högst kan kosta: promptens tokens plus svarsbudgeten"""
+    return count_message_tokens(messages) + max_tokens
+
+def _prune_rate_logs(now):
+    while _request_log and now - _request_log[0] > _RATE_WINDOW:
+        _request_log.popleft()
+    while _token_log and now - _token_log[0][0] > _RATE_WINDOW:
+        _token_log.popleft()
+
+def _acquire(tokens):
     """
-    Anropar OpenAI ChatCompletion och returnerar ChatGPT:s svar som en sträng.
+    Väntar tills anropet ryms inom RPM- och TPM-budgeten och reserverar plats för det.
+
+    Returns:
+        list: Posten i tokenloggen, så att den kan justeras till faktisk förbrukning
+    """
+    with _rate_cond:
+        while True:
+            now = time.time()
+            _prune_rate_logs(now)
+            used_tokens = sum(entry[1] for entry in _token_log)
+            wait = _blocked_until - now
+            if wait <= 0:
+                if len(_request_log) >= config.OPENAI_RPM_LIMIT:
+                    wait = _RATE_WINDOW - (now - _request_log[0])
+                elif _token_log and used_tokens + tokens > config.OPENAI_TPM_LIMIT:
+                    wait = _RATE_WINDOW - (now - _token_log[0][0])
+                else:
+                    entry = [now, tokens]
+                    _request_log.append(now)
+                    _token_log.append(entry)
+                    return entry
+            _rate_cond.wait(timeout=max(wait, 0.05))
+
+def _record_usage(entry, response):
+    """Ersätter uppskattningen med faktiskt antal tokens när svaret innehåller usage"""
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        with _rate_cond:
+            entry[1] = usage.total_tokens
+            _rate_cond.notify_all()
+
+def _retry_delay(error, attempt):
+    """Väntetid före nästa försök: Retry-After om servern anger det, annars exponentiell backoff med jitter"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    backoff = min(config.OPENAI_BACKOFF_MAX, config.OPENAI_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(backoff / 2, backoff)
+
+def _pause_all(delay):
+    """Pausar alla anrop i processen efter en 429 så att kön inte fortsätter hamra på API:t"""
+    global _blocked_until
+    with _rate_cond:
+        _blocked_until = max(_blocked_until, time.time() + delay)
+
+def _call_with_retry(create, tokens):
+    """
+    Kör create() inom hastighetsbudgeten och försöker om vid tillfälliga fel.
+    Kastar det sista felet om alla försök misslyckas.
+    """
+    for attempt in range(config.OPENAI_MAX_RETRIES + 1):
+        entry = _acquire(tokens)
+        try:
+            response = create()
+        except RETRYABLE_ERRORS as e:
+            if attempt == config.OPENAI_MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            if isinstance(e, openai.RateLimitError):
+                _pause_all(delay)
+            logger.warning(f"Tillfälligt fel från OpenAI ({type(e).__name__}), nytt försök om {delay:.1f} s")
+            time.sleep(delay)
+            continue
+        _record_usage(entry, response)
+        return response
+
+async def _async_call_with_retry(create, tokens):
+    """Asynkron motsvarighet till _call_with_retry (create returnerar en coroutine)"""
+    loop = asyncio.get_running_loop()
+    for attempt in range(config.OPENAI_MAX_RETRIES + 1):
+        # Vänta på budgeten utan att blockera händelseloopen
+        entry = await loop.run_in_executor(None, _acquire, tokens)
+        try:
+            response = await create()
+        except RETRYABLE_ERRORS as e:
+            if attempt == config.OPENAI_MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            if isinstance(e, openai.RateLimitError):
+                _pause_all(delay)
+            await asyncio.sleep(delay)
+            continue
+        _record_usage(entry, response)
+        return response
+
+SYSTEM_PROMPT = "Du är en futuristisk företagsrådgivare som pratar svenska. Du är hjälpsam, kreativ och ger specifika, relevanta och personliga råd baserat på användarens situation. Använd aktuella affärstrender och exempel på framgångsrika företag när det är relevant."
+
+def _chat_completion(messages, model=None, temperature=0.7, max_tokens=1000):
+    """
+    Gör ett ChatCompletion-anrop via svarscachen och schemaläggaren.
+    Kastar undantaget om anropet misslyckas (inga Streamlit-anrop).
     """
     if model is None:
         model = config.MODEL
-    try:
-        # Sätt timeouts för att hantera långsamma API-svar
-        client = openai.OpenAI(timeout=60.0)
-        response = client.chat.completions.create(
+    cache_key = response_cache.make_key(model, messages, temperature, max_tokens)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    # Delad klient med anslutningspool (timeouts sätts i config)
+    client = get_client()
+    response = _call_with_retry(
+        lambda: client.chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens
-        )
-        return response.choices[0].message.content
+        ),
+        _estimate_tokens(messages, max_tokens)
+    )
+    content = response.choices[0].message.content
+    response_cache.put(cache_key, content)
+    return content
+
+def generate_chat_response(messages, model=None, temperature=0.7, max_tokens=1000):
+    """
+    Anropar OpenAI ChatCompletion och returnerar ChatGPT:s svar som en sträng.
+    Anropet köas inom RPM/TPM-budgeten och försöks om vid tillfälliga fel.
+    Bara lyckade svar sparas i svarscachen.
+    """
+    try:
+        return _chat_completion(messages, model, temperature, max_tokens)
     except Exception as e:
         st.error(f"Ett fel uppstod i GPT-anropet: {e}")
         return f"Kunde inte generera svar p.g.a. fel: {e}"
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def generate_chatgpt_response(prompt, history=None, temperature=0.7):
+def _stream_completion(messages, model=None, temperature=0.7, max_tokens=1000):
     """
-    Anropar OpenAI ChatCompletion och returnerar ChatGPT:s svar som en sträng.
-    Med cachning för att förbättra laddningstider.
+    Strömmande ChatCompletion via svarscachen och schemaläggaren.
+    Kastar undantaget om anropet misslyckas (inga Streamlit-anrop) och sparar
+    hela svaret i svarscachen först när strömmen är klar.
     """
-    if history is None:
-        history = []
-    
+    if model is None:
+        model = config.MODEL
+    cache_key = response_cache.make_key(model, messages, temperature, max_tokens)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    client = get_client()
+    # Bara öppnandet av strömmen försöks om – efter första textbiten går det inte att börja om
+    stream = _call_with_retry(
+        lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        ),
+        _estimate_tokens(messages, max_tokens)
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            yield delta
+    response_cache.put(cache_key, "".join(parts))
+
+def stream_chat_response(messages, model=None, temperature=0.7, max_tokens=1000):
+    """
+    Strömmande variant av generate_chat_response.
+    Ger textbitarna i takt med att modellen genererar dem och sparar hela svaret
+    i svarscachen när strömmen är klar.
+    """
+    try:
+        yield from _stream_completion(messages, model, temperature, max_tokens)
+    except Exception as e:
+        st.error(f"Ett fel uppstod i GPT-anropet: {e}")
+        yield f"Kunde inte generera svar p.g.a. fel: {e}"
+
+def _build_messages(prompt, history=None):
+    """Bygger meddelandelistan med systemprompt, historik och aktuell fråga"""
     messages = [
-        {"role": "system", "content": "Du är en futuristisk företagsrådgivare som pratar svenska. Du är hjälpsam, kreativ och ger specifika, relevanta och personliga råd baserat på användarens situation. Använd aktuella affärstrender och exempel på framgångsrika företag när det är relevant."}
+        {"role": "system", "content": SYSTEM_PROMPT}
     ]
     
-    # Lägg till konversationshistorik
-    messages.extend(history)
+    # Lägg till konversationshistorik – bara de senaste turerna som ryms i tokenbudgeten
+    messages.extend(fit_history(history))
     
     # Lägg till aktuell fråga
     messages.append({"role": "user", "content": prompt})
-    
-    return generate_chat_response(messages, temperature=temperature)
+    return messages
+
+def generate_chatgpt_response(prompt, history=None, temperature=0.7):
+    """
+    Anropar OpenAI ChatCompletion och returnerar ChatGPT:s svar som en sträng.
+    Upprepade prompts besvaras från den beständiga svarscachen.
+    """
+    return generate_chat_response(_build_messages(prompt, history), temperature=temperature)
+
+def chatgpt_completion(prompt, history=None, temperature=0.7):
+    """
+    Trådsäker variant av generate_chatgpt_response för bakgrundsjobb och parallella anrop.
+    Kastar undantaget vid fel i stället för att visa det, så att jobbet markeras som misslyckat.
+    """
+    return _chat_completion(_build_messages(prompt, history), temperature=temperature)
+
+def stream_chatgpt_completion(prompt, history=None, temperature=0.7):
+    """Strömmande variant av chatgpt_completion för bakgrundsjobb – kastar undantag vid fel"""
+    return _stream_completion(_build_messages(prompt, history), temperature=temperature)
+
+def stream_chatgpt_response(prompt, history=None, temperature=0.7):
+    """Strömmande variant av generate_chatgpt_response (generator över textbitar)"""
+    return stream_chat_response(_build_messages(prompt, history), temperature=temperature)
+
+SUMMARY_PROMPT = (
+    "Du sammanfattar en pågående rådgivningskonversation om en affärsidé. "
+    "Uppdatera den befintliga sammanfattningen med de nya meddelandena. "
+    "Behåll fakta, siffror, beslut och öppna frågor; skriv kortfattat på svenska i punktform, "
+    "högst 200 ord."
+)
+
+def summarize_conversation(summary, messages):
+    """
+    Uppdaterar en löpande sammanfattning med nya konversationsturer.
+    Trådsäker (körs som bakgrundsjobb) och kastar undantag vid fel så att en
+    misslyckad sammanfattning aldrig ersätter den gamla.
+
+    Returns:
+        str: Den nya sammanfattningen
+    """
+    turns = "\n\n".join(
+        f"{m.get('role', 'user')}: {truncate_text(str(m.get('content', '')), config.HISTORY_TURN_MAX_TOKENS)}"
+        for m in messages
+    )
+    request = [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": f"Befintlig sammanfattning:\n{summary or '(ingen ännu)'}\n\nNya meddelanden:\n{turns}"}
+    ]
+    return _chat_completion(request, temperature=0.2, max_tokens=400)
+
+# Schema för en konkurrent med uppskattad marknadsandel (används av flera sidor)
+COMPETITOR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "share": {"type": "number"},
+        "description": {"type": "string"}
+    },
+    "required": ["name", "share", "description"],
+    "additionalProperties": False
+}
+
+def _matches_schema(value, schema):
+    """Enkel validering av ett JSON-värde mot den delmängd av JSON Schema som används här"""
+    expected = schema.get("type")
+    if "enum" in schema and value not in schema["enum"]:
+        return False
+    if expected == "object":
+        if not isinstance(value, dict):
+            return False
+        properties = schema.get("properties", {})
+        if any(key not in value for key in schema.get("required", [])):
+            return False
+        if schema.get("additionalProperties") is False and any(key not in properties for key in value):
+            return False
+        return all(_matches_schema(value[key], sub) for key, sub in properties.items() if key in value)
+    if expected == "array":
+        return isinstance(value, list) and all(_matches_schema(item, schema.get("items", {})) for item in value)
+    if expected == "string":
+        return isinstance(value, str)
+    if expected == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if expected == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if expected == "boolean":
+        return isinstance(value, bool)
+    return True
+
+def generate_structured(prompt, schema, name="svar", history=None, model=None, temperature=0.3, max_tokens=1500):
+    """
+    Ber modellen svara med JSON enligt ett schema (structured outputs) och returnerar det tolkade objektet.
+
+    Args:
+        prompt (str): Frågan till modellen
+        schema (dict): JSON Schema för svaret (objekt på toppnivå, strict-kompatibelt)
+        name (str): Namn på schemat i anropet
+
+    Returns:
+        dict: Svaret som validerats mot schemat, eller None om anropet eller valideringen misslyckades
+    """
+    if model is None:
+        model = config.MODEL
+    messages = _build_messages(prompt, history)
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": schema, "strict": True}
+    }
+    cache_key = response_cache.make_key(model, messages, temperature, max_tokens, response_format)
+    content = response_cache.get(cache_key)
+    from_cache = content is not None
+    if not from_cache:
+        try:
+            client = get_client()
+            response = _call_with_retry(
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format=response_format
+                ),
+                _estimate_tokens(messages, max_tokens)
+            )
+            content = response.choices[0].message.content
+        except Exception as e:
+            logger.error(f"Strukturerat GPT-anrop '{name}' misslyckades: {e}")
+            return None
+
+    # En enda validerande tolkning – ogiltiga svar cachas aldrig
+    try:
+        data = json.loads(content or "")
+    except ValueError:
+        logger.warning(f"Strukturerat GPT-svar '{name}' var inte giltig JSON")
+        return None
+    if not _matches_schema(data, schema):
+        logger.warning(f"Strukturerat GPT-svar '{name}' följde inte schemat")
+        return None
+    if not from_cache:
+        response_cache.put(cache_key, content)
+    return data
+
+def iter_parallel(tasks):
+    """
+    Startar alla oberoende anrop direkt och ger resultaten i den ordning de blir klara.
+
+    Args:
+        tasks (dict): nyckel -> (funktion, argument-tuple)
+
+    Returns:
+        generator: (nyckel, resultat) – resultatet är None om anropet misslyckades
+    """
+    futures = {
+        _llm_executor.submit(func, *args): key
+        for key, (func, args) in tasks.items()
+    }
+    return _iter_completed(futures)
+
+def _iter_completed(futures):
+    for future in concurrent.futures.as_completed(futures):
+        key = futures[future]
+        try:
+            yield key, future.result()
+        except Exception as e:
+            logger.error(f"Parallellt anrop '{key}' misslyckades: {e}")
+            yield key, None
 
 def search_web(query):
     """
@@ -93,10 +450,9 @@ def generate_logo(business_name, business_type):
     except Exception as e:
         return f"Kunde inte generera logotyp: {str(e)}"
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def generate_swot_analysis(data):
-    """Genererar en SWOT-analys baserat på affärsdata"""
-    prompt = f"""
+def _swot_prompt(data):
+    """Bygger prompten för SWOT-analysen"""
+    return f"""
     Gör en detaljerad SWOT-analys för ett företag som säljer {data.get('produktutbud', 'produkter')} 
     i {data.get('stad', 'en stad')} med målgruppen {data.get('malgrupp', 'konsumenter')} 
     och en {data.get('strategi', 'ospecificerad')}-strategi.
@@ -109,107 +465,28 @@ def generate_swot_analysis(data):
     
     Basera analysen på konkret marknadsinformation och branschinsikter.
     """
-    
-    swot_text = generate_chatgpt_response(prompt)
+
+def generate_swot_analysis(data):
+    """Genererar en SWOT-analys baserat på affärsdata"""
+    swot_text = generate_chatgpt_response(_swot_prompt(data))
     return swot_text
 
+def swot_analysis_completion(data):
+    """Trådsäker variant av generate_swot_analysis som kastar undantag vid fel (för bakgrundsjobb)"""
+    return chatgpt_completion(_swot_prompt(data))
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def create_swot_diagram(swot_text):
-    """Skapar en visuell SWOT-diagram från text med optimerad minneshantering"""
-    # Extrahera sektioner från SWOT-texten
-    sections = {}
-    current_section = None
-    current_content = []
-    
-    for line in swot_text.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-            
-        if any(keyword in line.lower() for keyword in ['styrkor', 'strength']):
-            current_section = 'Styrkor'
-            current_content = []
-        elif any(keyword in line.lower() for keyword in ['svagheter', 'weakness']):
-            if current_section and current_content:
-                sections[current_section] = current_content
-            current_section = 'Svagheter'
-            current_content = []
-        elif any(keyword in line.lower() for keyword in ['möjligheter', 'opportunit']):
-            if current_section and current_content:
-                sections[current_section] = current_content
-            current_section = 'Möjligheter'
-            current_content = []
-        elif any(keyword in line.lower() for keyword in ['hot', 'threat']):
-            if current_section and current_content:
-                sections[current_section] = current_content
-            current_section = 'Hot'
-            current_content = []
-        elif current_section and line.startswith(('•', '-', '*', '1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.')):
-            # Rensa bort punktlistetecken
-            item = line.lstrip('•-*123456789. ')
-            current_content.append(item)
-    
-    # Lägg till den sista sektionen
-    if current_section and current_content:
-        sections[current_section] = current_content
-    
-    # Använd en mindre figurstorlek för bättre minnes- och prestanda-hantering
-    plt.close('all')  # Stäng alla öppna figurer för att frigöra minne
-    fig, axs = plt.subplots(2, 2, figsize=(10, 8), dpi=100)
-    fig.patch.set_facecolor('#f0f0f0')
-    
-    # Definiera färger för varje sektion
-    colors = {
-        'Styrkor': '#4CAF50',      # Grön
-        'Svagheter': '#F44336',    # Röd
-        'Möjligheter': '#2196F3',  # Blå
-        'Hot': '#FF9800'           # Orange
-    }
-    
-    # Titlar och innehåll för varje kvadrant
-    sections_order = ['Styrkor', 'Svagheter', 'Möjligheter', 'Hot']
-    positions = [(0, 0), (0, 1), (1, 0), (1, 1)]
-    
-    for (section, pos) in zip(sections_order, positions):
-        i, j = pos
-        ax = axs[i, j]
-        
-        # Sätt bakgrundsfärg
-        ax.set_facecolor(colors.get(section, '#EEEEEE') + '22')  # Lägg till transparens
-        
-        # Sätt titel
-        ax.set_title(section, fontsize=14, fontweight='bold', color=colors.get(section, '#333333'))
-        
-        # Lägg till innehåll
-        content = sections.get(section, ['Ingen information tillgänglig'])
-        y_pos = 0.9
-        for item in content[:5]:  # Begränsa till max 5 punkter för bättre läsbarhet och prestanda
-            if len(item) > 55:
-                item = item[:52] + '...'  # Begränsa textlängd för visning och prestanda
-            ax.text(0.1, y_pos, f"• {item}", fontsize=9, va='top', wrap=True)
-            y_pos -= 0.15
-        
-        # Ta bort axlar
-        ax.set_xticks([])
-        ax.set_yticks([])
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['bottom'].set_visible(False)
-        ax.spines['left'].set_visible(False)
-    
-    plt.tight_layout()
-    
-    # Spara figuren till en buffer med begränsad upplösning för bättre prestanda
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=120, bbox_inches='tight')
-    buf.seek(0)
-    plt.close(fig)  # Stäng figuren omedelbart för att frigöra minne
-    
-    return buf
+    """Skapar ett SWOT-diagram (PNG) från text, ritat direkt med Pillow"""
+    return render_swot_png(parse_swot_sections(swot_text))
 
 @st.cache_data(ttl=3600, show_spinner=False)
+def create_swot_svg(swot_text, responsive=False):
+    """Skapar ett SWOT-diagram som SVG (vektor) för webbvisningen"""
+    return render_swot_svg(parse_swot_sections(swot_text), responsive=responsive)
+
 def generate_company_manifest(data):
-    """Genererar ett företagsmanifest med parallell bearbetning för bättre prestanda"""
+    """Genererar ett företagsmanifest (trådsäker, avsedd att köras som bakgrundsjobb)"""
     prompt = f"""
     Skapa ett inspirerande och kraftfullt företagsmanifest för ett företag som säljer {data.get('produktutbud', 'produkter')} 
     med fokus på {data.get('malgrupp', 'kunder')} och en {data.get('strategi', 'ospecificerad')}-strategi.
@@ -224,15 +501,9 @@ def generate_company_manifest(data):
     Manifestet ska vara omkring 250-300 ord långt.
     """
     
-    # Skapa en executor för att köra anropet i en separat tråd
-    # Detta förhindrar att UI:t blockeras medan vi väntar på svaret
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future = executor.submit(generate_chatgpt_response, prompt)
-        # Visa en spinner medan vi väntar
-        with st.spinner("Genererar företagsmanifest..."):
-            manifest = future.result()
-    
-    return manifest
+    # Körs som bakgrundsjobb från sidan (backend.jobs) – inga Streamlit-anrop här,
+    # och fel kastas vidare så att jobbet markeras som misslyckat
+    return chatgpt_completion(prompt)
 
 # Asynkrona hjälpfunktioner för framtida användning
 async def async_generate_chat_response(messages, model=None, temperature=0.7, max_tokens=1000):
@@ -240,13 +511,16 @@ async def async_generate_chat_response(messages, model=None, temperature=0.7, ma
     if model is None:
         model = config.MODEL
     try:
-        # Skapa en klient med timeouts
-        client = openai.AsyncOpenAI(timeout=60.0)
-        response = await client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens
+        # Delad asynkron klient med anslutningspool
+        client = get_async_client()
+        response = await _async_call_with_retry(
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            _estimate_tokens(messages, max_tokens)
         )
         return response.choices[0].message.content
     except Exception as e:
@@ -255,10 +529,5 @@ async def async_generate_chat_response(messages, model=None, temperature=0.7, ma
 
 # Hjälpfunktion för att köra asynkrona anrop från synkron kod
 def run_async(async_func, *args, **kwargs):
-    """Kör en asynkron funktion från synkron kod"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(async_func(*args, **kwargs))
-    finally:
-        loop.close()
+    """Kör en asynkron funktion från synkron kod i den delade händelseloopen"""
+    return run_coroutine(async_func(*args, **kwargs))
@@ -1,19 +1,17 @@
 # backend/pdf_utils.py
 
-import tempfile
 import os
-import base64
-from fpdf import FPDF
 from datetime import datetime
-import requests
 import uuid
 import io
-from PIL import Image
 import streamlit as st
+from backend import asset_store
 
 @st.cache_data(ttl=3600)
 def create_pdf_report(data, swot_text=None, swot_image=None, manifest=None, logo_url=None):
-    """Skapar en PDF-rapport med all affärsplansinformation"""
+    """Skapar en PDF-rapport med all affärsplansinformation och returnerar den som bytes"""
+    # fpdf importeras först när en PDF faktiskt skapas
+    from fpdf import FPDF
     pdf = FPDF()
     # Sätt UTF-8 som kodning för att hantera specialtecken
     pdf.add_page()
@@ -29,36 +27,16 @@ def create_pdf_report(data, swot_text=None, swot_image=None, manifest=None, logo
     
     # Logotyp om tillgänglig
     if logo_url:
-        try:
-            # Ladda ner logotypbild med timeout
-            response = requests.get(logo_url, timeout=10)
-            if response.status_code == 200:
-                # Använd temporär fil med context manager för att säkerställa rensning
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-                    temp_file.write(response.content)
-                    temp_path = temp_file.name
-                
-                try:
-                    # Använd PIL för att optimera bilden före infogning
-                    with Image.open(temp_path) as img:
-                        # Kontrollera att bilden inte är för stor
-                        if img.width > 300 or img.height > 300:
-                            img.thumbnail((300, 300))
-                        img.save(temp_path, optimize=True)
-                    
-                    # Lägg till logotypen i PDF
-                    pdf.image(temp_path, x=80, y=30, w=50)
-                    pdf.ln(60)  # Lägg till utrymme efter logotypen
-                except Exception as e:
-                    # Logga felet men fortsätt processen
-                    print(f"Fel vid bildbehandling: {e}")
-                finally:
-                    # Rensa temporära filer oavsett om det var framgångsrikt eller inte
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                    
-        except Exception as e:
-            print(f"Kunde inte lägga till logotyp: {e}")
+        # Färdigskalad 300px-version från bildlagret – hämtas bara första gången
+        logo_bytes = asset_store.get_pdf_image(logo_url)
+        if logo_bytes:
+            try:
+                # Lägg till logotypen i PDF
+                pdf.image(io.BytesIO(logo_bytes), x=80, y=30, w=50)
+                pdf.ln(60)  # Lägg till utrymme efter logotypen
+            except Exception as e:
+                # Logga felet men fortsätt processen
+                print(f"Kunde inte lägga till logotyp: {e}")
     
     # Grundläggande information
     pdf.set_font("Arial", "B", 16)
@@ -121,23 +99,11 @@ def create_pdf_report(data, swot_text=None, swot_image=None, manifest=None, logo
         # Om det finns en bild av SWOT-diagrammet
         if swot_image:
             try:
-                # Använd temporär fil med context manager för SWOT-bilden
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-                    temp_file.write(swot_image.getvalue())
-                    swot_img_path = temp_file.name
-                
-                try:
-                    # Försök lägga till bilden
-                    pdf.image(swot_img_path, x=10, y=None, w=190)
-                    pdf.ln(140)  # Lägg till tillräckligt med utrymme efter bilden
-                except Exception as e:
-                    print(f"Fel vid infogning av SWOT-bild: {e}")
-                finally:
-                    # Rensa temporära filer
-                    if os.path.exists(swot_img_path):
-                        os.remove(swot_img_path)
+                # Bilden skickas direkt från bufferten till FPDF
+                pdf.image(io.BytesIO(swot_image.getvalue()), x=10, y=None, w=190)
+                pdf.ln(140)  # Lägg till tillräckligt med utrymme efter bilden
             except Exception as e:
-                print(f"Kunde inte hantera SWOT-bild: {e}")
+                print(f"Fel vid infogning av SWOT-bild: {e}")
         
         # Detaljerad SWOT-text
         pdf.set_font("Arial", "", 12)
@@ -163,21 +129,30 @@ def create_pdf_report(data, swot_text=None, swot_image=None, manifest=None, logo
     now = datetime.now().strftime("%Y-%m-%d")
     pdf.cell(0, 10, f"Genererad {now} | {company_name} Affärsplan", 0, 0, 'C')
     
-    # Använd en tydlig filnam-struktur och spara i tempkatalogen
+    # Returnera PDF:en som bytes i stället för att skriva den till disk
+    return bytes(pdf.output())
+
+def pdf_filename(prefix="affarsplan"):
+    """Skapar ett filnamn med tidsstämpel för nedladdning"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    temp_pdf_path = os.path.join(tempfile.gettempdir(), f"affarsplan_{timestamp}.pdf")
-    pdf.output(temp_pdf_path)
-    
-    return temp_pdf_path
+    return f"{prefix}_{timestamp}.pdf"
 
-def get_pdf_download_link(file_path, text="Ladda ner PDF"):
-    """Genererar en länk för att ladda ner PDF-filen"""
-    with open(file_path, "rb") as f:
-        pdf_bytes = f.read()
-    
-    b64 = base64.b64encode(pdf_bytes).decode()
-    href = f'<a href="data:application/pdf;base64,{b64}" download="{os.path.basename(file_path)}">{text}</a>'
-    return href
+def pdf_download_button(pdf_bytes, label="Ladda ner PDF", filename=None, key=None):
+    """
+    Visar en nedladdningsknapp för PDF:en.
+
+    Till skillnad från en base64-länk skickas inte filen med i varje sidrendering:
+    Streamlit lagrar bytes en gång i sin mediahanterare och webbläsaren hämtar dem
+    som en vanlig binär HTTP-nedladdning först när användaren klickar.
+    """
+    filename = filename or pdf_filename()
+    return st.download_button(
+        label,
+        data=pdf_bytes,
+        file_name=os.path.basename(filename),
+        mime="application/pdf",
+        key=key
+    )
 
 def simple_pdf_report(title, content, output_filename="rapport.pdf"):
     """
@@ -185,6 +160,7 @@ def simple_pdf_report(title, content, output_filename="rapport.pdf"):
     content förväntas vara en sträng eller lista av strängar.
     Returnerar sökvägen till den genererade PDF-filen.
     """
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.add_page()
     
@@ -0,0 +1,113 @@
+# backend/places_cache.py
+# Beständig cache för Google Places-sökningar.
+# Nyckeln är den normaliserade frågan och max_results, så "Konkurrent AB in Stockholm" och
+# "konkurrent ab  in stockholm" delar post. Både träffar och tomma svar sparas, med olika TTL:
+# tomma svar går ut snabbare eftersom en ny konkurrent kan dyka upp i Places.
+# Misslyckade anrop (nätverks- eller HTTP-fel) sparas aldrig.
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import config
+from backend.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(config.CACHE_DIR, "places.sqlite3")
+HIT_TTL = config.PLACES_CACHE_TTL
+EMPTY_TTL = config.PLACES_CACHE_EMPTY_TTL
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    query TEXT NOT NULL,
+    max_results INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    empty INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (query, max_results)
+);
+"""
+
+def _connection():
+    return get_connection(DB_PATH, _SCHEMA)
+
+def normalize_query(query):
+    """Normaliserar en sökfråga (gemener, enkla mellanslag) för cache-nyckeln"""
+    return " ".join(query.lower().split())
+
+def _expired(empty, created_at, now):
+    return now - created_at > (EMPTY_TTL if empty else HIT_TTL)
+
+def get_many(queries, max_results):
+    """
+    Slår upp flera sökfrågor på en gång.
+
+    Returns:
+        dict: {fråga: lista med platser} för de frågor som finns i cachen (tomma listor inräknade)
+    """
+    if not queries:
+        return {}
+    normalized = {}
+    for q in queries:
+        normalized.setdefault(normalize_query(q), []).append(q)
+    now = time.time()
+    found = {}
+    try:
+        conn = _connection()
+        placeholders = ",".join("?" * len(normalized))
+        rows = conn.execute(
+            f"SELECT query, value, empty, created_at FROM places "
+            f"WHERE max_results = ? AND query IN ({placeholders})",
+            (max_results, *normalized),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte läsa från platscachen: {e}")
+        return {}
+
+    for query, value, empty, created_at in rows:
+        if _expired(empty, created_at, now):
+            continue
+        places = json.loads(value)
+        for original in normalized[query]:
+            found[original] = places
+    return found
+
+def put_many(results, max_results):
+    """Sparar {fråga: lista med platser} – tomma listor sparas som negativa träffar"""
+    if not results:
+        return
+    now = time.time()
+    rows = [
+        (normalize_query(query), max_results, json.dumps(places, ensure_ascii=False), int(not places), now)
+        for query, places in results.items()
+    ]
+    try:
+        conn = _connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO places (query, max_results, value, empty, created_at) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        # Rensa utgångna poster
+        conn.execute(
+            "DELETE FROM places WHERE (empty = 1 AND created_at < ?) OR (empty = 0 AND created_at < ?)",
+            (now - EMPTY_TTL, now - HIT_TTL),
+        )
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte skriva till platscachen: {e}")
+
+def get(query, max_results):
+    """Returnerar cachade platser för en fråga, eller None om den saknas eller har gått ut"""
+    return get_many([query], max_results).get(query)
+
+def put(query, max_results, places):
+    """Sparar resultatet för en fråga"""
+    put_many({query: places}, max_results)
+
+def clear():
+    """Tömmer platscachen"""
+    try:
+        _connection().execute("DELETE FROM places")
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte tömma platscachen: {e}")
@@ -0,0 +1,178 @@
+# backend/response_cache.py
+# Beständig cache för GPT-svar med innehållsadresserade nycklar.
+# Nyckeln är en hash av (modell, meddelanden, temperatur, max_tokens), så samma prompt
+# ger samma nyckel oavsett process, omstart eller om svaret strömmades.
+# Svaren lagras i SQLite (delas mellan processer på samma maskin) med TTL, LRU-rensning
+# och ett tak för total storlek. Ett litet minneslager framför databasen tar de
+# vanligaste träffarna utan diskåtkomst.
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import config
+from backend.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(config.CACHE_DIR, "llm_responses.sqlite3")
+CACHE_TTL = config.RESPONSE_CACHE_TTL
+CACHE_MAX_BYTES = int(config.RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+MEMORY_MAX_ENTRIES = 256
+# Rensningen (utgångna poster och storlekstaket) körs bara var N:e skrivning
+EVICT_EVERY_PUTS = 50
+# Träffar i minneslagret skrivs till accessed_at i omgångar
+TOUCH_BATCH_SIZE = 32
+TOUCH_FLUSH_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at);
+"""
+
+_lock = threading.Lock()
+_memory = OrderedDict()
+_touched = {}          # nyckel -> senaste träff i minneslagret, ännu inte skriven till databasen
+_last_flush = 0.0
+_puts_since_evict = 0
+
+def _connection():
+    return get_connection(DB_PATH, _SCHEMA)
+
+def make_key(model, messages, temperature, max_tokens, response_format=None):
+    """Skapar en stabil cache-nyckel för ett GPT-anrop"""
+    request = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+    if response_format is not None:
+        request["response_format"] = response_format
+    payload = json.dumps(
+        request,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _remember(key, value, created_at):
+    with _lock:
+        _memory[key] = (value, created_at)
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+def _take_touched(now, force=False):
+    """Returnerar minnesträffarna som ska skrivas nu (anropas med _lock hållet)"""
+    global _last_flush
+    if not _touched or (
+        not force and len(_touched) < TOUCH_BATCH_SIZE and now - _last_flush < TOUCH_FLUSH_INTERVAL
+    ):
+        return []
+    batch = [(accessed_at, key) for key, accessed_at in _touched.items()]
+    _touched.clear()
+    _last_flush = now
+    return batch
+
+def _flush_touched(conn, batch):
+    """Uppdaterar accessed_at för träffar i minneslagret, så att LRU-rensningen ser dem"""
+    if batch:
+        conn.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?", batch)
+
+def get(key):
+    """Returnerar det cachade svaret för nyckeln, eller None om det saknas eller har gått ut"""
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if now - entry[1] <= CACHE_TTL:
+                _memory.move_to_end(key)
+                _touched[key] = now
+                batch = _take_touched(now)
+                value = entry[0]
+            else:
+                del _memory[key]
+                entry = None
+    if entry is not None:
+        try:
+            _flush_touched(_connection(), batch)
+        except sqlite3.Error as e:
+            logger.warning(f"Kunde inte uppdatera svarscachen: {e}")
+        return value
+
+    try:
+        conn = _connection()
+        row = conn.execute(
+            "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if now - created_at > CACHE_TTL:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        # Uppdatera senaste åtkomst för LRU-rensningen
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte läsa från svarscachen: {e}")
+        return None
+
+    _remember(key, value, created_at)
+    return value
+
+def put(key, value):
+    """Sparar ett svar i cachen och rensar gamla poster (var EVICT_EVERY_PUTS:e gång)"""
+    global _puts_since_evict
+    now = time.time()
+    _remember(key, value, now)
+    with _lock:
+        evict = _puts_since_evict % EVICT_EVERY_PUTS == 0
+        _puts_since_evict += 1
+        batch = _take_touched(now, force=evict)
+    try:
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value.encode("utf-8")), now, now),
+        )
+        _flush_touched(conn, batch)
+        if evict:
+            _evict(conn, now)
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte skriva till svarscachen: {e}")
+
+def _evict(conn, now):
+    """Tar bort utgångna poster och därefter de minst nyligen använda tills cachen ryms"""
+    conn.execute("DELETE FROM responses WHERE created_at < ?", (now - CACHE_TTL,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    while total > CACHE_MAX_BYTES:
+        rows = conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 50"
+        ).fetchall()
+        if not rows:
+            break
+        victims = []
+        for key, size in rows:
+            if total <= CACHE_MAX_BYTES:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+def clear():
+    """Tömmer hela svarscachen"""
+    with _lock:
+        _memory.clear()
+        _touched.clear()
+    try:
+        _connection().execute("DELETE FROM responses")
+    except sqlite3.Error as e:
+        logger.warning(f"Kunde inte tömma svarscachen: {e}")
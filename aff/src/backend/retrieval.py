@@ -0,0 +1,228 @@
+# backend/retrieval.py
+# Lokal sökning i vägledningstexterna (Almi/Vinnova, investerarfrågor) i random/.
+# Texterna delas upp i stycken och indexeras med BM25. Viktmatrisen sparas som .npy
+# och minnesmappas vid start, så bara de mest relevanta styckena – inte hela korpusen –
+# behöver läggas in i prompterna. Nya .txt/.md-filer i katalogen plockas upp automatiskt:
+# indexet byggs om när filernas namn, storlek eller ändringstid skiljer sig från manifestet.
+
+import json
+import logging
+import os
+import re
+import threading
+import numpy as np
+import config
+from backend.token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.path.join(config.CACHE_DIR, "retrieval")
+MATRIX_PATH = os.path.join(INDEX_DIR, "weights.npy")
+META_PATH = os.path.join(INDEX_DIR, "index.json")
+INDEX_VERSION = 1
+SUFFIXES = (".txt", ".md")
+
+# BM25-parametrar
+K1 = 1.5
+B = 0.75
+# Enkel stamning: ord kortas till sina första tecken så att t.ex. "affärsplan" och
+# "affärsplanen" räknas som samma term
+STEM_LENGTH = 7
+MIN_TOKEN_LENGTH = 2
+
+STOPWORDS = {
+    "och", "att", "det", "som", "en", "ett", "på", "är", "av", "för", "med", "till", "den",
+    "har", "de", "om", "inte", "vi", "ni", "kan", "ska", "var", "hur", "vad", "eller", "så",
+    "men", "sig", "sin", "sina", "från", "vid", "även", "dem", "då", "där", "när", "också",
+    "the", "and", "of", "to", "in", "a", "is", "for", "on", "with",
+}
+# Källrader som "almi.se" eller "vinnova.se" bär ingen information i sig
+_SOURCE_LINE = re.compile(r"^[\w.-]+\.(se|com|org|eu|net)$", re.IGNORECASE)
+_WORD = re.compile(r"\w+")
+
+_lock = threading.Lock()
+_index = None
+
+def _tokenize(text):
+    """Delar upp text i normaliserade termer"""
+    return [
+        word[:STEM_LENGTH]
+        for word in _WORD.findall(text.lower())
+        if len(word) >= MIN_TOKEN_LENGTH and word not in STOPWORDS and not word.isdigit()
+    ]
+
+def _source_files():
+    """Listar korpusfilerna i KNOWLEDGE_DIR (sorterade för stabil ordning)"""
+    try:
+        names = sorted(os.listdir(config.KNOWLEDGE_DIR))
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(config.KNOWLEDGE_DIR, name)
+        for name in names
+        if name.lower().endswith(SUFFIXES)
+    ]
+
+def _fingerprint(paths):
+    """Namn, storlek och ändringstid för korpusfilerna – ändras något byggs indexet om"""
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.basename(path), stat.st_size, int(stat.st_mtime)])
+    return {"version": INDEX_VERSION, "chunk_chars": config.RETRIEVAL_CHUNK_CHARS, "files": fingerprint}
+
+def _chunk(text, source):
+    """
+    Delar en text i stycken om ungefär RETRIEVAL_CHUNK_CHARS tecken.
+    Rader slås ihop tills gränsen nås, så rubriker hamnar tillsammans med sin text.
+    """
+    chunks = []
+    current = []
+    length = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or _SOURCE_LINE.match(line):
+            continue
+        if current and length + len(line) > config.RETRIEVAL_CHUNK_CHARS:
+            chunks.append({"source": source, "text": "\n".join(current)})
+            current = []
+            length = 0
+        current.append(line)
+        length += len(line) + 1
+    if current:
+        chunks.append({"source": source, "text": "\n".join(current)})
+    return chunks
+
+def _build(paths):
+    """
+    Bygger BM25-indexet för filerna.
+
+    Returns:
+        tuple: (chunks, vocabulary, viktmatris med en rad per stycke och en kolumn per term)
+    """
+    chunks = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            chunks.extend(_chunk(f.read(), os.path.basename(path)))
+
+    vocabulary = {}
+    documents = []
+    for chunk in chunks:
+        terms = _tokenize(chunk["text"])
+        documents.append(terms)
+        for term in terms:
+            vocabulary.setdefault(term, len(vocabulary))
+
+    weights = np.zeros((len(chunks), len(vocabulary)), dtype=np.float32)
+    if not chunks or not vocabulary:
+        return chunks, vocabulary, weights
+
+    for row, terms in enumerate(documents):
+        for term in terms:
+            weights[row, vocabulary[term]] += 1
+    doc_lengths = weights.sum(axis=1, keepdims=True)
+    avg_length = max(float(doc_lengths.mean()), 1.0)
+    doc_freq = np.count_nonzero(weights, axis=0)
+    idf = np.log(1 + (len(chunks) - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+    # Förberäknade BM25-vikter: en fråga poängsätts genom att summera kolumnerna för dess termer
+    norm = K1 * (1 - B + B * doc_lengths / avg_length)
+    weights = idf * weights * (K1 + 1) / (weights + norm)
+    return chunks, vocabulary, weights.astype(np.float32)
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def _save(fingerprint, chunks, vocabulary, weights):
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    meta = {"fingerprint": fingerprint, "chunks": chunks, "vocabulary": vocabulary}
+    # Matrisen skrivs först och metadatan sist, så en halvfärdig skrivning aldrig ser giltig ut
+    _write_atomic(MATRIX_PATH, lambda f: np.save(f, weights))
+    _write_atomic(META_PATH, lambda f: f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8")))
+
+def _load(fingerprint):
+    """Läser ett sparat index om det matchar korpusen, annars None"""
+    try:
+        with open(META_PATH, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("fingerprint") != fingerprint:
+            return None
+        weights = np.load(MATRIX_PATH, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Kunde inte läsa sökindexet: {e}")
+        return None
+    if weights.shape != (len(meta["chunks"]), len(meta["vocabulary"])):
+        return None
+    return meta["chunks"], meta["vocabulary"], weights
+
+def load_index(force_rebuild=False):
+    """
+    Laddar (eller bygger vid behov) sökindexet. Anropas vid start och av search().
+
+    Returns:
+        tuple: (chunks, vocabulary, weights)
+    """
+    global _index
+    with _lock:
+        if _index is not None and not force_rebuild:
+            return _index
+        paths = _source_files()
+        fingerprint = _fingerprint(paths)
+        index = None if force_rebuild else _load(fingerprint)
+        if index is None:
+            index = _build(paths)
+            try:
+                _save(fingerprint, *index)
+            except OSError as e:
+                logger.warning(f"Kunde inte spara sökindexet: {e}")
+            logger.info(f"Sökindex byggt: {len(index[0])} stycken från {len(paths)} filer")
+        _index = index
+        return _index
+
+def rebuild_index():
+    """Bygger om indexet, t.ex. efter att nya dokument lagts till medan appen körs"""
+    return load_index(force_rebuild=True)
+
+def search(query, k=None):
+    """
+    Returnerar de k mest relevanta styckena för frågan.
+
+    Returns:
+        list: [{"source", "text", "score"}] sorterade efter relevans; tom om inget matchar
+    """
+    k = config.RETRIEVAL_TOP_K if k is None else k
+    chunks, vocabulary, weights = load_index()
+    term_ids = sorted({vocabulary[t] for t in _tokenize(query or "") if t in vocabulary})
+    if not term_ids or k <= 0:
+        return []
+    scores = np.asarray(weights[:, term_ids]).sum(axis=1)
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [
+        {**chunks[i], "score": float(scores[i])}
+        for i in top
+        if scores[i] > 0
+    ]
+
+def relevant_context(query, k=None, max_tokens=None):
+    """
+    Formaterar de mest relevanta styckena som underlag för en prompt.
+
+    Returns:
+        str: Styckena med källfil, högst max_tokens stort, eller "" om inget matchar
+    """
+    max_tokens = config.RETRIEVAL_MAX_TOKENS if max_tokens is None else max_tokens
+    passages = []
+    used = 0
+    for hit in search(query, k):
+        passage = f"[{hit['source']}]\n{hit['text']}"
+        cost = count_tokens(passage)
+        if used + cost > max_tokens:
+            break
+        passages.append(passage)
+        used += cost
+    return "\n\n".join(passages)
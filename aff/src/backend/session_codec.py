@@ -0,0 +1,69 @@
+# backend/session_codec.py
+# Kompakt lagringsformat för sparade sessioner: kompakt JSON komprimerad med zlib och en
+# förinställd ordlista (zdict). Ordlistan innehåller det som återkommer i varje sparning –
+# nycklar, roller och de vanliga rubrikerna i affärsplaner, SWOT och manifest – så att även
+# korta sparningar komprimeras bra. Formatet märks med ett prefix per version; data utan
+# prefix läses som vanlig JSON, så äldre sparningar fungerar som förut.
+#
+# En ordlista får aldrig ändras när den väl använts – lägg i stället till en ny version.
+
+import json
+import zlib
+
+COMPRESSION_LEVEL = 6
+
+_ZDICT_V1 = " ".join([
+    # Rubriker och återkommande formuleringar i genererade texter
+    "## Sammanfattning", "## Affärsidé", "## Vision och mål", "## Marknadsanalys",
+    "## Målgrupp", "## Konkurrensanalys", "## Marknadsföring", "## Försäljning",
+    "## Leverantörer", "## Organisation", "## Ekonomisk plan", "## Budget",
+    "## Finansiering", "## Risker", "## Tidsplan", "## Slutsats",
+    "Styrkor", "Svagheter", "Möjligheter", "Hot", "Rekommendationer",
+    "affärsplan", "företaget", "kunder", "marknaden", "konkurrenter", "produkter",
+    "tjänster", "hållbarhet", "lönsamhet", "omsättning", "kostnader", "investering",
+    "- **", "**:", "\n\n### ", "\n- ",
+    # Nycklar i sparat läge och konversationshistorik
+    '"user_data":{', '"conversation_history":[', '"current_stage":"', '"timestamp":"',
+    '{"role":"user","content":"', '{"role":"assistant","content":"',
+    '{"role":"system","content":"', '"namn":"', '"stad":"', '"malgrupp":"',
+    '"produktutbud":"', '"strategi":"', '"tidsplan":"', '"budget":"', '"erfarenhet":"',
+    '"foretagsnamn":"', '"marknadssegment":"', '"konkurrenter":"', '"affarsplan":"',
+    '"intro"', '"basic_info"', '"deep_dive"', '"financial"', '"business_plan"',
+    '"business_analysis"',
+]).encode("utf-8")
+
+# Prefix -> ordlista
+_FORMATS = {
+    b"Z1": _ZDICT_V1,
+}
+CURRENT_FORMAT = b"Z1"
+
+def encode(value):
+    """
+    Kodar ett JSON-serialiserbart värde i det kompakta formatet.
+
+    Returns:
+        bytes: Formatprefix följt av zlib-data
+    """
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=_FORMATS[CURRENT_FORMAT])
+    return CURRENT_FORMAT + compressor.compress(data) + compressor.flush()
+
+def decode(data):
+    """
+    Avkodar data i det kompakta formatet, eller äldre okomprimerad JSON (str eller bytes).
+
+    Raises:
+        ValueError: Om datan varken är giltig komprimerad data eller JSON
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data)
+        zdict = _FORMATS.get(data[:2])
+        if zdict is not None:
+            try:
+                decompressor = zlib.decompressobj(zdict=zdict)
+                data = decompressor.decompress(data[2:]) + decompressor.flush()
+            except zlib.error as e:
+                raise ValueError(f"Skadad sparning: {e}") from e
+        data = data.decode("utf-8")
+    return json.loads(data)
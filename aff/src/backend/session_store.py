@@ -0,0 +1,384 @@
+# backend/session_store.py
+# Beständig lagring av sparade affärsplaner per session i SQLite (WAL).
+# Varje webbläsarsession har ett eget session-id, så samtidiga användare skriver aldrig
+# över varandras "senaste" sparning. Tabellen sessions håller det senaste läget per
+# session (upsert) och snapshots varje sparning, indexerad på (session_id, created_at)
+# så att sparning, laddning och listning går lika fort oavsett hur många planer som finns.
+# Katalogen (catalog) är ett litet index över sparningarna – id, session, tid, företagsnamn
+# och steg – som uppdateras i samma transaktion som sparningen och används för listning
+# med sökning och sidindelning utan att själva planerna behöver läsas.
+# Autosparning skriver bara ändringarna (deltas) till en logg som bara växer; sessionens
+# senaste läge är sessions-raden plus loggen, och loggen slås ihop med raden (kompakteras)
+# när den blivit lång eller när en fullständig sparning görs.
+# Långa fält (field_store) som ingen sessionsrad, sparning eller delta längre refererar till
+# rensas bort i bakgrunden högst en gång per FIELD_GC_INTERVAL.
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import config
+from backend.db import get_connection
+from backend import session_codec, field_store
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(config.DATA_DIR, "sessions.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    current_stage TEXT,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    current_stage TEXT,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_session ON snapshots(session_id, created_at);
+CREATE TABLE IF NOT EXISTS catalog (
+    snapshot_id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    company_name TEXT NOT NULL,
+    company_key TEXT NOT NULL,
+    current_stage TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_catalog_session ON catalog(session_id, created_at);
+CREATE TABLE IF NOT EXISTS deltas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deltas_session ON deltas(session_id, id);
+"""
+
+_backfill_lock = threading.Lock()
+_backfilled = False
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+
+def _connection():
+    conn = get_connection(DB_PATH, _SCHEMA)
+    if not _backfilled:
+        _backfill_catalog(conn)
+    return conn
+
+def _catalog_row(snapshot_id, session_id, created_at, state):
+    company_name = str((state.get("user_data") or {}).get("foretagsnamn") or "").strip()
+    return (snapshot_id, session_id, created_at, company_name, company_name.lower(), state.get("current_stage"))
+
+def _backfill_catalog(conn):
+    """Lägger in sparningar som saknas i katalogen (t.ex. från före katalogen fanns), en gång per process"""
+    global _backfilled
+    with _backfill_lock:
+        if _backfilled:
+            return
+        try:
+            missing = conn.execute(
+                "SELECT id, session_id, created_at, data FROM snapshots "
+                "WHERE id NOT IN (SELECT snapshot_id FROM catalog)"
+            ).fetchall()
+            if missing:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO catalog "
+                    "(snapshot_id, session_id, created_at, company_name, company_key, current_stage) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [_catalog_row(i, session_id, created_at, _decode(data)) for i, session_id, created_at, data in missing],
+                )
+                logger.info(f"Lade till {len(missing)} sparningar i katalogen")
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Kunde inte komplettera katalogen: {e}")
+        _backfilled = True
+
+def _encode(state):
+    # Komprimerat med gemensam ordlista; rader från före formatet läses som JSON
+    return session_codec.encode(state)
+
+def _decode(data):
+    return session_codec.decode(data)
+
+def _upsert_session(conn, session_id, state, data, now):
+    conn.execute(
+        "INSERT INTO sessions (session_id, current_stage, data, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(session_id) DO UPDATE SET "
+        "current_stage = excluded.current_stage, data = excluded.data, updated_at = excluded.updated_at",
+        (session_id, state.get("current_stage"), data, now, now),
+    )
+
+def apply_delta(state, delta):
+    """
+    Returnerar ett nytt läge där en delta från autosparningen lagts på.
+
+    En delta kan innehålla:
+        user_data (dict): Ändrade eller nya nycklar
+        user_data_removed (list): Borttagna nycklar
+        conversation_history (dict): {"start": n, "messages": [...]} – historiken kortas till
+            n meddelanden och messages läggs till (oftast bara de nya i slutet)
+        current_stage (str): Aktuellt steg
+    """
+    state = dict(state)
+    if "user_data" in delta or "user_data_removed" in delta:
+        user_data = dict(state.get("user_data") or {})
+        user_data.update(delta.get("user_data", {}))
+        for key in delta.get("user_data_removed", []):
+            user_data.pop(key, None)
+        state["user_data"] = user_data
+    if "conversation_history" in delta:
+        history = delta["conversation_history"]
+        state["conversation_history"] = list(state.get("conversation_history") or [])[:history["start"]] + history["messages"]
+    for key, value in delta.items():
+        if key not in ("user_data", "user_data_removed", "conversation_history"):
+            state[key] = value
+    return state
+
+def save_state(session_id, state, snapshot=True):
+    """
+    Sparar sessionens läge atomiskt.
+
+    Args:
+        session_id (str): Sessionens id
+        state (dict): user_data, conversation_history, current_stage m.m.
+        snapshot (bool): Spara även en ny post i historiken (annars uppdateras bara senaste läget)
+
+    Returns:
+        int: Id för den nya sparningen (0 om snapshot=False), eller None vid fel
+    """
+    now = time.time()
+    data = _encode(state)
+    stage = state.get("current_stage")
+    conn = _connection()
+    try:
+        # En transaktion: senaste läget och historikposten skrivs tillsammans eller inte alls
+        conn.execute("BEGIN IMMEDIATE")
+        _upsert_session(conn, session_id, state, data, now)
+        # Fullständigt läge ersätter eventuella autosparade ändringar
+        conn.execute("DELETE FROM deltas WHERE session_id = ?", (session_id,))
+        snapshot_id = 0
+        if snapshot:
+            snapshot_id = conn.execute(
+                "INSERT INTO snapshots (session_id, current_stage, data, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, stage, data, now),
+            ).lastrowid
+            conn.execute(
+                "INSERT INTO catalog (snapshot_id, session_id, created_at, company_name, company_key, current_stage) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                _catalog_row(snapshot_id, session_id, now, state),
+            )
+            # Behåll bara de senaste sparningarna per session
+            conn.execute(
+                "DELETE FROM snapshots WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM snapshots WHERE session_id = ? ORDER BY created_at DESC, id DESC LIMIT ?)",
+                (session_id, session_id, config.SESSION_MAX_SNAPSHOTS),
+            )
+            conn.execute(
+                "DELETE FROM catalog WHERE session_id = ? AND snapshot_id NOT IN "
+                "(SELECT id FROM snapshots WHERE session_id = ?)",
+                (session_id, session_id),
+            )
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        logger.error(f"Kunde inte spara sessionen {session_id}: {e}")
+        return None
+    # Gallringen ovan kan ha släppt de sista referenserna till lagrade fält
+    _schedule_field_gc()
+    return snapshot_id
+
+def append_delta(session_id, delta):
+    """
+    Lägger till en delta i sessionens ändringslogg och kompakterar loggen när den blivit lång.
+
+    Returns:
+        bool: True om deltan sparades
+    """
+    try:
+        conn = _connection()
+        conn.execute(
+            "INSERT INTO deltas (session_id, data, created_at) VALUES (?, ?, ?)",
+            (session_id, _encode(delta), time.time()),
+        )
+        pending = conn.execute("SELECT COUNT(*) FROM deltas WHERE session_id = ?", (session_id,)).fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"Kunde inte autospara sessionen {session_id}: {e}")
+        return False
+    if pending >= config.AUTOSAVE_COMPACT_EVERY:
+        compact_session(session_id)
+    return True
+
+def _read_latest(conn, session_id):
+    """Sessionsraden med ändringsloggen pålagd: (läge, tidpunkt, sista delta-id) eller None"""
+    row = conn.execute(
+        "SELECT data, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    deltas = conn.execute(
+        "SELECT id, data, created_at FROM deltas WHERE session_id = ? ORDER BY id", (session_id,)
+    ).fetchall()
+    if row is None and not deltas:
+        return None
+    state, saved_at = (_decode(row[0]), row[1]) if row else ({}, 0)
+    last_id = None
+    for last_id, data, created_at in deltas:
+        state = apply_delta(state, _decode(data))
+        saved_at = max(saved_at, created_at)
+    return state, saved_at, last_id
+
+def compact_session(session_id):
+    """Slår ihop sessionens ändringslogg med sessions-raden och tömmer loggen"""
+    conn = _connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        latest = _read_latest(conn, session_id)
+        if latest is not None and latest[2] is not None:
+            state, saved_at, last_id = latest
+            _upsert_session(conn, session_id, state, _encode(state), saved_at)
+            conn.execute("DELETE FROM deltas WHERE session_id = ? AND id <= ?", (session_id, last_id))
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        logger.error(f"Kunde inte kompaktera sessionen {session_id}: {e}")
+
+def load_state(session_id, snapshot_id=None):
+    """
+    Laddar sessionens senaste läge (inklusive autosparade ändringar), eller en viss sparning.
+
+    Returns:
+        dict: Sparat läge med "saved_at" (unix-tid), eller None om inget finns
+    """
+    try:
+        conn = _connection()
+        if snapshot_id is None:
+            # Läs raden och loggen i samma transaktion så en samtidig kompaktering inte syns halvvägs
+            conn.execute("BEGIN")
+            try:
+                latest = _read_latest(conn, session_id)
+            finally:
+                conn.execute("COMMIT")
+            row = latest[:2] if latest else None
+        else:
+            # Sessionen ingår i villkoret så att en session aldrig kan läsa en annans sparning
+            row = conn.execute(
+                "SELECT data, created_at FROM snapshots WHERE id = ? AND session_id = ?",
+                (snapshot_id, session_id),
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.error(f"Kunde inte läsa sessionen {session_id}: {e}")
+        return None
+    if row is None:
+        return None
+    state = row[0] if snapshot_id is None else _decode(row[0])
+    state["saved_at"] = row[1]
+    return state
+
+def _like_pattern(search):
+    escaped = search.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def list_catalog(session_id=None, search="", page=0, page_size=None):
+    """
+    Listar sparningar ur katalogen, nyast först.
+
+    Args:
+        session_id (str): Begränsa till en session (None = alla sessioner)
+        search (str): Filtrera på del av företagsnamnet (skiftlägesokänsligt)
+        page (int): Sidnummer, från 0
+        page_size (int): Antal poster per sida (standard CATALOG_PAGE_SIZE)
+
+    Returns:
+        tuple: ([{"id", "session_id", "saved_at", "company_name", "current_stage"}], totalt antal träffar)
+    """
+    page_size = config.CATALOG_PAGE_SIZE if page_size is None else page_size
+    conditions = []
+    params = []
+    if session_id is not None:
+        conditions.append("session_id = ?")
+        params.append(session_id)
+    if search:
+        conditions.append("company_key LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(search))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    try:
+        conn = _connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM catalog {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT snapshot_id, session_id, created_at, company_name, current_stage FROM catalog {where} "
+            f"ORDER BY created_at DESC, snapshot_id DESC LIMIT ? OFFSET ?",
+            (*params, page_size, max(page, 0) * page_size),
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Kunde inte lista katalogen: {e}")
+        return [], 0
+    entries = [
+        {"id": r[0], "session_id": r[1], "saved_at": r[2], "company_name": r[3], "current_stage": r[4]}
+        for r in rows
+    ]
+    return entries, total
+
+def _referenced_field_keys(conn):
+    """Nycklarna för alla lagrade fält som någon sessionsrad, sparning eller delta refererar till"""
+    keys = set()
+    for table in ("sessions", "snapshots", "deltas"):
+        for (data,) in conn.execute(f"SELECT data FROM {table}"):
+            keys |= field_store.referenced_keys(_decode(data).get("user_data"))
+    return keys
+
+def collect_field_garbage():
+    """
+    Tar bort lagrade fält som ingen sparning längre refererar till. Fält som lagrats inom
+    FIELD_GC_GRACE behålls, eftersom de kan höra till en session som ännu inte sparats.
+
+    Returns:
+        int: Antal borttagna fält
+    """
+    try:
+        conn = _connection()
+        # Läs alla tabeller i samma transaktion så att en samtidig kompaktering inte syns halvvägs
+        conn.execute("BEGIN")
+        try:
+            referenced = _referenced_field_keys(conn)
+        finally:
+            conn.execute("COMMIT")
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"Kunde inte läsa referenser till lagrade fält: {e}")
+        return 0
+    removed = field_store.delete_unreferenced(referenced, time.time() - config.FIELD_GC_GRACE)
+    if removed:
+        logger.info(f"Tog bort {removed} lagrade fält utan referenser")
+    return removed
+
+def _schedule_field_gc():
+    """Startar fältrensningen i bakgrunden om det gått FIELD_GC_INTERVAL sedan förra gången"""
+    global _last_gc
+    now = time.time()
+    with _gc_lock:
+        if now - _last_gc < config.FIELD_GC_INTERVAL:
+            return
+        _last_gc = now
+    threading.Thread(target=collect_field_garbage, name="field-gc", daemon=True).start()
+
+def delete_session(session_id):
+    """Tar bort sessionens senaste läge och alla dess sparningar"""
+    conn = _connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM snapshots WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM catalog WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM deltas WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        logger.error(f"Kunde inte ta bort sessionen {session_id}: {e}")
+        return
+    _schedule_field_gc()
@@ -4,69 +4,82 @@ import json
 import os
 from datetime import datetime
 import logging
+from backend import session_store
 
 # Skapa enkel loggning
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def save_progress(user_data, conversation_history):
+def save_progress(user_data, conversation_history, session_id, current_stage=None):
     """
-    Sparar användardata och konversationshistorik till en fil
+    Sparar användardata och konversationshistorik för sessionen i sessionslagret
     
     Args:
         user_data (dict): Användarens data och svar
         conversation_history (list): Historiken över konversationen
+        session_id (str): Sessionens id
+        current_stage (str): Aktuellt steg i flödet
         
     Returns:
-        str: Filnamnet som skapades
+        int: Id för sparningen, eller None vid fel
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"affarsplan_{timestamp}.json"
-    
-    data = {
+    state = {
         "user_data": user_data,
         "conversation_history": conversation_history,
-        "timestamp": timestamp
+        "current_stage": current_stage,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
-    
+    snapshot_id = session_store.save_state(session_id, state)
+    if snapshot_id is not None:
+        logger.info(f"Framgångsrikt sparat session {session_id} (sparning {snapshot_id})")
+    return snapshot_id
+
+def _load_legacy_file(filename):
+    """Läser en äldre sparning i JSON-format (data/affarsplan_*.json)"""
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        logger.info(f"Framgångsrikt sparat data till {filename}")
-        return filename
+        with open(filename, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        
+        logger.info(f"Framgångsrikt laddat data från {filename}")
+        return data
+    except json.JSONDecodeError as e:
+        logger.error(f"Ogiltig JSON i filen {filename}: {e}")
+        return None
     except IOError as e:
-        logger.error(f"Kunde inte spara till fil {filename}: {e}")
+        logger.error(f"Kunde inte läsa filen {filename}: {e}")
         return None
     except Exception as e:
-        logger.error(f"Oväntat fel vid sparande av data: {e}")
+        logger.error(f"Oväntat fel vid laddning av data: {e}")
         return None
 
-def load_progress(filename):
+def load_state(source, snapshot_id=None):
     """
-    Laddar användardata och konversationshistorik från en fil
+    Laddar ett sparat läge från sessionslagret, eller från en äldre JSON-fil
     
     Args:
-        filename (str): Sökvägen till filen som ska laddas
+        source (str): Sessionens id, eller sökvägen till en äldre JSON-fil
+        snapshot_id (int): En viss sparning (annars sessionens senaste läge)
         
     Returns:
-        tuple: (user_data, conversation_history)
+        dict: user_data, conversation_history, current_stage m.m., eller None om inget finns
     """
-    if not os.path.exists(filename):
-        logger.warning(f"Filen {filename} hittades inte")
-        return {}, []
-        
-    try:
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    if source.endswith(".json") and os.path.exists(source):
+        return _load_legacy_file(source)
+    return session_store.load_state(source, snapshot_id)
+
+def load_progress(source, snapshot_id=None):
+    """
+    Laddar användardata och konversationshistorik
+    
+    Args:
+        source (str): Sessionens id, eller sökvägen till en äldre JSON-fil
+        snapshot_id (int): En viss sparning (annars sessionens senaste läge)
         
-        logger.info(f"Framgångsrikt laddat data från {filename}")
-        return data.get("user_data", {}), data.get("conversation_history", [])
-    except json.JSONDecodeError as e:
-        logger.error(f"Ogiltig JSON i filen {filename}: {e}")
-        return {}, []
-    except IOError as e:
-        logger.error(f"Kunde inte läsa filen {filename}: {e}")
+    Returns:
+        tuple: (user_data, conversation_history)
+    """
+    state = load_state(source, snapshot_id)
+    if state is None:
+        logger.warning(f"Ingen sparad data hittades för {source}")
         return {}, []
-    except Exception as e:
-        logger.error(f"Oväntat fel vid laddning av data: {e}")
-        return {}, [] 
\ No newline at end of file
+    return state.get("user_data", {}), state.get("conversation_history", [])
@@ -0,0 +1,183 @@
+# backend/swot_diagram.py
+# Lättviktig rendering av SWOT-diagram (fyra kvadranter) utan matplotlib.
+# PNG ritas direkt med Pillow och SVG byggs som text, så varken figuruppsättning,
+# tight_layout eller matplotlib-importen behövs. Pillow importeras först när en PNG ritas.
+
+import io
+from xml.sax.saxutils import escape
+
+SECTIONS_ORDER = ['Styrkor', 'Svagheter', 'Möjligheter', 'Hot']
+
+# Definiera färger för varje sektion
+COLORS = {
+    'Styrkor': '#4CAF50',      # Grön
+    'Svagheter': '#F44336',    # Röd
+    'Möjligheter': '#2196F3',  # Blå
+    'Hot': '#FF9800'           # Orange
+}
+
+BACKGROUND = '#f0f0f0'
+PANEL_ALPHA = 0x22 / 255
+WIDTH, HEIGHT = 1200, 960
+MARGIN = 24
+TITLE_SIZE = 28
+ITEM_SIZE = 18
+MAX_ITEMS = 5
+MAX_ITEM_LENGTH = 55
+EMPTY_CONTENT = ['Ingen information tillgänglig']
+
+# Typsnitt i prioritetsordning; Pillows inbyggda typsnitt används om inget hittas.
+# Det inbyggda typsnittet kan sakna FreeType-stöd och klarar då bara latin-1.
+_FONT_CANDIDATES = {
+    "bold": ["DejaVuSans-Bold.ttf", "Arial Bold.ttf", "arialbd.ttf"],
+    "regular": ["DejaVuSans.ttf", "Arial.ttf", "arial.ttf"],
+}
+_fonts = {}
+
+def parse_swot_sections(swot_text):
+    """Extraherar punkterna för Styrkor, Svagheter, Möjligheter och Hot ur SWOT-texten"""
+    sections = {}
+    current_section = None
+    current_content = []
+
+    for line in swot_text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        if any(keyword in line.lower() for keyword in ['styrkor', 'strength']):
+            current_section = 'Styrkor'
+            current_content = []
+        elif any(keyword in line.lower() for keyword in ['svagheter', 'weakness']):
+            if current_section and current_content:
+                sections[current_section] = current_content
+            current_section = 'Svagheter'
+            current_content = []
+        elif any(keyword in line.lower() for keyword in ['möjligheter', 'opportunit']):
+            if current_section and current_content:
+                sections[current_section] = current_content
+            current_section = 'Möjligheter'
+            current_content = []
+        elif any(keyword in line.lower() for keyword in ['hot', 'threat']):
+            if current_section and current_content:
+                sections[current_section] = current_content
+            current_section = 'Hot'
+            current_content = []
+        elif current_section and line.startswith(('•', '-', '*', '1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.')):
+            # Rensa bort punktlistetecken
+            item = line.lstrip('•-*123456789. ')
+            current_content.append(item)
+
+    # Lägg till den sista sektionen
+    if current_section and current_content:
+        sections[current_section] = current_content
+    return sections
+
+def _items(sections, section):
+    """Max fem punkter per kvadrant, förkortade för läsbarhet"""
+    items = []
+    for item in sections.get(section, EMPTY_CONTENT)[:MAX_ITEMS]:
+        if len(item) > MAX_ITEM_LENGTH:
+            item = item[:MAX_ITEM_LENGTH - 3] + '...'
+        items.append(f"• {item}")
+    return items
+
+def _panel_color(color):
+    """Sektionsfärgen med transparens, förblandad mot bakgrunden"""
+    fg = [int(color[i:i + 2], 16) for i in (1, 3, 5)]
+    bg = [int(BACKGROUND[i:i + 2], 16) for i in (1, 3, 5)]
+    return tuple(round(f * PANEL_ALPHA + b * (1 - PANEL_ALPHA)) for f, b in zip(fg, bg))
+
+def _panels():
+    """Returnerar (sektion, x, y, bredd, höjd) för de fyra kvadranterna"""
+    panel_w = (WIDTH - 3 * MARGIN) // 2
+    panel_h = (HEIGHT - 3 * MARGIN) // 2
+    for index, section in enumerate(SECTIONS_ORDER):
+        row, col = divmod(index, 2)
+        x = MARGIN + col * (panel_w + MARGIN)
+        y = MARGIN + row * (panel_h + MARGIN)
+        yield section, x, y, panel_w, panel_h
+
+def _font(weight, size):
+    from PIL import ImageFont
+    key = (weight, size)
+    font = _fonts.get(key)
+    if font is None:
+        for name in _FONT_CANDIDATES[weight]:
+            try:
+                font = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        else:
+            font = ImageFont.load_default(size=size)
+        _fonts[key] = font
+    return font
+
+def _drawable(text, font):
+    """Byter ut tecken som bitmapptypsnittet inte kan rita (t.ex. •) så att ritningen inte kraschar"""
+    from PIL import ImageFont
+    if isinstance(font, ImageFont.FreeTypeFont):
+        return text
+    return text.replace('•', '·').encode('latin-1', 'replace').decode('latin-1')
+
+def render_swot_png(sections):
+    """
+    Ritar SWOT-diagrammet som PNG med Pillow.
+
+    Returns:
+        io.BytesIO: PNG-bilden, positionerad i början
+    """
+    from PIL import Image, ImageDraw
+    img = Image.new("RGB", (WIDTH, HEIGHT), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    title_font = _font("bold", TITLE_SIZE)
+    item_font = _font("regular", ITEM_SIZE)
+
+    for section, x, y, w, h in _panels():
+        draw.rectangle([x, y, x + w, y + h], fill=_panel_color(COLORS[section]))
+        draw.text((x + w // 2, y + 16), _drawable(section, title_font), font=title_font, fill=COLORS[section], anchor="mt")
+        line_y = y + 16 + TITLE_SIZE + 28
+        for item in _items(sections, section):
+            draw.text((x + w // 10, line_y), _drawable(item, item_font), font=item_font, fill="#000000")
+            line_y += int(h * 0.15)
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=False)
+    buf.seek(0)
+    return buf
+
+def render_swot_svg(sections, responsive=False):
+    """
+    Bygger SWOT-diagrammet som SVG (vektor) för webbvisningen.
+
+    Args:
+        sections (dict): Punkter per sektion från parse_swot_sections
+        responsive (bool): Skala till behållarens bredd (för webben) i stället för fast storlek
+
+    Returns:
+        str: SVG-dokumentet
+    """
+    size = 'width="100%"' if responsive else f'width="{WIDTH}" height="{HEIGHT}"'
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" {size} '
+        f'viewBox="0 0 {WIDTH} {HEIGHT}" font-family="DejaVu Sans, Arial, sans-serif">',
+        f'<rect x="0" y="0" width="{WIDTH}" height="{HEIGHT}" fill="{BACKGROUND}"/>',
+    ]
+    for section, x, y, w, h in _panels():
+        color = COLORS[section]
+        parts.append(
+            f'<rect x="{x}" y="{y}" width="{w}" height="{h}" fill="{color}" fill-opacity="{PANEL_ALPHA:.3f}"/>'
+        )
+        parts.append(
+            f'<text x="{x + w // 2}" y="{y + 16 + TITLE_SIZE}" font-size="{TITLE_SIZE}" '
+            f'font-weight="bold" fill="{color}" text-anchor="middle">{escape(section)}</text>'
+        )
+        line_y = y + 16 + TITLE_SIZE + 28 + ITEM_SIZE
+        for item in _items(sections, section):
+            parts.append(
+                f'<text x="{x + w // 10}" y="{line_y}" font-size="{ITEM_SIZE}" fill="#000000">{escape(item)}</text>'
+            )
+            line_y += int(h * 0.15)
+    parts.append('</svg>')
+    return "\n".join(parts)
@@ -0,0 +1,112 @@
+# backend/token_budget.py
+# Tokenräkning och komprimering av prompter innan de skickas till OpenAI.
+# Räknar med tiktoken om det finns installerat (samma tokenizer som modellen),
+# annars med en uppskattning på ca 4 tecken per token.
+
+import logging
+import threading
+import config
+from backend import field_store
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Extra tokens som varje meddelande kostar utöver innehållet (roll, avgränsare)
+MESSAGE_OVERHEAD = 4
+TRUNCATION_MARKER = " […]"
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+def _encoder(model=None):
+    """Returnerar (och cachar) tiktoken-kodaren för modellen, eller None utan tiktoken"""
+    if tiktoken is None:
+        return None
+    model = model or config.MODEL
+    with _encoders_lock:
+        if model not in _encoders:
+            try:
+                _encoders[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoders[model] = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # T.ex. om kodningsfilen inte kan hämtas – fall tillbaka på uppskattning
+                logger.warning(f"Kunde inte ladda tokenizer för {model}: {e}")
+                _encoders[model] = None
+        return _encoders[model]
+
+def count_tokens(text, model=None):
+    """Räknar tokens i en text"""
+    if not text:
+        return 0
+    encoder = _encoder(model)
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
+
+def count_message_tokens(messages, model=None):
+    """Räknar tokens för en hel meddelandelista, inklusive overhead per meddelande"""
+    return sum(count_tokens(str(m.get("content", "")), model) + MESSAGE_OVERHEAD for m in messages)
+
+def truncate_text(text, max_tokens, model=None):
+    """Kortar en text till högst max_tokens (början behålls) och markerar att den kortats"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoder = _encoder(model)
+    if encoder is None:
+        return text[:max(max_tokens, 0) * 4].rstrip() + TRUNCATION_MARKER
+    tokens = encoder.encode(text, disallowed_special=())
+    return encoder.decode(tokens[:max(max_tokens, 0)]).rstrip() + TRUNCATION_MARKER
+
+def fit_history(history, budget=None, max_turn_tokens=None, model=None):
+    """
+    Väljer de senaste turerna i konversationshistoriken som ryms inom budgeten.
+    Långa turer (t.ex. hela affärsplaner) kortas till max_turn_tokens innan de räknas.
+    Inledande systemmeddelanden (t.ex. en löpande sammanfattning) behålls alltid och
+    räknas av från budgeten först.
+
+    Returns:
+        list: Historik i ursprunglig ordning, som mest budget tokens stor
+    """
+    if not history:
+        return []
+    budget = config.HISTORY_TOKEN_BUDGET if budget is None else budget
+    max_turn_tokens = config.HISTORY_TURN_MAX_TOKENS if max_turn_tokens is None else max_turn_tokens
+
+    pinned = []
+    while len(pinned) < len(history) and history[len(pinned)].get("role") == "system":
+        pinned.append(history[len(pinned)])
+    used = count_message_tokens(pinned, model)
+
+    kept = []
+    for message in reversed(history[len(pinned):]):
+        content = truncate_text(str(message.get("content", "")), max_turn_tokens, model)
+        cost = count_tokens(content, model) + MESSAGE_OVERHEAD
+        if used + cost > budget:
+            break
+        kept.append({**message, "content": content})
+        used += cost
+    kept.reverse()
+    return pinned + kept
+
+def compact_fields(data, max_field_tokens=None, exclude=(), model=None):
+    """
+    Returnerar en kopia av data där för stora textfält kortats och exclude-nycklar tagits bort.
+    Används när användardata bäddas in i prompter.
+    """
+    max_field_tokens = config.PROMPT_FIELD_MAX_TOKENS if max_field_tokens is None else max_field_tokens
+    compact = {}
+    for key, value in data.items():
+        if key in exclude:
+            continue
+        if field_store.is_ref(value):
+            # Lagrade stora fält skickas inte i sin helhet – förhandsvisningen räcker som kontext
+            value = field_store.preview(value)
+        if isinstance(value, str):
+            value = truncate_text(value, max_field_tokens, model)
+        compact[key] = value
+    return compact
@@ -0,0 +1,80 @@
+# benchmarks/import_time.py
+# Mäter kallstartens importtid: vad som laddas för att visa introsidan jämfört med när
+# alla sidor importeras direkt (som app.py gjorde tidigare), samt hela första körningen
+# av app.py (config, sessionslagret, openai_utils och sidan) via Streamlits AppTest.
+# Varje mätning körs i en ny Python-process så att inga moduler finns cachade i sys.modules.
+#
+# Körs från aff/src:
+#     python benchmarks/import_time.py [--runs 5]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["matplotlib", "plotly", "pandas", "numpy", "folium", "fpdf", "PIL", "openai"]
+
+# Namn -> (förberedelse som inte mäts, kod som mäts)
+SCENARIOS = {
+    "introsidan (lat laddning)": ("", "from frontend import pages; pages.intro_page"),
+    "alla sidor direkt": (
+        "",
+        "from frontend import pages\n"
+        "for name in pages.__all__:\n"
+        "    getattr(pages, name)"
+    ),
+    # app.py läser session_state på modulnivå och måste därför köras som ett riktigt skript
+    "app.py (första körningen)": (
+        "from streamlit.testing.v1 import AppTest",
+        "AppTest.from_file('app.py', default_timeout=60).run()"
+    ),
+}
+
+_CHILD = """
+import sys, time, json
+{setup}
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+def _measure(setup, code):
+    """Kör koden i en ny process och returnerar (sekunder, laddade tunga moduler)"""
+    child = _CHILD.format(setup=setup, code=code, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", child],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["seconds"], result["heavy"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Mät importtid vid kallstart")
+    parser.add_argument("--runs", type=int, default=5, help="antal mätningar per scenario")
+    args = parser.parse_args()
+
+    # Värm upp filsystemcachen och .pyc-filerna så att första mätningen inte avviker
+    for setup, code in SCENARIOS.values():
+        _measure(setup, code)
+
+    for name, (setup, code) in SCENARIOS.items():
+        timings = []
+        heavy = []
+        for _ in range(args.runs):
+            seconds, heavy = _measure(setup, code)
+            timings.append(seconds)
+        print(f"{name:28s} median {statistics.median(timings) * 1000:7.1f} ms  "
+              f"(min {min(timings) * 1000:.1f} ms)")
+        print(f"{'':28s} tunga moduler: {', '.join(heavy) or '-'}")
+
+if __name__ == "__main__":
+    main()
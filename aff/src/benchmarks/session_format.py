@@ -0,0 +1,108 @@
+# benchmarks/session_format.py
+# Jämför lagringsformat för sparade sessioner: det tidigare formatet (JSON med indent=2)
+# mot kompakt JSON, zlib utan ordlista och det nya formatet (zlib med gemensam ordlista,
+# backend/session_codec). Mäter storlek samt tid för att spara och läsa en fil.
+#
+# Körs från aff/src:
+#     python benchmarks/session_format.py [--runs 50]
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+
+from backend import session_codec
+
+def _sample_state(plan_chars):
+    """Ett realistiskt sparat läge; de långa texterna tas ur vägledningstexterna i random/"""
+    with open(os.path.join(SRC_DIR, "random", "almi_vinova.txt"), encoding="utf-8") as f:
+        corpus = f.read()
+    plan = corpus[:plan_chars]
+    history = []
+    for i in range(6):
+        history.append({"role": "user", "content": f"Fråga {i}: hur stärker jag avsnittet om marknaden?"})
+        # Svaren tas ur en annan del av texten än planen, så att de inte komprimeras mot den
+        offset = plan_chars + i * 1500
+        history.append({"role": "assistant", "content": corpus[offset:offset + 1500]})
+    return {
+        "user_data": {
+            "namn": "Anna Andersson",
+            "stad": "Stockholm",
+            "malgrupp": "Småbarnsföräldrar i innerstaden",
+            "produktutbud": "Ekologiska barnkläder och second hand",
+            "strategi": "Nischad kvalitet",
+            "tidsplan": "6 månader",
+            "budget": "500 000 kr",
+            "erfarenhet": "Tio år inom detaljhandel",
+            "foretagsnamn": "Lilla Gröna",
+            "marknadssegment": "Hållbart mode för barn",
+            "konkurrenter": "Polarn O. Pyret, Lindex, lokala second hand-butiker",
+            "affarsplan": plan,
+        },
+        "conversation_history": history,
+        "current_stage": "business_plan",
+        "timestamp": "2025-05-22 14:03:11",
+    }
+
+def _formats():
+    return {
+        "JSON indent=2 (tidigare)": (
+            lambda v: json.dumps(v, ensure_ascii=False, indent=2).encode("utf-8"),
+            lambda b: json.loads(b.decode("utf-8")),
+        ),
+        "kompakt JSON": (
+            lambda v: json.dumps(v, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+            lambda b: json.loads(b.decode("utf-8")),
+        ),
+        "zlib utan ordlista": (
+            lambda v: zlib.compress(json.dumps(v, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6),
+            lambda b: json.loads(zlib.decompress(b).decode("utf-8")),
+        ),
+        "zlib + ordlista (nytt)": (session_codec.encode, session_codec.decode),
+    }
+
+def _time_roundtrip(encode, decode, state, path, runs):
+    save_times, load_times = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        with open(path, "wb") as f:
+            f.write(encode(state))
+        save_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            loaded = decode(f.read())
+        load_times.append(time.perf_counter() - start)
+    assert loaded == state
+    return statistics.median(save_times), statistics.median(load_times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Jämför lagringsformat för sparade sessioner")
+    parser.add_argument("--runs", type=int, default=50, help="antal mätningar per format")
+    args = parser.parse_args()
+
+    # Litet läge (tidigt i flödet) och stort läge (med färdig affärsplan och Q&A)
+    samples = {"liten": _sample_state(0), "stor": _sample_state(12000)}
+    samples["liten"]["conversation_history"] = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.bin")
+        for sample_name, state in samples.items():
+            print(f"\nSparning: {sample_name}")
+            baseline = None
+            for name, (encode, decode) in _formats().items():
+                size = len(encode(state))
+                baseline = baseline or size
+                save, load = _time_roundtrip(encode, decode, state, path, args.runs)
+                print(f"  {name:26s} {size / 1024:8.1f} KB ({size / baseline:5.0%})  "
+                      f"spara {save * 1000:6.2f} ms  läsa {load * 1000:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
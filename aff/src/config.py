@@ -72,5 +72,117 @@ else:
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 logger.info(f"Använder OpenAI-modell: {MODEL}")
 
+# Inställningar för den delade HTTP-poolen mot OpenAI (en klient per process)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "120"))
+# Kontots gränser (anrop resp. tokens per minut) och omförsök vid 429/timeout.
+# SDK:ns egna omförsök stängs av så att schemaläggaren i openai_utils har kontrollen.
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "30000"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1.0"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "30"))
+# Tokenbudgetar för prompter: hur mycket konversationshistorik som skickas med,
+# hur stor en enskild tur får vara och hur långa fält från användardata får bli
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+HISTORY_TURN_MAX_TOKENS = int(os.getenv("HISTORY_TURN_MAX_TOKENS", "600"))
+PROMPT_FIELD_MAX_TOKENS = int(os.getenv("PROMPT_FIELD_MAX_TOKENS", "200"))
+# Frågor och svar: antal senaste meddelanden som skickas ordagrant; äldre ingår i en löpande sammanfattning
+QA_RECENT_MESSAGES = int(os.getenv("QA_RECENT_MESSAGES", "4"))
+# Max antal samtidiga GPT-anrop när oberoende anrop körs parallellt
+OPENAI_MAX_PARALLEL = int(os.getenv("OPENAI_MAX_PARALLEL", "8"))
+
+# Bakgrundsjobb: delad arbetarpool för alla sessioner, hur länge oavhämtade resultat sparas
+# och hur ofta sidorna frågar efter status
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "16"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+# Google Places: tidsgräns per anrop och max antal samtidiga sökningar per API-nyckel
+GOOGLE_PLACES_TIMEOUT = float(os.getenv("GOOGLE_PLACES_TIMEOUT", "10"))
+GOOGLE_PLACES_MAX_CONCURRENCY = int(os.getenv("GOOGLE_PLACES_MAX_CONCURRENCY", "6"))
+
+# URL till appens statiska filer (kräver server.enableStaticServing i .streamlit/config.toml)
+STATIC_URL = os.getenv("AFF_STATIC_URL", "/app/static")
+
+# Lokal katalog för beständiga cacher (GPT-svar m.m.) som överlever omstarter
+CACHE_DIR = os.getenv("AFF_CACHE_DIR", str(Path(__file__).parent / ".cache"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "200"))
+# Lokalt lagrade logotyper (original + PDF-version), rensas LRU när taket nås
+ASSET_STORE_MAX_MB = float(os.getenv("ASSET_STORE_MAX_MB", "100"))
+# Google Places-svar: träffar sparas länge, tomma svar kortare
+PLACES_CACHE_TTL = int(os.getenv("PLACES_CACHE_TTL", str(30 * 24 * 3600)))
+PLACES_CACHE_EMPTY_TTL = int(os.getenv("PLACES_CACHE_EMPTY_TTL", str(24 * 3600)))
+
+# Sparade affärsplaner (sessionslagret) och hur många sparningar som behålls per session
+DATA_DIR = os.getenv("AFF_DATA_DIR", str(Path(__file__).parent / "data"))
+SESSION_MAX_SNAPSHOTS = int(os.getenv("SESSION_MAX_SNAPSHOTS", "50"))
+# Stora textfält i user_data som lagras som referenser (kommaseparerade nycklar), från hur
+# många tecken, och hur lång förhandsvisningen i sammanfattningar är
+FIELD_REF_KEYS = tuple(k.strip() for k in os.getenv("FIELD_REF_KEYS", "affarsplan").split(",") if k.strip())
+FIELD_REF_MIN_CHARS = int(os.getenv("FIELD_REF_MIN_CHARS", "2000"))
+FIELD_PREVIEW_CHARS = int(os.getenv("FIELD_PREVIEW_CHARS", "300"))
+# Lagrade fält som ingen sparning refererar till tas bort: hur ofta det körs (sekunder) och
+# hur gamla de måste vara (så att fält i pågående, ännu osparade sessioner får vara kvar)
+FIELD_GC_INTERVAL = int(os.getenv("FIELD_GC_INTERVAL", str(24 * 3600)))
+FIELD_GC_GRACE = int(os.getenv("FIELD_GC_GRACE", str(7 * 24 * 3600)))
+# Antal autosparade ändringar per session innan loggen slås ihop med senaste läget
+AUTOSAVE_COMPACT_EVERY = int(os.getenv("AUTOSAVE_COMPACT_EVERY", "20"))
+# Antal sparningar per sida i sidomenyns lista
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "10"))
+
+# Vägledningstexter (Almi/Vinnova, investerarfrågor) som indexeras för sökning, antal stycken
+# som läggs in per prompt, deras sammanlagda tokenbudget och ungefärlig styckestorlek i tecken
+KNOWLEDGE_DIR = os.getenv("AFF_KNOWLEDGE_DIR", str(Path(__file__).parent / "random"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_MAX_TOKENS = int(os.getenv("RETRIEVAL_MAX_TOKENS", "700"))
+RETRIEVAL_CHUNK_CHARS = int(os.getenv("RETRIEVAL_CHUNK_CHARS", "900"))
+
 # Exportera funktioner för användning utifrån
-__all__ = ["OPENAI_API_KEY", "MODEL", "load_environment_variables"]
\ No newline at end of file
+__all__ = [
+    "OPENAI_API_KEY",
+    "MODEL",
+    "OPENAI_TIMEOUT",
+    "OPENAI_MAX_CONNECTIONS",
+    "OPENAI_MAX_KEEPALIVE",
+    "OPENAI_KEEPALIVE_EXPIRY",
+    "OPENAI_RPM_LIMIT",
+    "OPENAI_TPM_LIMIT",
+    "OPENAI_MAX_RETRIES",
+    "OPENAI_BACKOFF_BASE",
+    "OPENAI_BACKOFF_MAX",
+    "HISTORY_TOKEN_BUDGET",
+    "HISTORY_TURN_MAX_TOKENS",
+    "PROMPT_FIELD_MAX_TOKENS",
+    "QA_RECENT_MESSAGES",
+    "OPENAI_MAX_PARALLEL",
+    "JOB_WORKERS",
+    "JOB_RESULT_TTL",
+    "JOB_POLL_INTERVAL",
+    "GOOGLE_PLACES_TIMEOUT",
+    "GOOGLE_PLACES_MAX_CONCURRENCY",
+    "STATIC_URL",
+    "CACHE_DIR",
+    "RESPONSE_CACHE_TTL",
+    "RESPONSE_CACHE_MAX_MB",
+    "ASSET_STORE_MAX_MB",
+    "PLACES_CACHE_TTL",
+    "PLACES_CACHE_EMPTY_TTL",
+    "DATA_DIR",
+    "SESSION_MAX_SNAPSHOTS",
+    "FIELD_REF_KEYS",
+    "FIELD_REF_MIN_CHARS",
+    "FIELD_PREVIEW_CHARS",
+    "FIELD_GC_INTERVAL",
+    "FIELD_GC_GRACE",
+    "AUTOSAVE_COMPACT_EVERY",
+    "CATALOG_PAGE_SIZE",
+    "KNOWLEDGE_DIR",
+    "RETRIEVAL_TOP_K",
+    "RETRIEVAL_MAX_TOKENS",
+    "RETRIEVAL_CHUNK_CHARS",
+    "load_environment_variables",
+]
\ No newline at end of file
@@ -3,14 +3,6 @@
 
 # Importera och exponera alla komponenter från modulen
 
-from frontend.pages import (
-    intro_page,
-    basic_info_page,
-    deep_dive_page,
-    financial_page,
-    business_plan_page
-)
-
 from frontend.components.sidebar import create_sidebar
 from frontend.components.ui_components import (
     info_box,
@@ -18,7 +10,8 @@ from frontend.components.ui_components import (
     warning_box,
     section_title,
     progress_bar,
-    display_chat_history
+    display_chat_history,
+    stream_text
 )
 
 from frontend.utils.session_helpers import (
@@ -27,6 +20,21 @@ from frontend.utils.session_helpers import (
     determine_stage_from_data
 )
 
+_PAGES = (
+    'intro_page',
+    'basic_info_page',
+    'deep_dive_page',
+    'financial_page',
+    'business_plan_page'
+)
+
+def __getattr__(name):
+    # Sidorna laddas först när de efterfrågas (se frontend/pages/__init__.py)
+    if name in _PAGES:
+        from frontend import pages
+        return getattr(pages, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 __all__ = [
     # Pages
     'intro_page',
@@ -43,6 +51,7 @@ __all__ = [
     'section_title',
     'progress_bar',
     'display_chat_history',
+    'stream_text',
     
     # Utils
     'reset_session',
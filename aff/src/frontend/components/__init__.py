@@ -6,7 +6,9 @@ from frontend.components.ui_components import (
     warning_box,
     section_title,
     progress_bar,
-    display_chat_history
+    display_chat_history,
+    display_user_data_summary,
+    stream_text
 )
 
 __all__ = [
@@ -15,5 +17,7 @@ __all__ = [
     'warning_box',
     'section_title',
     'progress_bar',
-    'display_chat_history'
+    'display_chat_history',
+    'display_user_data_summary',
+    'stream_text'
 ] 
\ No newline at end of file
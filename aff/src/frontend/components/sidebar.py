@@ -1,10 +1,10 @@
 # frontend/components/sidebar.py
 
 import streamlit as st
-import json
-import os
 from datetime import datetime
 import time
+import config
+from frontend.utils.session_helpers import save_session, load_session, saved_plans
 
 def create_sidebar():
     """Skapar sidomenyn med navigation och projekthantering"""
@@ -62,82 +62,65 @@ def create_sidebar():
         # Ladda/Spara data
         st.markdown("### 💾 Spara/Ladda")
         
-        # Spara data till JSON
+        # Spara till sessionslagret (per session, så användare inte skriver över varandra)
         if st.button("Spara progress", key="save_progress", use_container_width=True):
-            try:
-                # Skapa folder om den inte finns
-                os.makedirs("data", exist_ok=True)
-                
-                # Spara userdata, konversation, stage, mm
-                data_to_save = {
-                    "user_data": st.session_state.user_data,
-                    "conversation_history": st.session_state.conversation_history,
-                    "current_stage": st.session_state.current_stage,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                
-                # Spara med timestamp för filnamn
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"data/affarsplan_{timestamp}.json"
-                
-                with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(data_to_save, f, ensure_ascii=False, indent=2)
-                
-                st.success(f"Sparade data till {filename}")
-                
-                # Spara även till senaste-fil för snabbladdning
-                with open("data/affarsplan_senaste.json", "w", encoding="utf-8") as f:
-                    json.dump(data_to_save, f, ensure_ascii=False, indent=2)
-                
-            except Exception as e:
-                st.error(f"Ett fel uppstod vid sparande: {e}")
+            if save_session() is not None:
+                st.success("Sparade din affärsplan")
+            else:
+                st.error("Ett fel uppstod vid sparande.")
         
         # Ladda senaste data
         if st.button("Ladda senaste", key="load_latest", use_container_width=True):
-            try:
-                if os.path.exists("data/affarsplan_senaste.json"):
-                    with open("data/affarsplan_senaste.json", "r", encoding="utf-8") as f:
-                        loaded_data = json.load(f)
-                    
-                    # Återställ data från filen
-                    st.session_state.user_data = loaded_data.get("user_data", {})
-                    st.session_state.conversation_history = loaded_data.get("conversation_history", [])
-                    st.session_state.current_stage = loaded_data.get("current_stage", "intro")
-                    
-                    timestamp = loaded_data.get("timestamp", "okänd tidpunkt")
-                    st.success(f"Laddade data från {timestamp}")
-                    time.sleep(1)  # Kort paus för att visa meddelandet
-                    st.rerun()
-                else:
-                    st.warning("Ingen tidigare sparad data hittades.")
-            except Exception as e:
-                st.error(f"Ett fel uppstod vid laddning: {e}")
+            state = load_session()
+            if state is not None:
+                saved_at = datetime.fromtimestamp(state["saved_at"]).strftime("%Y-%m-%d %H:%M:%S")
+                st.success(f"Laddade data från {saved_at}")
+                time.sleep(1)  # Kort paus för att visa meddelandet
+                st.rerun()
+            else:
+                st.warning("Ingen tidigare sparad data hittades.")
         
-        # Lista tidigare filer
-        saved_files = []
-        if os.path.exists("data"):
-            saved_files = [f for f in os.listdir("data") if f.startswith("affarsplan_") and f.endswith(".json") and f != "affarsplan_senaste.json"]
+        # Lista tidigare sparningar för sessionen (ur katalogen, en sida i taget)
+        search = st.text_input("Sök företagsnamn:", key="catalog_search")
+        if st.session_state.get("catalog_last_search") != search:
+            st.session_state.catalog_last_search = search
+            st.session_state.catalog_page = 0
+        page = st.session_state.get("catalog_page", 0)
+        plans, total = saved_plans(search, page)
         
-        if saved_files:
+        if plans:
             st.markdown("### 📁 Tidigare sparade")
-            selected_file = st.selectbox("Välj fil att ladda:", saved_files, key="file_select")
+            labels = {
+                p["id"]: " – ".join(filter(None, [
+                    datetime.fromtimestamp(p["saved_at"]).strftime("%Y-%m-%d %H:%M"),
+                    p["company_name"],
+                    p["current_stage"] or "okänt steg"
+                ]))
+                for p in plans
+            }
+            selected_id = st.selectbox("Välj sparning att ladda:", list(labels), format_func=labels.get, key="file_select")
             
-            if st.button("Ladda vald fil", key="load_selected", use_container_width=True):
-                try:
-                    with open(f"data/{selected_file}", "r", encoding="utf-8") as f:
-                        loaded_data = json.load(f)
-                    
-                    # Återställ data från filen
-                    st.session_state.user_data = loaded_data.get("user_data", {})
-                    st.session_state.conversation_history = loaded_data.get("conversation_history", [])
-                    st.session_state.current_stage = loaded_data.get("current_stage", "intro")
-                    
-                    timestamp = loaded_data.get("timestamp", "okänd tidpunkt")
-                    st.success(f"Laddade data från {timestamp}")
+            # Bläddra mellan sidor
+            page_count = (total + config.CATALOG_PAGE_SIZE - 1) // config.CATALOG_PAGE_SIZE
+            if page_count > 1:
+                prev_col, info_col, next_col = st.columns([1, 2, 1])
+                if prev_col.button("‹", key="catalog_prev", disabled=page == 0):
+                    st.session_state.catalog_page = page - 1
+                    st.rerun()
+                info_col.caption(f"Sida {page + 1} av {page_count}")
+                if next_col.button("›", key="catalog_next", disabled=page >= page_count - 1):
+                    st.session_state.catalog_page = page + 1
+                    st.rerun()
+            
+            if st.button("Ladda vald sparning", key="load_selected", use_container_width=True):
+                if load_session(selected_id) is not None:
+                    st.success(f"Laddade data från {labels[selected_id]}")
                     time.sleep(1)  # Kort paus för att visa meddelandet
                     st.rerun()
-                except Exception as e:
-                    st.error(f"Ett fel uppstod vid laddning: {e}")
+                else:
+                    st.error("Sparningen kunde inte laddas.")
+        elif search:
+            st.caption("Inga sparningar matchar sökningen.")
         
         # Om vi kommer såhär långt i sidebaren, visa lite information om verktyget
         with st.expander("ℹ️ Om verktyget"):
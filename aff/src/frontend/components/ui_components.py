@@ -1,6 +1,8 @@
 # frontend/components/ui_components.py
 
+import time
 import streamlit as st
+from backend.field_store import preview
 
 def info_box(text, icon="ℹ️"):
     """Visar en informationsruta i glassmorphism-stil"""
@@ -132,6 +134,28 @@ def progress_bar(stage):
     <div style="height: 1px; background: linear-gradient(90deg, rgba(157, 129, 255, 0.1), rgba(157, 129, 255, 0.3), rgba(157, 129, 255, 0.1)); margin: 0 0 30px 0; clear: both; width: 100%;"></div>
     """, unsafe_allow_html=True)
 
+def stream_text(chunks, refresh_interval=0.05):
+    """
+    Skriver ut text i takt med att den strömmas in och returnerar hela texten.
+    Uppdateringarna glesas ut så att långa svar inte skickar en ändring per token.
+    """
+    placeholder = st.empty()
+    text = ""
+    last_update = 0.0
+    for chunk in chunks:
+        text += chunk
+        now = time.monotonic()
+        if now - last_update >= refresh_interval:
+            placeholder.markdown(text + "▌")
+            last_update = now
+    placeholder.markdown(text)
+    return text
+
+def display_user_data_summary(user_data):
+    """Visar användarens svar hittills, med långa fält förkortade"""
+    for key, value in user_data.items():
+        st.write(f"**{key.capitalize()}:** {preview(value)}")
+
 def display_chat_history(conversation_history):
     """Visar konversationshistoriken med förbättrad styling"""
     for i, message in enumerate(conversation_history):
@@ -1,17 +1,29 @@
 # frontend/pages/__init__.py
+# Sidorna importeras först när de används (PEP 562), så att en användare som bara ser
+# introsidan inte behöver ladda plotly, pandas, folium, fpdf, PIL och openai.
 
-from frontend.pages.intro_page import intro_page
-from frontend.pages.basic_info_page import basic_info_page
-from frontend.pages.deep_dive_page import deep_dive_page
-from frontend.pages.financial_page import financial_page
-from frontend.pages.business_plan_page import business_plan_page
-from frontend.pages.business_analysis import business_analysis_page
+import importlib
 
-__all__ = [
-    'intro_page',
-    'basic_info_page',
-    'deep_dive_page',
-    'financial_page',
-    'business_plan_page',
-    'business_analysis_page'
-] 
\ No newline at end of file
+# Sidfunktion -> modul som definierar den
+_PAGE_MODULES = {
+    'intro_page': 'frontend.pages.intro_page',
+    'basic_info_page': 'frontend.pages.basic_info_page',
+    'deep_dive_page': 'frontend.pages.deep_dive_page',
+    'financial_page': 'frontend.pages.financial_page',
+    'business_plan_page': 'frontend.pages.business_plan_page',
+    'business_analysis_page': 'frontend.pages.business_analysis',
+}
+
+def __getattr__(name):
+    module_name = _PAGE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    page = getattr(importlib.import_module(module_name), name)
+    # Spara i modulens namnrymd så att __getattr__ bara anropas första gången
+    globals()[name] = page
+    return page
+
+def __dir__():
+    return sorted(list(globals()) + list(_PAGE_MODULES))
+
+__all__ = list(_PAGE_MODULES)
@@ -1,8 +1,6 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-import numpy as np
+import streamlit.components.v1 as components
+# plotly och pandas importeras i diagramfunktionerna, först när dashboarden ritas
 import json
 import base64
 from datetime import datetime
@@ -12,15 +10,32 @@ from frontend.components.ui_components import (
     info_box, 
     success_box, 
     warning_box,
-    section_title
+    section_title,
+    display_user_data_summary
 )
 from backend.openai_utils import (
     generate_chatgpt_response, 
-    generate_swot_analysis, 
-    create_swot_diagram,
-    generate_logo
+    chatgpt_completion,
+    swot_analysis_completion,
+    create_swot_svg,
+    generate_logo,
+    generate_structured,
+    iter_parallel,
+    COMPETITOR_SCHEMA
 )
 from backend.google import generate_competitor_map
+from backend.token_budget import compact_fields
+from backend.retrieval import relevant_context
+from backend import jobs
+from frontend.utils.session_helpers import (
+    start_job,
+    job_fingerprint,
+    job_status,
+    job_result,
+    job_error,
+    forget_job,
+    rerun_while_pending
+)
 
 def business_analysis_page():
     """Interaktiv affärsanalys-verktyg för att utvärdera affärsplaner"""
@@ -36,8 +51,7 @@ def business_analysis_page():
 
     if 'user_data' in st.session_state and st.session_state.user_data:
         with st.expander("Mina tidigare svar (klicka för att visa)", expanded=False):
-            for k, v in st.session_state.user_data.items():
-                st.write(f"**{k.capitalize()}:** {v}")
+            display_user_data_summary(st.session_state.user_data)
     
     # ------------------------------------------------------------
     # Återställ auto-förifyllnings-flaggor om önskat
@@ -58,39 +72,9 @@ def business_analysis_page():
             keys_to_remove = [key for key in st.session_state.keys() if key.startswith("auto_prefill_")]
             for key in keys_to_remove:
                 del st.session_state[key]
-            st.success("AI-förifyllning återställd! När du navigerar till en sektion kommer AI att fylla i på nytt.")
+            st.success("AI-förifyllning återställd! AI fyller i alla sektioner på nytt när sidan laddas om.")
             st.rerun()
 
-    # ------------------------------------------------------------
-    # 2) Möjlighet att importera data till analysdelen
-    # ------------------------------------------------------------
-
-    def _prefill_analysis_answers():
-        """Fyller st.session_state.analysis_answers med data från user_data där det är relevant."""
-        if st.session_state.get("analysis_prefilled", False):
-            return  # Undvik dubletter vid flera klick
-
-        ud = st.session_state.user_data
-        mapping = {
-            # Affärsidé & Lösning
-            "affärsidé_lösning_business_idea": f"{ud.get('produktutbud', '')} – {ud.get('strategi', '')}",
-            "affärsidé_lösning_product_description": ud.get('produktutbud', ''),
-            # Marknad, Kunder & Traktion
-            "marknad_kunder_traktion_customer_segments": ud.get('malgrupp', ''),
-            # Affärsmodell & Ekonomi
-            "affärsmodell_ekonomi_go_to_market": ud.get('strategi', ''),
-        }
-
-        # Säkerställ att analys-svar-dictionariet finns
-        if 'analysis_answers' not in st.session_state:
-            st.session_state.analysis_answers = {}
-
-        for key, value in mapping.items():
-            if value and value.strip():
-                st.session_state.analysis_answers[key] = value
-
-        st.session_state.analysis_prefilled = True
-
     # Ladda eller initiera data
     if 'analysis_answers' not in st.session_state:
         st.session_state.analysis_answers = {}
@@ -109,6 +93,16 @@ def business_analysis_page():
     if 'current_category' not in st.session_state:
         st.session_state.current_category = categories[0]
     
+    # Kategorier och deras frågor
+    category_questions = get_category_questions()
+    
+    # Förifyll alla sektioner på en gång första gången sidan laddas,
+    # så att byte mellan flikarna sedan går direkt
+    if any(f"auto_prefill_{_category_key(c)}_done" not in st.session_state for c in category_questions):
+        with st.spinner("Genererar AI-förslag för alla sektioner..."):
+            ai_prefill_all_sections(category_questions)
+        success_box("AI-förslagen har lagts in automatiskt – granska och justera vid behov")
+    
     # Navigationsknappar med modern, stilren design
     st.markdown("""
         <style>
@@ -147,7 +141,7 @@ def business_analysis_page():
     section_title(st.session_state.current_category, icon="")
     
     # Visa en stilren indikator om sektionen är automatiskt förifylld
-    current_category_key = st.session_state.current_category.lower().replace(", ", "_").replace(" & ", "_")
+    current_category_key = _category_key(st.session_state.current_category)
     if f"auto_prefill_{current_category_key}_done" in st.session_state:
         st.markdown(
             f"""
@@ -160,15 +154,12 @@ def business_analysis_page():
             unsafe_allow_html=True
         )
     
-    # Kategorier och deras frågor
-    category_questions = get_category_questions()
-    
     # Visa aktuell frågekategori
     current_category = st.session_state.current_category
     if current_category in category_questions:
         display_question_section(
             category_questions[current_category],
-            current_category.lower().replace(", ", "_").replace(" & ", "_")
+            _category_key(current_category)
         )
     
     # Sammanfattning och rapport
@@ -202,8 +193,43 @@ def business_analysis_page():
     red_btn_container.markdown('<div class="professional-primary" id="final_report_button"></div>', unsafe_allow_html=True)
 
     if generate_final:
+        # Jobben startas bara här, med svaren som de ser ut vid knapptrycket
+        _start_final_dashboard()
+    
+    # Dashboarden ligger kvar över omkörningar medan jobben blir klara
+    if "final_dashboard" in st.session_state:
         generate_final_dashboard()
 
+def _prefill_analysis_answers():
+    """Fyller st.session_state.analysis_answers med data från user_data där det är relevant."""
+    if st.session_state.get("analysis_prefilled", False):
+        return  # Undvik dubletter vid flera klick
+    
+    ud = st.session_state.user_data
+    mapping = {
+        # Affärsidé & Lösning
+        "affärsidé_lösning_business_idea": f"{ud.get('produktutbud', '')} – {ud.get('strategi', '')}",
+        "affärsidé_lösning_product_description": ud.get('produktutbud', ''),
+        # Marknad, Kunder & Traktion
+        "marknad_kunder_traktion_customer_segments": ud.get('malgrupp', ''),
+        # Affärsmodell & Ekonomi
+        "affärsmodell_ekonomi_go_to_market": ud.get('strategi', ''),
+    }
+    
+    # Säkerställ att analys-svar-dictionariet finns
+    if 'analysis_answers' not in st.session_state:
+        st.session_state.analysis_answers = {}
+    
+    for key, value in mapping.items():
+        if value and value.strip():
+            st.session_state.analysis_answers[key] = value
+    
+    st.session_state.analysis_prefilled = True
+
+def _category_key(category):
+    """Omvandlar ett kategorinamn till sektionsnyckeln som används i session_state"""
+    return category.lower().replace(", ", "_").replace(" & ", "_")
+
 def get_category_questions():
     """Returnerar alla frågekategorier och deras frågor"""
     return {
@@ -456,47 +482,11 @@ def display_question_section(questions, section_name):
 
     def ai_prefill_section():
         """Använder OpenAI för att gissa svar på frågorna utifrån tidigare data"""
-        user_data = st.session_state.get("user_data", {})
-
-        # Skapa en tydlig JSON-mall åt modellen
-        template_dict = {qd["question"]: "" for qd in questions.values()}
-
-        prompt = (
-            "Du är en affärscoach som ska hjälpa en entreprenör att fylla i en affärsanalys. "
-            "Entreprenören har tidigare lämnat följande information (user_data):\n"
-            f"{json.dumps(user_data, ensure_ascii=False, indent=2)}\n\n"
-            "Baserat på denna info, gissa korta (1-2 meningar) preliminära svar på frågorna i sektionen. "
-            "Returnera ENDAST giltig JSON med exakt samma nycklar som i mallen nedan.\n\n"
-            f"Mall:\n{json.dumps(template_dict, ensure_ascii=False, indent=2)}"
-        )
-
         with st.spinner("Genererar AI-förslag..."):
-            raw = generate_chatgpt_response(prompt, temperature=0.4)
-
-        # Försök extrahera JSON
-        import re
-        json_str = raw
-        # Ta bort kodblock om de finns
-        code_match = re.search(r"```json([\s\S]*?)```", raw)
-        if code_match:
-            json_str = code_match.group(1)
-
-        try:
-            suggestions = json.loads(json_str)
-        except Exception:
-            # Fallback: enkel rad-parsing
-            suggestions = {}
-            for line in raw.split("\n"):
-                if ":" in line:
-                    q, a = line.split(":", 1)
-                    suggestions[q.strip()] = a.strip()
-
-        # Uppdatera session_state med förslagen
-        for key, qd in questions.items():
-            q_text = qd["question"]
-            answer = suggestions.get(q_text, "")
-            if answer:
-                st.session_state.analysis_answers[f"{section_name}_{key}"] = answer
+            suggestions = generate_structured(
+                _build_prefill_prompt(questions), _prefill_schema(questions), "forifyllning", temperature=0.4
+            )
+        _apply_prefill_suggestions(questions, section_name, suggestions)
     
     # Kontrollera om vi behöver köra AI-förifyllning automatiskt för denna sektion
     if f"auto_prefill_{section_name}_done" not in st.session_state:
@@ -552,6 +542,81 @@ def display_question_section(questions, section_name):
     if st.button(f"Analysera {section_name}", key=f"analyze_{section_name}", type="secondary"):
         analyze_section(section_name, questions)
 
+# Stora genererade texter som inte behövs för att gissa svar på frågorna
+PREFILL_EXCLUDED_FIELDS = ("affarsplan",)
+
+def _build_prefill_prompt(questions):
+    """Bygger prompten som ber AI gissa preliminära svar på en sektions frågor"""
+    # Långa fält kortas och affärsplanen utelämnas för att hålla nere antalet tokens
+    user_data = st.session_state.get("user_data", {})
+    
+    # Frågorna med sina nycklar – svaret ska använda samma nycklar
+    question_dict = {key: qd["question"] for key, qd in questions.items()}
+    
+    return (
+        "Du är en affärscoach som ska hjälpa en entreprenör att fylla i en affärsanalys. "
+        "Entreprenören har tidigare lämnat följande information (user_data):\n"
+        f"{json.dumps(compact_fields(user_data, exclude=PREFILL_EXCLUDED_FIELDS), ensure_ascii=False)}\n\n"
+        "Baserat på denna info, gissa korta (1-2 meningar) preliminära svar på frågorna i sektionen. "
+        "Svara med ett JSON-objekt där varje nyckel nedan får sitt svar.\n\n"
+        f"Frågor:\n{json.dumps(question_dict, ensure_ascii=False)}"
+    )
+
+def _prefill_schema(questions):
+    """JSON-schema för förifyllningssvaret, anpassat efter frågornas typ"""
+    properties = {}
+    for key, qd in questions.items():
+        if qd["type"] == "select_box":
+            properties[key] = {"type": "string", "enum": qd["options"]}
+        elif qd["type"] == "multiselect":
+            properties[key] = {"type": "array", "items": {"type": "string", "enum": qd["options"]}}
+        else:
+            properties[key] = {"type": "string"}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(questions),
+        "additionalProperties": False
+    }
+
+def _apply_prefill_suggestions(questions, section_name, suggestions):
+    """Lägger in de validerade AI-förslagen i st.session_state.analysis_answers"""
+    if not suggestions:
+        return
+    
+    # Uppdatera session_state med förslagen
+    for key in questions:
+        answer = suggestions.get(key)
+        if answer:
+            st.session_state.analysis_answers[f"{section_name}_{key}"] = answer
+
+def ai_prefill_all_sections(category_questions):
+    """
+    Förifyller alla sektioner som ännu inte förifyllts med samtidiga AI-anrop
+    och markerar samtliga som klara på en gång.
+    """
+    if 'analysis_answers' not in st.session_state:
+        st.session_state.analysis_answers = {}
+    
+    pending = {
+        _category_key(category): questions
+        for category, questions in category_questions.items()
+        if f"auto_prefill_{_category_key(category)}_done" not in st.session_state
+    }
+    # Prompterna byggs här i skripttråden – bara själva anropen körs parallellt
+    tasks = {
+        section_name: (
+            generate_structured,
+            (_build_prefill_prompt(questions), _prefill_schema(questions), "forifyllning", None, None, 0.4)
+        )
+        for section_name, questions in pending.items()
+    }
+    for section_name, suggestions in iter_parallel(tasks):
+        _apply_prefill_suggestions(pending[section_name], section_name, suggestions)
+    
+    for section_name in pending:
+        st.session_state[f"auto_prefill_{section_name}_done"] = True
+
 def get_section_description(section_name):
     """Returnerar beskrivningar för varje sektion"""
     descriptions = {
@@ -566,6 +631,21 @@ def get_section_description(section_name):
     lookup_key = section_name.lower().replace(", ", "_").replace(" & ", "_")
     return descriptions.get(lookup_key, "")
 
+def _guidance_block(query):
+    """
+    Hämtar de mest relevanta styckena ur vägledningstexterna (Almi/Vinnova, investerarfrågor)
+    och formaterar dem som ett promptavsnitt, eller "" om inget matchar
+    """
+    context = relevant_context(query)
+    if not context:
+        return ""
+    return f"""
+    Relevant vägledning från Almi, Vinnova och vanliga investerarfrågor
+    (använd den där den är tillämplig):
+    
+    {context}
+    """
+
 def analyze_section(section_name, questions):
     """Analyserar svaren i en sektion med hjälp av AI"""
     # Samla alla svar från sektionen
@@ -586,6 +666,8 @@ def analyze_section(section_name, questions):
     
     Formatera ditt svar som en analys med Styrkor, Svagheter och Rekommendationer.
     """
+    query = " ".join([section_name, *section_answers.keys(), *map(str, section_answers.values())])
+    prompt += _guidance_block(query)
     
     with st.spinner(f"Analyserar {section_name}..."):
         analysis = generate_chatgpt_response(prompt)
@@ -594,8 +676,8 @@ def analyze_section(section_name, questions):
     st.subheader("AI-analys")
     st.markdown(analysis)
 
-def generate_analysis_report():
-    """Genererar en sammanfattande analysrapport baserad på alla svar"""
+def _build_analysis_report_prompt():
+    """Bygger prompten för den sammanfattande analysrapporten"""
     # Samla alla svar
     all_answers = st.session_state.analysis_answers
     
@@ -615,10 +697,12 @@ def generate_analysis_report():
     Sammanfatta med en rekommendation och totalbetyg (1-10) på affärsplanens kvalitet.
     Ge också specifika förslag på förbättringsområden.
     """
+    prompt += _guidance_block(" ".join(str(answer) for answer in all_answers.values()))
+    return prompt
     
-    with st.spinner("Genererar sammanfattande analys..."):
-        analysis = generate_chatgpt_response(prompt)
-        st.session_state.analysis_results["sammanfattning"] = analysis
+def _render_analysis_report(analysis):
+    """Visar den sammanfattande analysen och sparar den i session_state"""
+    st.session_state.analysis_results["sammanfattning"] = analysis
     
     st.subheader("Sammanfattande analys")
     st.markdown(analysis)
@@ -637,64 +721,459 @@ def generate_analysis_report():
     except:
         pass
 
-def generate_final_dashboard():
-    """Genererar en innovativ, interaktiv slutrapport med fler visuella element"""
+def generate_analysis_report():
+    """Genererar en sammanfattande analysrapport baserad på alla svar"""
+    with st.spinner("Genererar sammanfattande analys..."):
+        analysis = generate_chatgpt_response(_build_analysis_report_prompt())
     
-    # Skapa en laddningsanimation med stilren design
-    with st.spinner(""):
-        st.markdown("""
-        <style>
-        @keyframes fade {
-            0% { opacity: 0.7; }
-            50% { opacity: 1; }
-            100% { opacity: 0.7; }
-        }
-        .report-loading {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            padding: 20px;
-            font-size: 20px;
-            color: white;
-            background: linear-gradient(90deg, #1e3c72, #2a5298);
-            border-radius: 4px;
-            margin: 20px 0;
-            box-shadow: 0 4px 10px rgba(0,0,0,0.1);
-            animation: fade 2s infinite ease-in-out;
+    _render_analysis_report(analysis)
+
+def _extract_rating(summary):
+    """Hittar helhetsbetyget i sammanfattningen (standard 5)"""
+    import re
+    rating_match = re.search(r"(\d{1,2})(?:/10)?", summary or "")
+    return int(rating_match.group(1)) if rating_match else 5
+
+def _render_rating_gauge(rating):
+    """Visar totalbetyget som en gauge chart"""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = rating,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Investeringsattraktivitet"},
+        gauge = {
+            'axis': {'range': [0, 10]},
+            'bar': {'color': "#1e3c72"},
+            'steps': [
+                {'range': [0, 3], 'color': "#e6e9ef"},
+                {'range': [3, 7], 'color': "#c5cfe0"},
+                {'range': [7, 10], 'color': "#8da5d3"}
+            ],
+            'threshold': {
+                'line': {'color': "#2a5298", 'width': 2},
+                'thickness': 0.75,
+                'value': rating
+            }
         }
-        .radar-chart {
-            margin: 20px auto;
-            max-width: 600px;
+    ))
+    
+    fig.update_layout(height=250, margin=dict(l=20, r=20, t=50, b=20))
+    st.plotly_chart(fig, use_container_width=True)
+
+def _render_swot(swot_text):
+    """Visar SWOT-diagrammet för dashboarden"""
+    if not swot_text:
+        st.warning("Kunde inte generera SWOT-analys.")
+        return
+    # Vektorversionen är skarp i alla storlekar och mindre än PNG:en
+    st.markdown(create_swot_svg(swot_text, responsive=True), unsafe_allow_html=True)
+
+RADAR_CATEGORIES = ['Produkt/Tjänst', 'Marknad', 'Team', 'Ekonomi', 'Risk/Exit']
+_SCORE_KEYS = ["produkt", "marknad", "team", "ekonomi", "risk_exit"]
+
+FORECAST_ROW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "year": {"type": "string"},
+        "revenue": {"type": "number"},
+        "costs": {"type": "number"},
+        "ebitda": {"type": "number"}
+    },
+    "required": ["year", "revenue", "costs", "ebitda"],
+    "additionalProperties": False
+}
+
+def _build_insights_request():
+    """
+    Bygger ett strukturerat anrop som i en och samma förfrågan ger poäng till affärsprofilen
+    och, när underlag finns, konkurrentfördelning och 5-årig prognos.
+    
+    Returns:
+        tuple: (prompt, schema)
+    """
+    answers = st.session_state.analysis_answers
+    properties = {
+        "scores": {
+            "type": "object",
+            "properties": {key: {"type": "number"} for key in _SCORE_KEYS},
+            "required": _SCORE_KEYS,
+            "additionalProperties": False
         }
-        .dashboard-card {
-            background: #ffffff;
-            border-radius: 4px;
-            padding: 20px;
-            margin: 15px 0;
-            border: 1px solid #e6e9ef;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+    }
+    prompt = f"""
+    Baserat på följande information om ett startup-företag,
+    ge ett poäng mellan 1-10 (1 = mycket svag, 10 = extremt stark) i "scores" för var och en av kategorierna.
+    
+    Produkt/Tjänst (produkt): {answers.get("affärsidé_lösning_product_description", "")}
+    Marknad (marknad): {answers.get("marknad_kunder_traktion_market_size", "")}
+    Team (team): {answers.get("team_organisation_team_members", "")}
+    Ekonomi (ekonomi): {answers.get("affärsmodell_ekonomi_revenue_model", "")}
+    Risk/Exit (risk_exit): {answers.get("risk_hållbarhet_exit_exit_plan", "")}
+    """
+    
+    market_inputs = _market_inputs()
+    if market_inputs:
+        market_text, competition_text = market_inputs
+        properties["competitors"] = {"type": "array", "items": COMPETITOR_SCHEMA}
+        prompt += f"""
+    Baserat på denna beskrivning av marknaden och konkurrenter:
+    
+    Marknad: {market_text}
+    Konkurrenter: {competition_text}
+    
+    Ge i "competitors" 3-6 konkurrentföretag med namn, marknadsandel i procent (totalt 100%) och kort beskrivning.
+    """
+    
+    finance_inputs = _finance_inputs()
+    if finance_inputs:
+        financial_text, revenue_model = finance_inputs
+        properties["forecast"] = {"type": "array", "items": FORECAST_ROW_SCHEMA}
+        prompt += f"""
+    Baserat på denna finansiella information:
+    
+    Finansiell prognos: {financial_text}
+    Intäktsmodell: {revenue_model}
+    
+    Ge i "forecast" en 5-årig prognos, en rad per år, för omsättning, kostnader och EBITDA (i tkr).
+    """
+    
+    schema = {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+    return prompt, schema
+
+def _render_radar(scores, rating):
+    """Visar affärsprofilen som radar chart utifrån AI-poängen"""
+    import plotly.graph_objects as go
+    categories = RADAR_CATEGORIES
+    
+    if scores:
+        # Säkerställ att värdena är inom 1-10
+        values = [min(max(float(scores[key]), 1), 10) for key in _SCORE_KEYS]
+    else:
+        # Fallback om AI-anrop misslyckas
+        values = [rating*0.8, rating*0.9, rating*1.1, rating*0.7, rating*1.0]
+    
+    # Skapa radar chart
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatterpolar(
+        r=values,
+        theta=categories,
+        fill='toself',
+        line=dict(color='#1e3c72'),
+        fillcolor='rgba(30, 60, 114, 0.5)',
+        name='Ditt företag'
+    ))
+    
+    # Genomsnittlig benchmark
+    fig.add_trace(go.Scatterpolar(
+        r=[7, 6, 7, 5, 6],  # Benchmark-värden
+        theta=categories,
+        fill='toself',
+        opacity=0.3,
+        line=dict(color='gray', dash='dot'),
+        fillcolor='rgba(200, 200, 200, 0.2)',
+        name='Branschgenomsnitt'
+    ))
+    
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 10]
+            )
+        ),
+        showlegend=True,
+        height=350
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Lägg till tolkning
+    strong_areas = [categories[i] for i, v in enumerate(values) if v >= 7]
+    weak_areas = [categories[i] for i, v in enumerate(values) if v <= 4]
+    
+    if strong_areas:
+        st.markdown(f"**Starka områden:** {', '.join(strong_areas)}")
+    if weak_areas:
+        st.markdown(f"**Utvecklingsområden:** {', '.join(weak_areas)}")
+
+def _market_inputs():
+    """Returnerar (marknad, konkurrenter) från svaren, eller None om underlag saknas"""
+    # Skapa marknadstrendanalys baserad på svar
+    market_text = st.session_state.analysis_answers.get("marknad_kunder_traktion_market_trends", "")
+    competition_text = st.session_state.analysis_answers.get("marknad_kunder_traktion_competition", "")
+    
+    if len(market_text) > 10 and len(competition_text) > 10:
+        return market_text, competition_text
+    return None
+
+def _prepare_competitors(competitors):
+    """Konkurrentlistan med ditt företag tillagt (och exempeldata om svaret saknade konkurrenter)"""
+    # Konkurrentdata kommer redan validerad från det strukturerade svaret
+    competitors = [dict(c) for c in (competitors or []) if c["name"].strip() and c["share"] > 0]
+    
+    if not competitors:
+        # Fallback om vi inte kunde extrahera data
+        competitors = [
+            {"name": "Konkurrent A", "share": 35, "description": "Marknadsledare med etablerat varumärke"},
+            {"name": "Konkurrent B", "share": 25, "description": "Innovativ utmanare med lägre priser"},
+            {"name": "Konkurrent C", "share": 15, "description": "Nischad aktör med hög kvalitet"},
+            {"name": "Övriga", "share": 25, "description": "Mindre aktörer på marknaden"}
+        ]
+    
+    # Lägg till ditt företag med liten marknadsandel
+    your_share = min(5, sum(c["share"] for c in competitors) * 0.1)  # Max 5% eller 10% av total
+    if your_share > 0:
+        for c in competitors:
+            c["share"] = c["share"] * (100 - your_share) / 100
+        competitors.append({"name": "Ditt företag", "share": your_share, "description": "Din position"})
+    return competitors
+
+def _dashboard_map_job(competitors, city):
+    """
+    Bakgrundsjobb: bygger konkurrentkartan (Places-sökningar och folium).
+    Körs utanför skripttråden, så inga Streamlit-anrop – fel samlas i "errors".
+    """
+    errors = []
+    map_html = generate_competitor_map(competitors, city, errors=errors)
+    return {"map_html": map_html, "errors": errors}
+
+def _render_market(competitors, city, map_result=None, map_error=None):
+    """Visar marknadsandelar, konkurrentlista och konkurrentkartan när kartjobbet är klart"""
+    import plotly.express as px
+    import pandas as pd
+    
+    # Skapa en dataframe för marknadsandelsvisualisering
+    df = pd.DataFrame(competitors)
+    
+    # Visualisera marknadsandelar
+    colors = ['#1e3c72', '#2a5298', '#4267b2', '#6d87c8', '#99a9d4', '#c5cfe0']
+    
+    fig = px.pie(df, values='share', names='name', title='Marknadsandelar',
+                hover_data=['description'], labels={'share':'Marknadsandel (%)'},
+                color_discrete_sequence=colors)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(height=500)
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Visa konkurrentlista
+    st.markdown("#### Konkurrentanalys")
+    for comp in competitors:
+        if comp["name"] != "Ditt företag":
+            st.markdown(f"**{comp['name']}** ({comp['share']:.1f}%): {comp['description']}")
+    
+    # Visa konkurrentkartan från kartjobbet
+    st.markdown("#### Konkurrentkarta")
+    if map_error:
+        st.error(f"Fel vid generering av karta: {map_error}")
+        st.warning("För att aktivera kartor, lägg till 'GOOGLE_PLACES_KEY=DIN_API_NYCKEL' i .env-filen.")
+        return
+    if map_result is None:
+        st.info("Genererar konkurrentkarta...")
+        return
+    
+    for message in map_result["errors"]:
+        st.warning(message)
+    map_html = map_result["map_html"]
+    
+    # Visa kartan om den genererades framgångsrikt
+    if map_html and len(map_html) > 100:
+        try:
+            # components.html kör kartans skript (st.markdown gör det inte)
+            components.html(map_html, height=450, scrolling=False)
+            st.info(f"Kartan visar ungefärliga positioner för konkurrenter i {city}. "
+                  "Positionerna är baserade på sökningar via Google Places API.")
+        except Exception as render_error:
+            # Fallback till alternativ metod
+            st.error(f"Kunde inte visa kartan: {str(render_error)}")
+            # Skapa en nedladdbar version
+            import tempfile
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w', encoding='utf-8') as f:
+                f.write(map_html)
+                map_path = f.name
+            st.info(f"Karta skapad som HTML-fil. Du kan öppna den manuellt på: {map_path}")
+    else:
+        st.warning("Kunde inte generera konkurrentkarta. Kontrollera att du har en Google Places API-nyckel i .env-filen.")
+
+def _finance_inputs():
+    """Returnerar (prognos, intäktsmodell) från svaren, eller None om underlag saknas"""
+    # Generera finansiell prognos baserat på inmatad data
+    financial_text = st.session_state.analysis_answers.get("affärsmodell_ekonomi_financial_projections", "")
+    revenue_model = st.session_state.analysis_answers.get("affärsmodell_ekonomi_revenue_model", "")
+    
+    if len(financial_text) > 10 or len(revenue_model) > 10:
+        return financial_text, revenue_model
+    return None
+
+def _render_finance(forecast):
+    """Visar den 5-åriga finansiella prognosen"""
+    import plotly.graph_objects as go
+    import pandas as pd
+    financial_data = [
+        {
+            "År": row["year"],
+            "Omsättning": float(row["revenue"]),
+            "Kostnader": float(row["costs"]),
+            "EBITDA": float(row["ebitda"])
         }
-        </style>
-        <div class="report-loading">Genererar affärsanalys</div>
-        """, unsafe_allow_html=True)
+        for row in (forecast or [])
+    ]
         
-        # Pausa för effekt
-        import time
-        time.sleep(2)
+    if not financial_data:
+        # Fallback om vi inte kunde extrahera data
+        base = 1000  # Basbelopp (tkr)
+        growth = 2.5  # Tillväxtfaktor
+        financial_data = []
+        for i in range(1, 6):
+            revenue = base * (growth ** (i-1))
+            costs = revenue * 0.7 if i > 2 else revenue * 1.2
+            ebitda = revenue - costs
+            financial_data.append({
+                "År": f"År {i}",
+                "Omsättning": revenue,
+                "Kostnader": costs,
+                "EBITDA": ebitda
+            })
     
-    # Generera grundläggande rapport
-    generate_analysis_report()
+    # Skapa en dataframe för finansiell visualisering
+    df = pd.DataFrame(financial_data)
     
-    # Skapa ett dashboard-layout
-    st.markdown("## Interaktiv affärsanalys-dashboard")
-    st.markdown("Baserat på din data har vi skapat en visuell affärsrapport med AI-driven analys.")
+    # Skapa en kombinerad bar chart och line chart
+    fig = go.Figure()
     
-    # Hitta betyget
-    summary = st.session_state.analysis_results.get("sammanfattning", "")
-    import re
-    rating_match = re.search(r"(\d{1,2})(?:/10)?", summary)
-    rating = int(rating_match.group(1)) if rating_match else 5
+    # Lägg till staplar för omsättning och kostnader
+    fig.add_trace(go.Bar(
+        x=df["År"],
+        y=df["Omsättning"],
+        name="Omsättning",
+        marker_color='#1e3c72'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=df["År"],
+        y=df["Kostnader"],
+        name="Kostnader",
+        marker_color='#c5cfe0'
+    ))
+    
+    # Lägg till linje för EBITDA
+    fig.add_trace(go.Scatter(
+        x=df["År"],
+        y=df["EBITDA"],
+        name="EBITDA",
+        mode='lines+markers',
+        line=dict(color='#2a5298', width=3)
+    ))
+    
+    # Uppdatera layout
+    fig.update_layout(
+        title="5-årig finansiell prognos",
+        barmode='group',
+        xaxis_title="År",
+        yaxis_title="Belopp (tkr)",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        height=500
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Lägg till intressant insikt
+    breakeven_year = None
+    for i, row in enumerate(financial_data):
+        if row["EBITDA"] > 0 and (i == 0 or financial_data[i-1]["EBITDA"] <= 0):
+            breakeven_year = row["År"]
+            break
+    
+    if breakeven_year:
+        st.success(f"Prognosen visar break-even under {breakeven_year}")
+    
+    # Visa finansiell data i tabellform
+    st.markdown("#### Finansiell data (tkr)")
+    
+    # Formatera data för bättre presentation
+    formatted_df = df.copy()
+    for col in ["Omsättning", "Kostnader", "EBITDA"]:
+        formatted_df[col] = formatted_df[col].apply(lambda x: f"{x:,.0f}".replace(",", " "))
+    
+    st.table(formatted_df)
+
+@st.cache_data(show_spinner=False)
+def _placeholder_logo_png(business_name):
+    """Ritar en enkel logotyp med matplotlib och returnerar den som PNG-bytes"""
+    import matplotlib.pyplot as plt
+    import io
+    from matplotlib.patches import Circle
     
+    fig, ax = plt.subplots(figsize=(5, 5))
+    ax.set_aspect('equal')
+    
+    # Create a circular background
+    circle = Circle((0.5, 0.5), 0.4, color='#1e3c72', alpha=0.8)
+    ax.add_patch(circle)
+    
+    # Add text
+    ax.text(0.5, 0.5, business_name[0].upper(),
+            fontsize=50, color='white',
+            ha='center', va='center')
+    
+    ax.text(0.5, 0.2, business_name,
+            fontsize=20, color='white',
+            ha='center', va='center')
+    
+    # Remove axes
+    ax.axis('off')
+    plt.tight_layout()
+    
+    # Save to buffer
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+def _render_dashboard_logo(data):
+    """Visar en enkel genererad logotyp i dashboarden"""
+    # Försök generera logo endast om vi har tillräcklig data
+    logo_container = st.empty()
+    if len(data["affärsidé"]) > 10 and len(data["malgrupp"]) > 5:
+        try:
+            with st.spinner("Genererar logo..."):
+                # Skapa en dummy-bild om riktiga API-anrop inte fungerar
+                dummy_mode = True
+                
+                if dummy_mode:
+                    # Generate a colorful placeholder
+                    business_type = data["produktutbud"][:20] if data["produktutbud"] else "startup"
+                    business_name = "Ditt företag"
+                    
+                    # Figuren ritas en gång per namn – dashboarden körs om medan jobben pågår
+                    logo_container.image(_placeholder_logo_png(business_name))
+                else:
+                    # Faktisk API-anrop för logo
+                    logo_url = generate_logo("Ditt företag", data["produktutbud"])
+                    logo_container.image(logo_url)
+        except Exception as e:
+            logo_container.error(f"Kunde inte generera logo: {e}")
+    else:
+        logo_container.info("Fyll i mer information om din affärsidé och målgrupp för att generera en logo.")
+
+def _start_final_dashboard():
+    """
+    Startar dashboardens jobb med svaren som de ser ut nu. Anropas bara när knappen trycks,
+    så omkörningar och ändrade svar startar aldrig nya betalda anrop – inte heller efter ett fel.
+    """
     # Hämta nyckeldata för SWOT och andra visualiseringar
     data = {
         "produktutbud": st.session_state.analysis_answers.get("affärsidé_lösning_product_description", ""),
@@ -705,6 +1184,113 @@ def generate_final_dashboard():
         "vision": st.session_state.analysis_answers.get("affärsidé_lösning_vision", ""),
     }
     
+    # Alla GPT-anrop i dashboarden är oberoende av varandra – de körs samtidigt som bakgrundsjobb
+    # Poäng, konkurrenter och prognos hämtas tillsammans i ett strukturerat anrop
+    insights_prompt, insights_schema = _build_insights_request()
+    tasks = {
+        "summary": (chatgpt_completion, (_build_analysis_report_prompt(),)),
+        "swot": (swot_analysis_completion, (data,)),
+        "insights": (generate_structured, (insights_prompt, insights_schema, "affarsprofil")),
+    }
+    # Ett nytt knapptryck med samma svar återanvänder jobb som fortfarande pågår
+    for key, (func, args) in tasks.items():
+        start_job(f"dashboard_{key}", func, *args, fingerprint=job_fingerprint(func.__name__, args))
+    forget_job("dashboard_map")
+    
+    st.session_state.final_dashboard = {
+        "data": data,
+        "city": st.session_state.user_data.get('stad', 'Stockholm'),
+        "has_market": "competitors" in insights_schema["properties"],
+        "has_finance": "forecast" in insights_schema["properties"],
+        "keys": list(tasks),
+        "results": {},
+        "errors": {},
+    }
+
+def _start_dashboard_map(dashboard):
+    """Startar kartjobbet en gång, när konkurrenterna från det strukturerade svaret finns"""
+    if not dashboard["has_market"] or "insights" not in dashboard["results"] or "map" in dashboard["keys"]:
+        return
+    competitors = _prepare_competitors((dashboard["results"]["insights"] or {}).get("competitors"))
+    dashboard["competitors"] = competitors
+    start_job("dashboard_map", _dashboard_map_job, competitors, dashboard["city"])
+    dashboard["keys"].append("map")
+
+def _collect_dashboard_jobs(dashboard):
+    """Flyttar klara resultat och fel från jobben in i dashboardens tillstånd och släpper jobben"""
+    for key in dashboard["keys"]:
+        if key in dashboard["results"] or key in dashboard["errors"]:
+            continue
+        job_key = f"dashboard_{key}"
+        state = job_status(job_key)
+        if state == jobs.DONE:
+            dashboard["results"][key] = job_result(job_key)
+        elif state == jobs.FAILED:
+            dashboard["errors"][key] = job_error(job_key)
+        elif state in (jobs.CANCELLED, jobs.UNKNOWN):
+            dashboard["errors"][key] = "Jobbet avbröts. Generera slutrapporten igen."
+        else:
+            continue
+        forget_job(job_key)
+
+def generate_final_dashboard():
+    """Genererar en innovativ, interaktiv slutrapport med fler visuella element"""
+    
+    # Stilar för dashboarden
+    st.markdown("""
+    <style>
+    @keyframes fade {
+        0% { opacity: 0.7; }
+        50% { opacity: 1; }
+        100% { opacity: 0.7; }
+    }
+    .report-loading {
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        padding: 20px;
+        font-size: 20px;
+        color: white;
+        background: linear-gradient(90deg, #1e3c72, #2a5298);
+        border-radius: 4px;
+        margin: 20px 0;
+        box-shadow: 0 4px 10px rgba(0,0,0,0.1);
+        animation: fade 2s infinite ease-in-out;
+    }
+    .radar-chart {
+        margin: 20px auto;
+        max-width: 600px;
+    }
+    .dashboard-card {
+        background: #ffffff;
+        border-radius: 4px;
+        padding: 20px;
+        margin: 15px 0;
+        border: 1px solid #e6e9ef;
+        box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+    }
+    </style>
+    """, unsafe_allow_html=True)
+    loading_banner = st.empty()
+    loading_banner.markdown('<div class="report-loading">Genererar affärsanalys</div>', unsafe_allow_html=True)
+    
+    dashboard = st.session_state.final_dashboard
+    _start_dashboard_map(dashboard)
+    _collect_dashboard_jobs(dashboard)
+    data = dashboard["data"]
+    has_market = dashboard["has_market"]
+    has_finance = dashboard["has_finance"]
+    results = dashboard["results"]
+    errors = dashboard["errors"]
+    
+    # Bygg upp layouten med platshållare som fylls i när respektive svar kommer
+    placeholders = {}
+    placeholders["summary"] = st.empty()
+    
+    # Skapa ett dashboard-layout
+    st.markdown("## Interaktiv affärsanalys-dashboard")
+    st.markdown("Baserat på din data har vi skapat en visuell affärsrapport med AI-driven analys.")
+    
     # DASHBOARD-SEKTION 1: Affärsöversikt
     col1, col2 = st.columns([2, 1])
     
@@ -724,89 +1310,13 @@ def generate_final_dashboard():
         # Automatisk AI-genererad logo
         st.markdown('<div class="dashboard-card">', unsafe_allow_html=True)
         st.subheader("AI-genererad företagslogo")
-        
-        # Försök generera logo endast om vi har tillräcklig data
-        logo_container = st.empty()
-        if len(data["affärsidé"]) > 10 and len(data["malgrupp"]) > 5:
-            try:
-                with st.spinner("Genererar logo..."):
-                    # Skapa en dummy-bild om riktiga API-anrop inte fungerar
-                    dummy_mode = True
-                    
-                    if dummy_mode:
-                        # Generate a colorful placeholder
-                        business_type = data["produktutbud"][:20] if data["produktutbud"] else "startup"
-                        business_name = "Ditt företag"
-                        
-                        # Generate a simple logo using matplotlib
-                        import matplotlib.pyplot as plt
-                        import io
-                        from matplotlib.patches import Circle
-                        
-                        fig, ax = plt.subplots(figsize=(5, 5))
-                        ax.set_aspect('equal')
-                        
-                        # Create a circular background
-                        circle = Circle((0.5, 0.5), 0.4, color='#1e3c72', alpha=0.8)
-                        ax.add_patch(circle)
-                        
-                        # Add text
-                        ax.text(0.5, 0.5, business_name[0].upper(), 
-                                fontsize=50, color='white',
-                                ha='center', va='center')
-                        
-                        ax.text(0.5, 0.2, business_name, 
-                                fontsize=20, color='white',
-                                ha='center', va='center')
-                        
-                        # Remove axes
-                        ax.axis('off')
-                        plt.tight_layout()
-                        
-                        # Save to buffer
-                        buf = io.BytesIO()
-                        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-                        buf.seek(0)
-                        plt.close(fig)
-                        
-                        logo_container.image(buf)
-                    else:
-                        # Faktisk API-anrop för logo
-                        logo_url = generate_logo("Ditt företag", data["produktutbud"])
-                        logo_container.image(logo_url)
-            except Exception as e:
-                logo_container.error(f"Kunde inte generera logo: {e}")
-        else:
-            logo_container.info("Fyll i mer information om din affärsidé och målgrupp för att generera en logo.")
+        _render_dashboard_logo(data)
         st.markdown("</div>", unsafe_allow_html=True)
         
         # Totalbetyg med gauge chart
         st.markdown('<div class="dashboard-card">', unsafe_allow_html=True)
         st.subheader("Helhetsbetyg")
-        
-        fig = go.Figure(go.Indicator(
-            mode = "gauge+number",
-            value = rating,
-            domain = {'x': [0, 1], 'y': [0, 1]},
-            title = {'text': "Investeringsattraktivitet"},
-            gauge = {
-                'axis': {'range': [0, 10]},
-                'bar': {'color': "#1e3c72"},
-                'steps': [
-                    {'range': [0, 3], 'color': "#e6e9ef"},
-                    {'range': [3, 7], 'color': "#c5cfe0"},
-                    {'range': [7, 10], 'color': "#8da5d3"}
-                ],
-                'threshold': {
-                    'line': {'color': "#2a5298", 'width': 2},
-                    'thickness': 0.75,
-                    'value': rating
-                }
-            }
-        ))
-        
-        fig.update_layout(height=250, margin=dict(l=20, r=20, t=50, b=20))
-        st.plotly_chart(fig, use_container_width=True)
+        placeholders["gauge"] = st.empty()
         st.markdown("</div>", unsafe_allow_html=True)
     
     # DASHBOARD-SEKTION 2: SWOT & Radar Chart
@@ -818,353 +1328,96 @@ def generate_final_dashboard():
         # Generera och visa SWOT-analys
         st.markdown('<div class="dashboard-card">', unsafe_allow_html=True)
         st.subheader("SWOT-analys")
-        
-        with st.spinner("Genererar SWOT-analys..."):
-            swot_text = generate_swot_analysis(data)
-            img_buf = create_swot_diagram(swot_text)
-            st.image(img_buf)
+        placeholders["swot"] = st.empty()
         st.markdown("</div>", unsafe_allow_html=True)
     
     with col2:
         # Business Radar Chart - visualiserar styrkor och svagheter
         st.markdown('<div class="dashboard-card radar-chart">', unsafe_allow_html=True)
         st.subheader("Affärsprofil")
-        
-        # Skapa data för radar chart baserat på prompt och analyssvar
-        with st.spinner("Analyserar affärsprofil..."):
-            # Exempel-analys om vi inte får svar från AI
-            categories = ['Produkt/Tjänst', 'Marknad', 'Team', 'Ekonomi', 'Risk/Exit']
-            
-            # Skapa en prompt för att få poäng från ChatGPT
-            radar_prompt = f"""
-            Baserat på följande information om ett startup-företag, 
-            ge ett poäng mellan 1-10 för var och en av följande kategorier.
-            Svara ENBART med siffror i formatet x,x,x,x,x där varje x är ett tal mellan 1-10.
-            
-            Produkt/Tjänst: {st.session_state.analysis_answers.get("affärsidé_lösning_product_description", "")}
-            Marknad: {st.session_state.analysis_answers.get("marknad_kunder_traktion_market_size", "")}
-            Team: {st.session_state.analysis_answers.get("team_organisation_team_members", "")}
-            Ekonomi: {st.session_state.analysis_answers.get("affärsmodell_ekonomi_revenue_model", "")}
-            Risk/Exit: {st.session_state.analysis_answers.get("risk_hållbarhet_exit_exit_plan", "")}
-            
-            1 = mycket svag, 10 = extremt stark
-            """
-            
-            try:
-                # Försök få poäng från ChatGPT
-                response = generate_chatgpt_response(radar_prompt, temperature=0.3)
-                # Extrahera tal från svaret
-                import re
-                values = re.findall(r'(\d+(?:\.\d+)?)', response)
-                if len(values) >= 5:
-                    values = [float(v) for v in values[:5]]
-                    # Säkerställ att värdena är inom 1-10
-                    values = [min(max(v, 1), 10) for v in values]
-                else:
-                    # Fallback
-                    values = [rating*0.8, rating*0.9, rating*1.1, rating*0.7, rating*1.0]
-            except:
-                # Fallback om AI-anrop misslyckas
-                values = [rating*0.8, rating*0.9, rating*1.1, rating*0.7, rating*1.0]
-            
-            # Normalisera för jämförbarhet
-            values_normalized = [v/10 for v in values]
-            
-            # Skapa radar chart
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatterpolar(
-                r=values,
-                theta=categories,
-                fill='toself',
-                line=dict(color='#1e3c72'),
-                fillcolor='rgba(30, 60, 114, 0.5)',
-                name='Ditt företag'
-            ))
-            
-            # Genomsnittlig benchmark
-            fig.add_trace(go.Scatterpolar(
-                r=[7, 6, 7, 5, 6],  # Benchmark-värden
-                theta=categories,
-                fill='toself',
-                opacity=0.3,
-                line=dict(color='gray', dash='dot'),
-                fillcolor='rgba(200, 200, 200, 0.2)',
-                name='Branschgenomsnitt'
-            ))
-            
-            fig.update_layout(
-                polar=dict(
-                    radialaxis=dict(
-                        visible=True,
-                        range=[0, 10]
-                    )
-                ),
-                showlegend=True,
-                height=350
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Lägg till tolkning
-            strong_areas = [categories[i] for i, v in enumerate(values) if v >= 7]
-            weak_areas = [categories[i] for i, v in enumerate(values) if v <= 4]
-            
-            if strong_areas:
-                st.markdown(f"**Starka områden:** {', '.join(strong_areas)}")
-            if weak_areas:
-                st.markdown(f"**Utvecklingsområden:** {', '.join(weak_areas)}")
-            
+        placeholders["radar"] = st.empty()
         st.markdown("</div>", unsafe_allow_html=True)
     
     # DASHBOARD-SEKTION 3: Marknads- och konkurrentanalys
     st.markdown("### Marknadsanalys")
-    
-    try:
-        # Skapa marknadstrendanalys baserad på svar
-        market_text = st.session_state.analysis_answers.get("marknad_kunder_traktion_market_trends", "")
-        competition_text = st.session_state.analysis_answers.get("marknad_kunder_traktion_competition", "")
-        
-        if len(market_text) > 10 and len(competition_text) > 10:
-            market_prompt = f"""
-            Baserat på denna beskrivning av marknaden och konkurrenter:
-            
-            Marknad: {market_text}
-            Konkurrenter: {competition_text}
-            
-            Generera en lista med 3-6 konkurrentföretag och deras marknadsandelar i procent (totalt 100%).
-            Inkludera även företagsnamn och kort beskrivning.
-            Formatet ska vara: Företag|Marknadsandel|Beskrivning
-            """
-            
-            with st.spinner("Analyserar marknadspositionering..."):
-                response = generate_chatgpt_response(market_prompt)
-                
-                # Extrahera konkurrentdata
-                competitors = []
-                import re
-                
-                # Försök hitta konkurrentdata i svaret
-                for line in response.split('\n'):
-                    if '|' in line:
-                        parts = line.split('|')
-                        if len(parts) >= 2:
-                            name = parts[0].strip()
-                            try:
-                                share = float(re.search(r'(\d+(?:\.\d+)?)', parts[1]).group(1))
-                                desc = parts[2].strip() if len(parts) > 2 else ""
-                                competitors.append({"name": name, "share": share, "description": desc})
-                            except:
-                                pass
-                
-                if not competitors:
-                    # Fallback om vi inte kunde extrahera data
-                    competitors = [
-                        {"name": "Konkurrent A", "share": 35, "description": "Marknadsledare med etablerat varumärke"},
-                        {"name": "Konkurrent B", "share": 25, "description": "Innovativ utmanare med lägre priser"},
-                        {"name": "Konkurrent C", "share": 15, "description": "Nischad aktör med hög kvalitet"},
-                        {"name": "Övriga", "share": 25, "description": "Mindre aktörer på marknaden"}
-                    ]
-                
-                # Lägg till ditt företag med liten marknadsandel
-                your_share = min(5, sum(c["share"] for c in competitors) * 0.1)  # Max 5% eller 10% av total
-                if your_share > 0:
-                    for c in competitors:
-                        c["share"] = c["share"] * (100 - your_share) / 100
-                    competitors.append({"name": "Ditt företag", "share": your_share, "description": "Din position"})
-                
-                # Skapa en dataframe för marknadsandelsvisualisering
-                df = pd.DataFrame(competitors)
-                
-                # Visualisera marknadsandelar
-                colors = ['#1e3c72', '#2a5298', '#4267b2', '#6d87c8', '#99a9d4', '#c5cfe0']
-                
-                fig = px.pie(df, values='share', names='name', title='Marknadsandelar', 
-                            hover_data=['description'], labels={'share':'Marknadsandel (%)'},
-                            color_discrete_sequence=colors)
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                fig.update_layout(height=500)
-                
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Visa konkurrentlista
-                st.markdown("#### Konkurrentanalys")
-                for comp in competitors:
-                    if comp["name"] != "Ditt företag":
-                        st.markdown(f"**{comp['name']}** ({comp['share']:.1f}%): {comp['description']}")
-                
-                # Generera och visa konkurrentkarta
-                st.markdown("#### Konkurrentkarta")
-                city = st.session_state.user_data.get('stad', 'Stockholm')
-                
-                with st.spinner("Genererar konkurrentkarta..."):
-                    try:
-                        # Generera kartan
-                        map_html = generate_competitor_map(competitors, city)
-                        
-                        # Visa kartan om den genererades framgångsrikt
-                        if map_html and len(map_html) > 100:
-                            try:
-                                # Försök använda st.markdown med säker wrapper
-                                html_container = f"""
-                                <div style="width:100%; height:450px; overflow:hidden;">
-                                    {map_html}
-                                </div>
-                                """
-                                st.markdown(html_container, unsafe_allow_html=True)
-                                st.info(f"Kartan visar ungefärliga positioner för konkurrenter i {city}. "
-                                      "Positionerna är baserade på sökningar via Google Places API.")
-                            except Exception as render_error:
-                                # Fallback till alternativ metod
-                                st.error(f"Kunde inte visa kartan via markdown: {str(render_error)}")
-                                # Skapa en nedladdbar version
-                                import tempfile
-                                with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w', encoding='utf-8') as f:
-                                    f.write(map_html)
-                                    map_path = f.name
-                                st.info(f"Karta skapad som HTML-fil. Du kan öppna den manuellt på: {map_path}")
-                        else:
-                            st.warning("Kunde inte generera konkurrentkarta. Kontrollera att du har en Google Places API-nyckel i .env-filen.")
-                    except Exception as e:
-                        st.error(f"Fel vid generering av karta: {str(e)}")
-                        st.warning("För att aktivera kartor, lägg till 'GOOGLE_PLACES_KEY=DIN_API_NYCKEL' i .env-filen.")
-        else:
-            st.info("Fyll i fler detaljer om marknaden och konkurrenter för att se marknadsanalys.")
-    except Exception as e:
-        st.error(f"Kunde inte generera marknadsanalys: {str(e)}")
+    placeholders["market"] = st.empty()
+    if not has_market:
+        placeholders["market"].info("Fyll i fler detaljer om marknaden och konkurrenter för att se marknadsanalys.")
     
     # DASHBOARD-SEKTION 4: Finansiell prognos
     st.markdown("### Finansiell prognos")
-    try:
-        # Generera finansiell prognos baserat på inmatad data
-        financial_text = st.session_state.analysis_answers.get("affärsmodell_ekonomi_financial_projections", "")
-        revenue_model = st.session_state.analysis_answers.get("affärsmodell_ekonomi_revenue_model", "")
+    placeholders["finance"] = st.empty()
+    if not has_finance:
+        placeholders["finance"].info("Fyll i detaljerad finansiell information för att se en 5-årig prognos.")
         
-        if len(financial_text) > 10 or len(revenue_model) > 10:
-            finance_prompt = f"""
-            Baserat på denna finansiella information:
-            
-            Finansiell prognos: {financial_text}
-            Intäktsmodell: {revenue_model}
-            
-            Generera en 5-årig prognos för omsättning, kostnader och EBITDA (i tkr).
-            Formatet ska vara: År,Omsättning,Kostnader,EBITDA
-            """
+    loading_messages = {
+        "summary": "Genererar sammanfattande analys...",
+        "gauge": "Beräknar helhetsbetyg...",
+        "swot": "Genererar SWOT-analys...",
+        "radar": "Analyserar affärsprofil...",
+        "market": "Analyserar marknadspositionering...",
+        "finance": "Genererar finansiell prognos...",
+    }
+    pending_sections = ["summary", "gauge", "swot", "radar"]
+    if has_market:
+        pending_sections.append("market")
+    if has_finance:
+        pending_sections.append("finance")
+    for key in pending_sections:
+        placeholders[key].info(loading_messages[key])
             
-            with st.spinner("Genererar finansiell prognos..."):
-                response = generate_chatgpt_response(finance_prompt)
-                
-                # Försök extrahera finansiell data
-                financial_data = []
-                for line in response.split('\n'):
-                    if ',' in line and any(char.isdigit() for char in line):
-                        parts = line.split(',')
-                        if len(parts) >= 4:
-                            try:
-                                year = parts[0].strip()
-                                revenue = float(parts[1].replace('tkr', '').strip())
-                                costs = float(parts[2].replace('tkr', '').strip())
-                                ebitda = float(parts[3].replace('tkr', '').strip())
-                                financial_data.append({
-                                    "År": year, 
-                                    "Omsättning": revenue, 
-                                    "Kostnader": costs, 
-                                    "EBITDA": ebitda
-                                })
-                            except:
-                                pass
-                
-                if not financial_data:
-                    # Fallback om vi inte kunde extrahera data
-                    base = 1000  # Basbelopp (tkr)
-                    growth = 2.5  # Tillväxtfaktor
-                    financial_data = []
-                    for i in range(1, 6):
-                        revenue = base * (growth ** (i-1))
-                        costs = revenue * 0.7 if i > 2 else revenue * 1.2
-                        ebitda = revenue - costs
-                        financial_data.append({
-                            "År": f"År {i}", 
-                            "Omsättning": revenue, 
-                            "Kostnader": costs, 
-                            "EBITDA": ebitda
-                        })
-                
-                # Skapa en dataframe för finansiell visualisering
-                df = pd.DataFrame(financial_data)
-                
-                # Skapa en kombinerad bar chart och line chart
-                fig = go.Figure()
-                
-                # Lägg till staplar för omsättning och kostnader
-                fig.add_trace(go.Bar(
-                    x=df["År"],
-                    y=df["Omsättning"],
-                    name="Omsättning",
-                    marker_color='#1e3c72'
-                ))
-                
-                fig.add_trace(go.Bar(
-                    x=df["År"],
-                    y=df["Kostnader"],
-                    name="Kostnader",
-                    marker_color='#c5cfe0'
-                ))
-                
-                # Lägg till linje för EBITDA
-                fig.add_trace(go.Scatter(
-                    x=df["År"],
-                    y=df["EBITDA"],
-                    name="EBITDA",
-                    mode='lines+markers',
-                    line=dict(color='#2a5298', width=3)
-                ))
-                
-                # Uppdatera layout
-                fig.update_layout(
-                    title="5-årig finansiell prognos",
-                    barmode='group',
-                    xaxis_title="År",
-                    yaxis_title="Belopp (tkr)",
-                    legend=dict(
-                        orientation="h",
-                        yanchor="bottom",
-                        y=1.02,
-                        xanchor="right",
-                        x=1
-                    ),
-                    height=500
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Lägg till intressant insikt
-                breakeven_year = None
-                for i, row in enumerate(financial_data):
-                    if row["EBITDA"] > 0 and (i == 0 or financial_data[i-1]["EBITDA"] <= 0):
-                        breakeven_year = row["År"]
-                        break
-                
-                if breakeven_year:
-                    st.success(f"Prognosen visar break-even under {breakeven_year}")
-                
-                # Visa finansiell data i tabellform
-                st.markdown("#### Finansiell data (tkr)")
-                
-                # Formatera data för bättre presentation
-                formatted_df = df.copy()
-                for col in ["Omsättning", "Kostnader", "EBITDA"]:
-                    formatted_df[col] = formatted_df[col].apply(lambda x: f"{x:,.0f}".replace(",", " "))
-                
-                st.table(formatted_df)
-        else:
-            st.info("Fyll i detaljerad finansiell information för att se en 5-årig prognos.")
-    except Exception as e:
-        st.error(f"Kunde inte generera finansiell prognos: {str(e)}")
+    # Rendera varje sektion vars jobb är klart; övriga visar laddningsmeddelandet tills nästa omkörning.
+    # Ett misslyckat jobb visar sitt fel tills användaren genererar rapporten igen.
+    rating = 5
+    if "summary" in results:
+        with placeholders["summary"].container():
+            _render_analysis_report(results["summary"] or "")
+        # Hitta betyget
+        rating = _extract_rating(results["summary"])
+        with placeholders["gauge"].container():
+            _render_rating_gauge(rating)
+    elif "summary" in errors:
+        placeholders["summary"].error(f"Kunde inte generera sammanfattande analys: {errors['summary']}")
+        placeholders["gauge"].warning("Helhetsbetyget saknas eftersom analysen inte kunde genereras.")
+    
+    if "swot" in results:
+        with placeholders["swot"].container():
+            _render_swot(results["swot"])
+    elif "swot" in errors:
+        placeholders["swot"].error(f"Kunde inte generera SWOT-analys: {errors['swot']}")
+    
+    if "insights" in results:
+        insights = results["insights"] or {}
+        with placeholders["radar"].container():
+            _render_radar(insights.get("scores"), rating)
+        if has_market:
+            with placeholders["market"].container():
+                try:
+                    _render_market(
+                        dashboard["competitors"], dashboard["city"],
+                        results.get("map"), errors.get("map")
+                    )
+                except Exception as e:
+                    st.error(f"Kunde inte generera marknadsanalys: {str(e)}")
+        if has_finance:
+            with placeholders["finance"].container():
+                try:
+                    _render_finance(insights.get("forecast"))
+                except Exception as e:
+                    st.error(f"Kunde inte generera finansiell prognos: {str(e)}")
+    elif "insights" in errors:
+        for key in ["radar"] + (["market"] if has_market else []) + (["finance"] if has_finance else []):
+            placeholders[key].error(f"Kunde inte generera affärsprofilen: {errors['insights']}")
+    
+    if all(key in results or key in errors for key in dashboard["keys"]):
+        loading_banner.empty()
     
     # Skapa en PDF-exportknapp
     st.markdown("### Exportera rapport")
     st.warning("PDF-export kommer att inkludera alla analyser och visualiseringar ovan.")
     
     if st.button("Exportera till PDF", key="export_pdf"):
-        st.info("PDF-export funktionen skulle här generera en nedladdningsbar rapport med alla visualiseringar ovan.") 
\ No newline at end of file
+        st.info("PDF-export funktionen skulle här generera en nedladdningsbar rapport med alla visualiseringar ovan.") 
+    
+    # Kör om sidan tills alla dashboard-jobb är klara
+    rerun_while_pending(*(f"dashboard_{key}" for key in dashboard["keys"]), interval=1.0)
@@ -1,7 +1,7 @@
 # frontend/pages/business_plan_page.py
 
 import streamlit as st
-import os
+import config
 from frontend.components.ui_components import (
     progress_bar, 
     section_title, 
@@ -9,8 +9,21 @@ from frontend.components.ui_components import (
     success_box,
     warning_box
 )
-from backend.openai_utils import generate_chatgpt_response
-from backend.pdf_utils import create_pdf_report, get_pdf_download_link
+from backend.openai_utils import generate_chatgpt_response, stream_chatgpt_completion, summarize_conversation
+from backend import asset_store
+from backend import field_store
+from backend import jobs
+from backend.pdf_utils import create_pdf_report, pdf_download_button, pdf_filename
+from frontend.utils.session_helpers import (
+    start_job,
+    job_status,
+    job_result,
+    job_error,
+    job_partial,
+    job_pending,
+    forget_job,
+    rerun_while_pending
+)
 
 def business_plan_page():
     """Sida för att generera och visa den kompletta affärsplanen"""
@@ -32,7 +45,7 @@ def business_plan_page():
             st.subheader("Status")
             if 'logo_url' in st.session_state and st.session_state.logo_url:
                 st.write("✅ Logotyp genererad")
-                st.image(st.session_state.logo_url, width=100)
+                st.image(asset_store.get_original(st.session_state.logo_url, download=False) or st.session_state.logo_url, width=100)
             else:
                 st.write("❌ Logotyp ej genererad")
                 
@@ -66,42 +79,63 @@ def business_plan_page():
             "Affärsplanen ska ha professionell struktur med rubriker och tydliga avsnitt."
         )
         
-        with st.spinner("Genererar din skräddarsydda affärsplan... (detta kan ta upp till 30 sekunder)"):
-            affarsplan = generate_chatgpt_response(prompt, temperature=0.7)
-            st.session_state.user_data["affarsplan"] = affarsplan
-        
+        # Planen strömmas i ett bakgrundsjobb – omkörningar av sidan startar inte om den
+        start_job("affarsplan", stream_chatgpt_completion, prompt, temperature=0.7, stream=True, fingerprint=prompt)
+    
+    if job_pending("affarsplan"):
+        # Visa texten så långt den har kommit
+        st.markdown(job_partial("affarsplan") + "▌")
+    elif job_status("affarsplan") == jobs.DONE:
+        affarsplan = job_result("affarsplan")
+        forget_job("affarsplan")
+        # Planen hålls som referens i sessionen och läses in igen först när den visas
+        st.session_state.user_data["affarsplan"] = field_store.offload(affarsplan)
         st.markdown(affarsplan)
+    elif job_status("affarsplan") == jobs.FAILED:
+        warning_box(f"Kunde inte generera affärsplanen: {job_error('affarsplan')}")
+        forget_job("affarsplan")
     
     # Visa affärsplanen om den redan har genererats
     if 'affarsplan' in st.session_state.user_data:
         with st.expander("Visa tidigare genererad affärsplan"):
-            st.markdown(st.session_state.user_data["affarsplan"])
+            affarsplan = st.session_state.user_data["affarsplan"]
+            if st.toggle("Visa hela planen", key="show_full_affarsplan"):
+                st.markdown(field_store.resolve(affarsplan))
+            else:
+                st.markdown(field_store.preview(affarsplan))
     
     # Knapp för att skapa PDF
     section_title("PDF-rapport", icon="🖨️")
     if st.button("Skapa PDF-rapport", help="Ladda ner din affärsplan som en snygg PDF-rapport."):
-        with st.spinner("Skapar PDF-rapport med all din affärsinformation..."):
-            try:
-                pdf_path = create_pdf_report(
-                    st.session_state.user_data,
-                    swot_text=st.session_state.get('swot_analysis', None),
-                    swot_image=st.session_state.get('swot_image', None),
-                    manifest=st.session_state.get('manifest', None),
-                    logo_url=st.session_state.get('logo_url', None)
-                )
-                st.session_state.pdf_path = pdf_path
-                success_box(f"PDF skapad! Filnamn: {pdf_path}")
-                
-                # Visa länk för att ladda ner PDF
-                download_link = get_pdf_download_link(pdf_path, "Klicka här för att ladda ner din affärsplan som PDF")
-                st.markdown(download_link, unsafe_allow_html=True)
-            except Exception as e:
-                warning_box(f"Ett fel uppstod när PDF-filen skulle skapas: {str(e)}")
+        start_job(
+            "pdf",
+            create_pdf_report,
+            field_store.resolve_fields(st.session_state.user_data),
+            swot_text=st.session_state.get('swot_analysis', None),
+            swot_image=st.session_state.get('swot_image', None),
+            manifest=st.session_state.get('manifest', None),
+            logo_url=st.session_state.get('logo_url', None)
+        )
     
-    # Om PDF redan har skapats tidigare, visa nedladdningslänk
-    if 'pdf_path' in st.session_state and st.session_state.pdf_path and os.path.exists(st.session_state.pdf_path):
-        download_link = get_pdf_download_link(st.session_state.pdf_path, "Ladda ner din senaste affärsplan som PDF")
-        st.markdown(download_link, unsafe_allow_html=True)
+    if job_pending("pdf"):
+        st.info("Skapar PDF-rapport med all din affärsinformation...")
+    elif job_status("pdf") == jobs.DONE:
+        st.session_state.pdf_bytes = job_result("pdf")
+        st.session_state.pdf_filename = pdf_filename()
+        forget_job("pdf")
+        success_box(f"PDF skapad! Filnamn: {st.session_state.pdf_filename}")
+    elif job_status("pdf") == jobs.FAILED:
+        warning_box(f"Ett fel uppstod när PDF-filen skulle skapas: {job_error('pdf')}")
+        forget_job("pdf")
+    
+    # Om PDF har skapats, visa nedladdningsknapp (filen hämtas först vid klick)
+    if st.session_state.get('pdf_bytes'):
+        pdf_download_button(
+            st.session_state.pdf_bytes,
+            "Ladda ner din affärsplan som PDF",
+            st.session_state.get('pdf_filename'),
+            key="download_business_plan_pdf"
+        )
     
     # Frågesektion
     section_title("Har du frågor om din affärsplan?", icon="❓")
@@ -114,18 +148,23 @@ def business_plan_page():
             f"i {data.get('stad', 'en stad')} med en {data.get('strategi', 'ospecificerad')}-strategi."
         )
         
+        # Historik för kontext: löpande sammanfattning av äldre turer plus de senaste meddelandena
+        history = _qa_history()
+        
         # Lägg till frågan i konversationshistoriken
         st.session_state.conversation_history.append({"role": "user", "content": user_question})
         
-        # Generera svar med historik för kontext
         answer = generate_chatgpt_response(
             f"Baserat på följande kontext: {context}\n\nFråga: {user_question}", 
-            history=st.session_state.conversation_history[-10:] if len(st.session_state.conversation_history) > 0 else []
+            history=history
         )
         
         # Lägg till svaret i konversationshistoriken
         st.session_state.conversation_history.append({"role": "assistant", "content": answer})
         
+        # Uppdatera sammanfattningen i bakgrunden så att nästa fråga går lika snabbt
+        _schedule_summary()
+        
         # Visa svaret
         st.write("**Svar:**")
         st.write(answer)
@@ -134,4 +173,56 @@ def business_plan_page():
     if len(st.session_state.conversation_history) > 0:
         with st.expander("Tidigare frågor och svar"):
             display_chat_history(st.session_state.conversation_history)
-    st.markdown('<br>', unsafe_allow_html=True) 
\ No newline at end of file
+    st.markdown('<br>', unsafe_allow_html=True)
+    
+    # Kör om sidan tills bakgrundsjobben (affärsplan, PDF) är klara
+    rerun_while_pending("affarsplan", "pdf")
+
+def _current_summary():
+    """Sessionens löpande sammanfattning, nollställd om historiken har rensats"""
+    summary = st.session_state.get("history_summary") or {"text": "", "covered": 0}
+    if summary["covered"] > len(st.session_state.conversation_history):
+        summary = {"text": "", "covered": 0}
+    st.session_state.history_summary = summary
+    return summary
+
+def _apply_summary_job():
+    """Tar in resultatet från ett klart sammanfattningsjobb"""
+    state = job_status("history_summary")
+    if state == jobs.DONE:
+        st.session_state.history_summary = {
+            "text": job_result("history_summary"),
+            "covered": st.session_state.get("history_summary_pending", 0),
+        }
+        forget_job("history_summary")
+    elif state in (jobs.FAILED, jobs.CANCELLED):
+        # Behåll den gamla sammanfattningen och försök igen efter nästa svar
+        forget_job("history_summary")
+
+def _qa_history():
+    """Historik för nästa fråga: sammanfattningen följd av de meddelanden den ännu inte täcker"""
+    _apply_summary_job()
+    summary = _current_summary()
+    messages = []
+    if summary["text"]:
+        messages.append({"role": "system", "content": f"Sammanfattning av tidigare samtal:\n{summary['text']}"})
+    messages.extend(st.session_state.conversation_history[summary["covered"]:])
+    return messages
+
+def _schedule_summary():
+    """Fäller in allt utom de senaste meddelandena i sammanfattningen, som bakgrundsjobb"""
+    _apply_summary_job()
+    if job_pending("history_summary"):
+        return
+    summary = _current_summary()
+    history = st.session_state.conversation_history
+    target = len(history) - config.QA_RECENT_MESSAGES
+    if target <= summary["covered"]:
+        return
+    st.session_state.history_summary_pending = target
+    start_job(
+        "history_summary",
+        summarize_conversation,
+        summary["text"],
+        list(history[summary["covered"]:target])
+    )
@@ -7,16 +7,38 @@ from frontend.components.ui_components import (
     info_box, 
     success_box, 
     warning_box,
-    section_title
+    section_title,
+    display_user_data_summary
 )
 from backend.openai_utils import (
     generate_chatgpt_response, 
     generate_logo, 
     generate_swot_analysis, 
     create_swot_diagram, 
-    generate_company_manifest
+    generate_company_manifest,
+    generate_structured,
+    COMPETITOR_SCHEMA
 )
 from backend.google import generate_competitor_map
+from backend import asset_store
+from backend import jobs
+from frontend.utils.session_helpers import (
+    start_job,
+    job_fingerprint,
+    job_status,
+    job_result,
+    job_error,
+    job_pending,
+    forget_job,
+    rerun_while_pending
+)
+
+COMPETITORS_SCHEMA = {
+    "type": "object",
+    "properties": {"competitors": {"type": "array", "items": COMPETITOR_SCHEMA}},
+    "required": ["competitors"],
+    "additionalProperties": False
+}
 
 def deep_dive_page():
     """Sida för fördjupad analys av användarens affärsidé"""
@@ -26,8 +48,7 @@ def deep_dive_page():
     
     # Visa tidigare svar
     with st.expander("Sammanfattning av dina svar hittills"):
-        for key, value in st.session_state.user_data.items():
-            st.write(f"**{key.capitalize()}:** {value}")
+        display_user_data_summary(st.session_state.user_data)
     
     # Företagsnamn
     foretagsnamn = st.text_input("Vad ska företaget heta?", key="foretagsnamn")
@@ -49,7 +70,9 @@ def deep_dive_page():
                     try:
                         logo_url = generate_logo(foretagsnamn, st.session_state.user_data.get('produktutbud', 'produkter'))
                         st.session_state.logo_url = logo_url
-                        st.image(logo_url, caption=f"Logotyp för {foretagsnamn}", width=250)
+                        # Spara bilden lokalt direkt – URL:en från DALL-E slutar gälla efter en stund
+                        asset_store.fetch(logo_url)
+                        st.image(asset_store.get_original(logo_url) or logo_url, caption=f"Logotyp för {foretagsnamn}", width=250)
                         success_box("Logotyp genererad! Den kommer att inkluderas i din affärsplan.")
                     except Exception as e:
                         warning_box(f"Kunde inte generera logotyp: {str(e)}")
@@ -68,7 +91,9 @@ def deep_dive_page():
                         from app import generate_custom_logo
                         logo_url = generate_custom_logo(prompt)
                         st.session_state.logo_url = logo_url
-                        st.image(logo_url, caption=f"Anpassad logotyp för {foretagsnamn}", width=250)
+                        # Spara bilden lokalt direkt – URL:en från DALL-E slutar gälla efter en stund
+                        asset_store.fetch(logo_url)
+                        st.image(asset_store.get_original(logo_url) or logo_url, caption=f"Anpassad logotyp för {foretagsnamn}", width=250)
                         success_box("Anpassad logotyp genererad! Den kommer att inkluderas i din affärsplan.")
                     except Exception as e:
                         warning_box(f"Kunde inte generera anpassad logotyp: {str(e)}")
@@ -128,92 +153,21 @@ def deep_dive_page():
     bransch = produkter  # Använd produktutbud som bransch
     
     if bransch and stad:
+        foretagsnamn = st.session_state.user_data.get("foretagsnamn", "Ditt företag")
         if st.button("Visa konkurrentkarta", help="Visa en karta med konkurrenter inom din bransch i din stad."):
-            with st.spinner(f"Genererar karta för {bransch} i {stad}..."):
-                try:
-                    # Generera förslag på konkurrenter baserat på bransch
-                    konkurrent_prompt = f"""
-                    Generera en lista med 4-6 namngivna konkurrentföretag inom {bransch} i {stad}.
-                    För varje konkurrent, ange en uppskattad marknadsandel i procent (totalt 100%) och en kort beskrivning.
-                    Formatera som: Företag|Marknadsandel|Beskrivning
-                    """
-                    
-                    response = generate_chatgpt_response(konkurrent_prompt)
-                    
-                    # Extrahera konkurrentdata
-                    competitors = []
-                    import re
-                    
-                    # Försök hitta konkurrentdata i svaret
-                    for line in response.split('\n'):
-                        if '|' in line:
-                            parts = line.split('|')
-                            if len(parts) >= 2:
-                                name = parts[0].strip()
-                                try:
-                                    share = float(re.search(r'(\d+(?:\.\d+)?)', parts[1]).group(1))
-                                    desc = parts[2].strip() if len(parts) > 2 else ""
-                                    competitors.append({"name": name, "share": share, "description": desc})
-                                except:
-                                    pass
-                    
-                    if not competitors:
-                        # Fallback om vi inte kunde extrahera data
-                        competitors = [
-                            {"name": "Konkurrent A", "share": 35, "description": "Marknadsledare med etablerat varumärke"},
-                            {"name": "Konkurrent B", "share": 25, "description": "Innovativ utmanare med lägre priser"},
-                            {"name": "Konkurrent C", "share": 15, "description": "Nischad aktör med hög kvalitet"},
-                            {"name": "Övriga", "share": 25, "description": "Mindre aktörer på marknaden"}
-                        ]
-                    
-                    # Lägg till ditt eget företag
-                    your_share = min(5, sum(c["share"] for c in competitors) * 0.1)  # Max 5% eller 10% av total
-                    foretagsnamn = st.session_state.user_data.get("foretagsnamn", "Ditt företag")
-                    
-                    if your_share > 0:
-                        for c in competitors:
-                            c["share"] = c["share"] * (100 - your_share) / 100
-                        competitors.append({
-                            "name": foretagsnamn, 
-                            "share": your_share, 
-                            "description": "Din position på marknaden"
-                        })
-                    
-                    # Visa konkurrentlista
-                    st.markdown("#### Konkurrenter på marknaden")
-                    for comp in competitors:
-                        if comp["name"] != foretagsnamn:
-                            st.markdown(f"**{comp['name']}** ({comp['share']:.1f}%): {comp['description']}")
-                    
-                    # Generera och visa konkurrentkarta
-                    map_html = generate_competitor_map(competitors, stad)
-                    
-                    # Visa kartan om den genererades framgångsrikt
-                    if map_html and len(map_html) > 100:
-                        try:
-                            # Använd components.html istället för st.markdown
-                            st.subheader("Konkurrentkarta")
-                            components.html(
-                                map_html,
-                                height=450,
-                                scrolling=False
-                            )
-                            st.info(f"Kartan visar ungefärliga positioner för konkurrenter i {stad}. "
-                                  "Positionerna är baserade på sökningar via Google Places API.")
-                        except Exception as render_error:
-                            # Fallback till alternativ metod
-                            st.error(f"Kunde inte visa kartan: {str(render_error)}")
-                            # Skapa en nedladdbar version
-                            import tempfile
-                            with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w', encoding='utf-8') as f:
-                                f.write(map_html)
-                                map_path = f.name
-                            st.info(f"Karta skapad som HTML-fil. Du kan öppna den manuellt på: {map_path}")
-                    else:
-                        st.warning("Kunde inte generera konkurrentkarta. Kontrollera att du har en Google Places API-nyckel i .env-filen.")
-                except Exception as e:
-                    st.error(f"Fel vid generering av karta: {str(e)}")
-                    st.warning("För att aktivera kartor, lägg till 'GOOGLE_PLACES_KEY=DIN_API_NYCKEL' i .env-filen.")
+            # Kartan tas fram i bakgrunden så att en omkörning av sidan inte startar om den
+            start_job(
+                "competitor_map", _competitor_map_job, bransch, stad, foretagsnamn,
+                fingerprint=job_fingerprint(bransch, stad, foretagsnamn)
+            )
+        
+        if job_pending("competitor_map"):
+            st.info(f"Genererar karta för {bransch} i {stad}...")
+        elif job_status("competitor_map") == jobs.FAILED:
+            st.error(f"Fel vid generering av karta: {job_error('competitor_map')}")
+            st.warning("För att aktivera kartor, lägg till 'GOOGLE_PLACES_KEY=DIN_API_NYCKEL' i .env-filen.")
+        elif job_status("competitor_map") == jobs.DONE:
+            _render_competitor_map(job_result("competitor_map"), stad)
     else:
         st.warning("För att visa konkurrentkarta behöver du ange både bransch (produktutbud) och stad i 'Grundläggande information'.")
     
@@ -235,16 +189,24 @@ def deep_dive_page():
     # Företagsmanifest
     section_title("Företagsmanifest", icon="📝")
     if st.button("Generera företagsmanifest", help="Få ett inspirerande manifest för ditt företag."):
-        with st.spinner("Skapar inspirerande företagsmanifest..."):
-            manifest = generate_company_manifest(st.session_state.user_data)
-            st.session_state.manifest = manifest
-            
-            st.markdown("### Ditt företagsmanifest")
-            st.markdown(manifest)
-            
-            # Spara i konversationshistoriken
-            st.session_state.conversation_history.append({"role": "user", "content": "Generera företagsmanifest"})
-            st.session_state.conversation_history.append({"role": "assistant", "content": manifest})
+        start_job("manifest", generate_company_manifest, dict(st.session_state.user_data))
+    
+    if job_pending("manifest"):
+        st.info("Skapar inspirerande företagsmanifest...")
+    elif job_status("manifest") == jobs.DONE:
+        manifest = job_result("manifest")
+        forget_job("manifest")
+        st.session_state.manifest = manifest
+        
+        st.markdown("### Ditt företagsmanifest")
+        st.markdown(manifest)
+        
+        # Spara i konversationshistoriken
+        st.session_state.conversation_history.append({"role": "user", "content": "Generera företagsmanifest"})
+        st.session_state.conversation_history.append({"role": "assistant", "content": manifest})
+    elif job_status("manifest") == jobs.FAILED:
+        warning_box(f"Kunde inte skapa företagsmanifest: {job_error('manifest')}")
+        forget_job("manifest")
     
     # Föreslå unikt säljargument
     section_title("Unikt säljargument (USP)", icon="💡")
@@ -264,4 +226,88 @@ def deep_dive_page():
     if st.button("Gå vidare till ekonomisk planering"):
         st.session_state.current_stage = "financial"
         st.rerun()
-    st.markdown('<br>', unsafe_allow_html=True) 
\ No newline at end of file
+    st.markdown('<br>', unsafe_allow_html=True)
+    
+    # Kör om sidan tills bakgrundsjobben är klara
+    rerun_while_pending("competitor_map", "manifest")
+
+def _competitor_map_job(bransch, stad, foretagsnamn):
+    """
+    Bakgrundsjobb: tar fram konkurrenter med marknadsandelar och bygger kartan.
+    Körs utanför skripttråden, så inga Streamlit-anrop – fel samlas i "errors".
+    """
+    # Generera förslag på konkurrenter baserat på bransch
+    konkurrent_prompt = f"""
+    Generera en lista med 4-6 namngivna konkurrentföretag inom {bransch} i {stad}.
+    För varje konkurrent, ange en uppskattad marknadsandel i procent (totalt 100%) och en kort beskrivning.
+    """
+    
+    response = generate_structured(konkurrent_prompt, COMPETITORS_SCHEMA, "konkurrenter")
+    
+    # Konkurrentdata kommer redan validerad från det strukturerade svaret
+    competitors = [
+        dict(c) for c in (response or {}).get("competitors", [])
+        if c["name"].strip() and c["share"] > 0
+    ]
+    
+    if not competitors:
+        # Fallback om vi inte kunde extrahera data
+        competitors = [
+            {"name": "Konkurrent A", "share": 35, "description": "Marknadsledare med etablerat varumärke"},
+            {"name": "Konkurrent B", "share": 25, "description": "Innovativ utmanare med lägre priser"},
+            {"name": "Konkurrent C", "share": 15, "description": "Nischad aktör med hög kvalitet"},
+            {"name": "Övriga", "share": 25, "description": "Mindre aktörer på marknaden"}
+        ]
+    
+    # Lägg till ditt eget företag
+    your_share = min(5, sum(c["share"] for c in competitors) * 0.1)  # Max 5% eller 10% av total
+    
+    if your_share > 0:
+        for c in competitors:
+            c["share"] = c["share"] * (100 - your_share) / 100
+        competitors.append({
+            "name": foretagsnamn, 
+            "share": your_share, 
+            "description": "Din position på marknaden"
+        })
+    
+    errors = []
+    map_html = generate_competitor_map(competitors, stad, errors=errors)
+    return {"competitors": competitors, "own_name": foretagsnamn, "map_html": map_html, "errors": errors}
+
+def _render_competitor_map(result, stad):
+    """Visar konkurrentlistan och kartan från ett klart kartjobb"""
+    for message in result["errors"]:
+        st.warning(message)
+    
+    # Visa konkurrentlista
+    st.markdown("#### Konkurrenter på marknaden")
+    for comp in result["competitors"]:
+        if comp["name"] != result["own_name"]:
+            st.markdown(f"**{comp['name']}** ({comp['share']:.1f}%): {comp['description']}")
+    
+    map_html = result["map_html"]
+    
+    # Visa kartan om den genererades framgångsrikt
+    if map_html and len(map_html) > 100:
+        try:
+            # Använd components.html istället för st.markdown
+            st.subheader("Konkurrentkarta")
+            components.html(
+                map_html,
+                height=450,
+                scrolling=False
+            )
+            st.info(f"Kartan visar ungefärliga positioner för konkurrenter i {stad}. "
+                  "Positionerna är baserade på sökningar via Google Places API.")
+        except Exception as render_error:
+            # Fallback till alternativ metod
+            st.error(f"Kunde inte visa kartan: {str(render_error)}")
+            # Skapa en nedladdbar version
+            import tempfile
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w', encoding='utf-8') as f:
+                f.write(map_html)
+                map_path = f.name
+            st.info(f"Karta skapad som HTML-fil. Du kan öppna den manuellt på: {map_path}")
+    else:
+        st.warning("Kunde inte generera konkurrentkarta. Kontrollera att du har en Google Places API-nyckel i .env-filen.") 
\ No newline at end of file
@@ -1,8 +1,8 @@
 # frontend/pages/financial_page.py
 
 import streamlit as st
-from frontend.components.ui_components import progress_bar, section_title
-from backend.openai_utils import generate_chatgpt_response
+from frontend.components.ui_components import progress_bar, section_title, stream_text, display_user_data_summary
+from backend.openai_utils import stream_chatgpt_response
 
 def financial_page():
     """Sida för ekonomisk planering av användarens affärsidé"""
@@ -11,8 +11,7 @@ def financial_page():
     
     # Visa tidigare svar
     with st.expander("Sammanfattning av dina svar hittills"):
-        for key, value in st.session_state.user_data.items():
-            st.write(f"**{key.capitalize()}:** {value}")
+        display_user_data_summary(st.session_state.user_data)
     
     # Kostnadsuppskattning
     section_title("Kostnadsuppskattning", icon="💸")
@@ -24,8 +23,7 @@ def financial_page():
             f"Inkludera alla relevanta kostnader som hyra, inredning, personal, lager, marknadsföring, etc. "
             f"Ge kostnadsuppskattningar i svenska kronor baserat på aktuell marknadssituation."
         )
-        kostnadsanalys = generate_chatgpt_response(cost_prompt)
-        st.write(kostnadsanalys)
+        kostnadsanalys = stream_text(stream_chatgpt_response(cost_prompt))
         st.session_state.conversation_history.append({"role": "user", "content": "Kostnadsuppskattning för min verksamhet"})
         st.session_state.conversation_history.append({"role": "assistant", "content": kostnadsanalys})
     
@@ -38,8 +36,7 @@ def financial_page():
             f"i {data.get('stad', 'N/A')} med en startbudget på {data.get('budget', 'N/A')}. "
             f"Inkludera break-even-analys, förväntad vinst över tid (1, 2 och 3 år), och ge realistiska prognoser."
         )
-        roi_analys = generate_chatgpt_response(roi_prompt)
-        st.write(roi_analys)
+        roi_analys = stream_text(stream_chatgpt_response(roi_prompt))
         st.session_state.conversation_history.append({"role": "user", "content": "ROI-analys för min verksamhet"})
         st.session_state.conversation_history.append({"role": "assistant", "content": roi_analys})
     
@@ -52,8 +49,7 @@ def financial_page():
             f"i Sverige. Inkludera information om banklån, crowdfunding, Almi, riskkapital, etc. "
             f"Vad skulle vara mest lämpligt för ett företag med en budget på {data.get('budget', 'N/A')}?"
         )
-        finansiering = generate_chatgpt_response(financing_prompt)
-        st.write(finansiering)
+        finansiering = stream_text(stream_chatgpt_response(financing_prompt))
         st.session_state.conversation_history.append({"role": "user", "content": "Finansieringsalternativ för min verksamhet"})
         st.session_state.conversation_history.append({"role": "assistant", "content": finansiering})
     
@@ -3,13 +3,41 @@
 from frontend.utils.session_helpers import (
     reset_session,
     get_current_stage_name,
-    determine_stage_from_data
+    determine_stage_from_data,
+    ensure_session_id,
+    save_session,
+    load_session,
+    saved_plans,
+    job_fingerprint,
+    start_job,
+    job_status,
+    job_result,
+    job_error,
+    job_partial,
+    job_pending,
+    cancel_job,
+    forget_job,
+    rerun_while_pending
 )
 
 __all__ = [
     'reset_session',
     'get_current_stage_name',
-    'determine_stage_from_data'
+    'determine_stage_from_data',
+    'ensure_session_id',
+    'save_session',
+    'load_session',
+    'saved_plans',
+    'job_fingerprint',
+    'start_job',
+    'job_status',
+    'job_result',
+    'job_error',
+    'job_partial',
+    'job_pending',
+    'cancel_job',
+    'forget_job',
+    'rerun_while_pending'
 ]
 
 # Denna mapp är avsedd för hjälpfunktioner relaterade till frontend 
\ No newline at end of file
@@ -1,19 +1,158 @@
 # frontend/utils/session_helpers.py
 
+import hashlib
+import json
+import re
+import time
+import uuid
 import streamlit as st
-from backend.session_utils import save_progress, load_progress
+import config
+from backend import jobs
+from backend import autosave
+from backend import field_store
+from backend import session_store
+from backend.session_utils import save_progress, load_state
+
+_SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
 
 def reset_session():
     """Återställer sessionen till ursprungsläget"""
+    for key in list(st.session_state.get("jobs", {})):
+        cancel_job(key)
+    st.session_state.jobs = {}
     st.session_state.user_data = {}
     st.session_state.conversation_history = []
+    st.session_state.history_summary = None
     st.session_state.current_stage = 'intro'
-    st.session_state.pdf_path = None
+    st.session_state.pdf_bytes = None
+    st.session_state.pdf_filename = None
     st.session_state.swot_analysis = None
     st.session_state.swot_image = None
     st.session_state.manifest = None
     st.session_state.logo_url = None
 
+def ensure_session_id():
+    """
+    Ger sessionen ett id som sparningar lagras under. Id:t läggs även i URL:en (?sid=...)
+    så att samma sparningar hittas efter en omladdning av sidan.
+    """
+    if st.session_state.get("session_id"):
+        return st.session_state.session_id
+    session_id = st.query_params.get("sid", "")
+    if not _SESSION_ID_PATTERN.match(session_id):
+        session_id = uuid.uuid4().hex
+        st.query_params["sid"] = session_id
+    st.session_state.session_id = session_id
+    return session_id
+
+def _saved_fields():
+    """Den del av session_state som sparas"""
+    return {
+        "user_data": st.session_state.user_data,
+        "conversation_history": st.session_state.conversation_history,
+        "current_stage": st.session_state.current_stage,
+    }
+
+def _settle_autosave():
+    """
+    Flyttar jämförelsepunkten framåt först när den köade deltan faktiskt sparats.
+    Misslyckades skrivningen ligger den gamla kvar, så nästa delta tar med samma ändringar
+    (en delta kan läggas på flera gånger utan att resultatet ändras).
+    """
+    pending = st.session_state.get("autosave_pending")
+    if pending is None or not pending["future"].done():
+        return
+    if pending["future"].result():
+        st.session_state.autosave_baseline = pending["baseline"]
+    del st.session_state.autosave_pending
+
+def autosave_on_stage_change():
+    """
+    Autosparar sessionen när användaren bytt steg sedan förra körningen. Bara ändrade
+    nycklar skrivs, som en delta, och skrivningen görs i bakgrunden.
+    """
+    _settle_autosave()
+    state = _saved_fields()
+    base = st.session_state.get("autosave_baseline")
+    if base is None:
+        # Första körningen: inget att spara ännu, bara en jämförelsepunkt
+        st.session_state.autosave_baseline = autosave.baseline(state)
+        return
+    # Steget jämförs med det senast köade läget, så en delta som skrivs just nu inte köas igen
+    pending = st.session_state.get("autosave_pending")
+    latest = pending["baseline"] if pending else base
+    if state["current_stage"] == latest["current_stage"]:
+        return
+    delta, new_base = autosave.diff(base, state)
+    if delta:
+        future = autosave.submit(ensure_session_id(), delta)
+        st.session_state.autosave_pending = {"future": future, "baseline": new_base}
+    else:
+        st.session_state.autosave_baseline = new_base
+
+def save_session():
+    """
+    Sparar sessionens användardata, konversation och steg.
+
+    Returns:
+        int: Id för sparningen, eller None vid fel
+    """
+    session_id = ensure_session_id()
+    # Köade autosparningar skrivs först – annars kan en äldre delta hamna ovanpå den här sparningen
+    autosave.wait(session_id)
+    snapshot_id = save_progress(
+        st.session_state.user_data,
+        st.session_state.conversation_history,
+        session_id,
+        current_stage=st.session_state.current_stage
+    )
+    # Listan över sparningar har ändrats, och autosparningen utgår från det sparade läget
+    st.session_state.catalog_cache = {}
+    if snapshot_id is not None:
+        st.session_state.autosave_baseline = autosave.baseline(_saved_fields())
+        st.session_state.pop("autosave_pending", None)
+    return snapshot_id
+
+def load_session(snapshot_id=None):
+    """
+    Återställer sessionens senaste sparade läge (eller en viss sparning).
+
+    Returns:
+        dict: Det laddade läget, eller None om inget fanns sparat
+    """
+    session_id = ensure_session_id()
+    # Läs först när köade autosparningar skrivits, så att laddat läge och deltas stämmer
+    autosave.wait(session_id)
+    state = load_state(session_id, snapshot_id)
+    if state is None:
+        return None
+    reset_session()
+    # Stora fält (t.ex. affärsplanen) hålls som referenser och läses in när de visas
+    st.session_state.user_data = field_store.offload_fields(state.get("user_data", {}))
+    st.session_state.conversation_history = state.get("conversation_history", [])
+    st.session_state.current_stage = state.get("current_stage") or determine_stage_from_data(st.session_state.user_data)
+    fields = _saved_fields()
+    if snapshot_id is not None:
+        # En äldre sparning blir sessionens senaste läge, så att kommande deltas utgår från den
+        session_store.save_state(session_id, fields, snapshot=False)
+    st.session_state.autosave_baseline = autosave.baseline(fields)
+    st.session_state.pop("autosave_pending", None)
+    return state
+
+def saved_plans(search="", page=0):
+    """
+    Listar sessionens sparningar ur katalogen, nyast först, med sökning på företagsnamn.
+    Resultatet cachas i session_state tills nästa sparning, så omkörningar inte frågar databasen.
+
+    Returns:
+        tuple: (poster på sidan, totalt antal träffar)
+    """
+    cache = st.session_state.setdefault("catalog_cache", {})
+    key = (search.strip().lower(), page)
+    if key not in cache:
+        cache[key] = session_store.list_catalog(ensure_session_id(), search=key[0], page=page)
+    return cache[key]
+
 def get_current_stage_name():
     """Konverterar det tekniska stegnamnet till ett användarvänligt namn"""
     stage_map = {
@@ -34,4 +173,81 @@ def determine_stage_from_data(user_data):
     elif user_data.get('stad') and user_data.get('produktutbud'):
         return 'basic_info'
     else:
-        return 'intro' 
\ No newline at end of file
+        return 'intro' 
+
+def job_fingerprint(*parts):
+    """Skapar ett fingeravtryck av ett jobbs indata för att känna igen likadana jobb"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def start_job(key, func, *args, fingerprint=None, stream=False, **kwargs):
+    """
+    Startar ett bakgrundsjobb för sessionen och sparar handtaget i session_state.
+
+    Ett jobb med samma nyckel återanvänds om det fortfarande pågår, eller om det är
+    klart och har samma fingeravtryck – så omkörningar upprepar aldrig betalda anrop.
+
+    Returns:
+        str: Jobb-id
+    """
+    handles = st.session_state.setdefault("jobs", {})
+    handle = handles.get(key)
+    if handle:
+        state = jobs.status(handle["id"])
+        if state in (jobs.PENDING, jobs.RUNNING):
+            if fingerprint is None or handle["fingerprint"] == fingerprint:
+                return handle["id"]
+            jobs.cancel(handle["id"])
+        elif state == jobs.DONE and fingerprint is not None and handle["fingerprint"] == fingerprint:
+            return handle["id"]
+        jobs.forget(handle["id"])
+
+    submit = jobs.submit_stream if stream else jobs.submit
+    job_id = submit(func, *args, name=key, **kwargs)
+    handles[key] = {"id": job_id, "fingerprint": fingerprint}
+    return job_id
+
+def _job_id(key):
+    handle = st.session_state.get("jobs", {}).get(key)
+    return handle["id"] if handle else None
+
+def job_status(key):
+    """Status för sessionens jobb med given nyckel (jobs.UNKNOWN om inget finns)"""
+    job_id = _job_id(key)
+    return jobs.status(job_id) if job_id else jobs.UNKNOWN
+
+def job_result(key, default=None):
+    """Resultatet för sessionens jobb, eller default om det inte är klart"""
+    job_id = _job_id(key)
+    return jobs.result(job_id, default) if job_id else default
+
+def job_error(key):
+    """Felmeddelandet om sessionens jobb misslyckades"""
+    job_id = _job_id(key)
+    return jobs.error(job_id) if job_id else None
+
+def job_partial(key):
+    """Delresultatet för ett strömmande jobb"""
+    job_id = _job_id(key)
+    return jobs.partial(job_id) if job_id else ""
+
+def cancel_job(key):
+    """Avbryter sessionens jobb med given nyckel"""
+    job_id = _job_id(key)
+    return jobs.cancel(job_id) if job_id else False
+
+def forget_job(key):
+    """Släpper handtaget (och resultatet) när sidan har tagit hand om resultatet"""
+    handle = st.session_state.get("jobs", {}).pop(key, None)
+    if handle:
+        jobs.forget(handle["id"])
+
+def job_pending(key):
+    """True om sessionens jobb ligger i kö eller körs"""
+    return job_status(key) in (jobs.PENDING, jobs.RUNNING)
+
+def rerun_while_pending(*keys, interval=None):
+    """Kör om sidan efter en kort paus om något av jobben fortfarande pågår"""
+    if any(job_pending(key) for key in keys):
+        time.sleep(config.JOB_POLL_INTERVAL if interval is None else interval)
+        st.rerun()
@@ -0,0 +1,45 @@
+// static/competitor_map.js
+// Delad renderare för kompakta konkurrentkartor (se backend/google.make_map(compact=True)).
+// Laddas en gång av webbläsaren och cachas, så varje karta bara behöver skicka sin platsdata.
+(function () {
+  "use strict";
+
+  function escapeHtml(value) {
+    return String(value === undefined || value === null ? "" : value)
+      .replace(/&/g, "&amp;")
+      .replace(/</g, "&lt;")
+      .replace(/>/g, "&gt;")
+      .replace(/"/g, "&quot;")
+      .replace(/'/g, "&#39;");
+  }
+
+  function popupHtml(place) {
+    return (
+      "<div style='min-width:200px'>" +
+      "<h4>" + escapeHtml(place.name) + "</h4>" +
+      "<p>" + escapeHtml(place.address) + "</p>" +
+      "<p>Betyg: " + escapeHtml(place.rating) + " (" + escapeHtml(place.reviews) + " recensioner)</p>" +
+      "</div>"
+    );
+  }
+
+  window.renderCompetitorMap = function (elementId, config) {
+    var map = L.map(elementId).setView(config.center, config.zoom || 12);
+    L.tileLayer("https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png", {
+      attribution: "&copy; OpenStreetMap contributors &copy; CARTO",
+      subdomains: "abcd",
+      maxZoom: 20
+    }).addTo(map);
+
+    // Använd MarkerCluster för bättre hantering av många markörer
+    var cluster = L.markerClusterGroup();
+    (config.places || []).forEach(function (place) {
+      L.marker([place.lat, place.lng])
+        .bindPopup(popupHtml(place), { maxWidth: 300 })
+        .bindTooltip(escapeHtml(place.name))
+        .addTo(cluster);
+    });
+    cluster.addTo(map);
+    return map;
+  };
+})();